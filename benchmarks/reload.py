@@ -0,0 +1,58 @@
+#!/usr/bin/python3
+"""Compares decoding a JSON snapshot with json.load and in parallel.
+
+Usage: ./benchmarks/reload.py [objects] [workers ...]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+from models.engine.serializers import JSONSerializer  # noqa: E402
+
+
+def snapshot(count):
+    """Return a dictionary of count Place-like objects."""
+    objdict = {}
+    for i in range(count):
+        key = "Place.{:032x}".format(i)
+        objdict[key] = {
+            "id": key[6:], "__class__": "Place",
+            "created_at": "2023-05-16T14:18:32.663822",
+            "updated_at": "2023-05-16T14:18:32.663822",
+            "city_id": "c{}".format(i % 100), "user_id": "u{}".format(i),
+            "name": "Place {}".format(i), "description": "A nice place " * 5,
+            "number_rooms": i % 5, "price_by_night": i % 300,
+            "latitude": 1.5, "longitude": 36.8, "amenity_ids": ["a", "b"]}
+    return objdict
+
+
+def timed(func):
+    """Return the seconds taken by func()."""
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    workers = [int(w) for w in sys.argv[2:]] or [2, 4, os.cpu_count()]
+    serializer = JSONSerializer()
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "file.json")
+        with open(path, "w") as f:
+            serializer.dump(snapshot(count), f)
+
+        def load():
+            with open(path, "r") as f:
+                json.load(f)
+
+        base = timed(load)
+        print("{} objects, {:.1f} MB".format(
+            count, os.path.getsize(path) / 1e6))
+        print("json.load: {:.3f}s".format(base))
+        for n in workers:
+            t = timed(lambda: list(serializer.load_parallel(path, n)))
+            print("{} workers: {:.3f}s ({:.2f}x)".format(n, t, base / t))
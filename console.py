@@ -1,10 +1,11 @@
 #!/usr/bin/python3
 """Defines the HBnB console."""
 import cmd
+import io
 import re
 from shlex import split
 from models import storage
-from models.base_model import BaseModel
+from models.base_model import BaseModel, classes
 from models.user import User
 from models.state import State
 from models.city import City
@@ -38,15 +39,7 @@ class HBNBCommand(cmd.Cmd):
     """
 
     prompt = "(hbnb) "
-    __classes = {
-        "BaseModel",
-        "User",
-        "State",
-        "City",
-        "Place",
-        "Amenity",
-        "Review"
-    }
+    __classes = classes
 
     def emptyline(self):
         """Do nothing upon receiving an empty line."""
@@ -59,7 +52,11 @@ class HBNBCommand(cmd.Cmd):
             "show": self.do_show,
             "destroy": self.do_destroy,
             "count": self.do_count,
-            "update": self.do_update
+            "update": self.do_update,
+            "near": self.do_near,
+            "within": self.do_within,
+            "search": self.do_search,
+            "stats": self.do_stats
         }
         match = re.search(r"\.", arg)
         if match is not None:
@@ -75,11 +72,13 @@ class HBNBCommand(cmd.Cmd):
 
     def do_quit(self, arg):
         """Quit command to exit the program."""
+        storage.flush()
         return True
 
     def do_EOF(self, arg):
         """EOF signal to exit the program."""
         print("")
+        storage.flush()
         return True
 
     def do_create(self, arg):
@@ -92,42 +91,48 @@ class HBNBCommand(cmd.Cmd):
         elif argl[0] not in HBNBCommand.__classes:
             print("** class doesn't exist **")
         else:
-            print(eval(argl[0])().id)
-            storage.save()
+            try:
+                print(HBNBCommand.__classes[argl[0]]().id)
+                storage.commit()
+            except io.UnsupportedOperation:
+                print("** storage is read-only **")
 
     def do_show(self, arg):
         """Usage: show <class> <id> or <class>.show(<id>)
         Display the string representation of a class instance of a given id.
         """
         argl = parse(arg)
-        objdict = storage.all()
         if len(argl) == 0:
             print("** class name missing **")
         elif argl[0] not in HBNBCommand.__classes:
             print("** class doesn't exist **")
         elif len(argl) == 1:
             print("** instance id missing **")
-        elif "{}.{}".format(argl[0], argl[1]) not in objdict:
+        elif storage.get(argl[0], argl[1]) is None:
             print("** no instance found **")
         else:
-            print(objdict["{}.{}".format(argl[0], argl[1])])
+            print(storage.get(argl[0], argl[1]))
 
     def do_destroy(self, arg):
         """Usage: destroy <class> <id> or <class>.destroy(<id>)
-        Delete a class instance of a given id."""
+        Delete a class instance of a given id, along with the instances
+        depending on it: the cities of a state, the places of a city and
+        the reviews of a place."""
         argl = parse(arg)
-        objdict = storage.all()
         if len(argl) == 0:
             print("** class name missing **")
         elif argl[0] not in HBNBCommand.__classes:
             print("** class doesn't exist **")
         elif len(argl) == 1:
             print("** instance id missing **")
-        elif "{}.{}".format(argl[0], argl[1]) not in objdict.keys():
+        elif storage.get(argl[0], argl[1]) is None:
             print("** no instance found **")
         else:
-            del objdict["{}.{}".format(argl[0], argl[1])]
-            storage.save()
+            try:
+                storage.delete(storage.get(argl[0], argl[1]), cascade=True)
+                storage.commit()
+            except io.UnsupportedOperation:
+                print("** storage is read-only **")
 
     def do_all(self, arg):
         """Usage: all or all <class> or <class>.all()
@@ -137,23 +142,86 @@ class HBNBCommand(cmd.Cmd):
         if len(argl) > 0 and argl[0] not in HBNBCommand.__classes:
             print("** class doesn't exist **")
         else:
-            objl = []
-            for obj in storage.all().values():
-                if len(argl) > 0 and argl[0] == obj.__class__.__name__:
-                    objl.append(obj.__str__())
-                elif len(argl) == 0:
-                    objl.append(obj.__str__())
-            print(objl)
+            objdict = storage.all(argl[0] if len(argl) > 0 else None)
+            print([obj.__str__() for obj in objdict.values()])
 
     def do_count(self, arg):
         """Usage: count <class> or <class>.count()
         Retrieve the number of instances of a given class."""
         argl = parse(arg)
-        count = 0
-        for obj in storage.all().values():
-            if argl[0] == obj.__class__.__name__:
-                count += 1
-        print(count)
+        print(storage.count(argl[0]))
+
+    def do_near(self, arg):
+        """Usage: near <class> <latitude> <longitude> <km> or
+       <class>.near(<latitude>, <longitude>, <km>)
+        Display the instances of a class within km of a point, nearest
+        first."""
+        argl = parse(arg)
+        coords = self.__coords(argl, 3)
+        if coords is not None:
+            objdict = storage.near(argl[0], *coords)
+            print([obj.__str__() for obj in objdict.values()])
+
+    def do_within(self, arg):
+        """Usage: within <class> <south> <west> <north> <east> or
+       <class>.within(<south>, <west>, <north>, <east>)
+        Display the instances of a class inside a bounding box."""
+        argl = parse(arg)
+        coords = self.__coords(argl, 4)
+        if coords is not None:
+            objdict = storage.within(argl[0], *coords)
+            print([obj.__str__() for obj in objdict.values()])
+
+    def do_search(self, arg):
+        """Usage: search <class> <words> or <class>.search(<words>)
+        Display the instances of a class matching words, best match
+        first."""
+        argl = parse(arg)
+        if len(argl) == 0:
+            print("** class name missing **")
+        elif argl[0] not in HBNBCommand.__classes:
+            print("** class doesn't exist **")
+        elif len(argl) == 1:
+            print("** words missing **")
+        else:
+            objdict = storage.search(argl[0], " ".join(argl[1:]))
+            print([obj.__str__() for obj in objdict.values()])
+
+    def do_stats(self, arg):
+        """Usage: stats <class> <attribute> [<value>] or
+       <class>.stats(<attribute>, [<value>])
+        Display the number of instances of a class and the count, sum,
+        min, max and average of their numeric attributes, for each value
+        of an attribute or for the given one."""
+        argl = parse(arg)
+        if len(argl) == 0:
+            print("** class name missing **")
+        elif argl[0] not in HBNBCommand.__classes:
+            print("** class doesn't exist **")
+        elif len(argl) == 1:
+            print("** attribute name missing **")
+        elif len(argl) == 2:
+            print(storage.stats(argl[0], argl[1]))
+        else:
+            print(storage.stats(argl[0], argl[1], argl[2]))
+
+    def __coords(self, argl, count):
+        """Return the count numbers following the class name in argl.
+
+        Prints the error and returns None if they're missing or invalid.
+        """
+        if len(argl) == 0:
+            print("** class name missing **")
+        elif argl[0] not in HBNBCommand.__classes:
+            print("** class doesn't exist **")
+        elif len(argl) < count + 1:
+            print("** coordinates missing **")
+        else:
+            try:
+                return [float(a) for a in argl[1:count + 1]]
+            except ValueError:
+                print("** invalid coordinates **")
+        return None
 
     def do_update(self, arg):
         """Usage: update <class> <id> <attribute_name> <attribute_value> or
@@ -162,7 +230,6 @@ class HBNBCommand(cmd.Cmd):
         Update a class instance of a given id by adding or updating
         a given attribute key/value pair or dictionary."""
         argl = parse(arg)
-        objdict = storage.all()
 
         if len(argl) == 0:
             print("** class name missing **")
@@ -173,7 +240,8 @@ class HBNBCommand(cmd.Cmd):
         if len(argl) == 1:
             print("** instance id missing **")
             return False
-        if "{}.{}".format(argl[0], argl[1]) not in objdict.keys():
+        obj = storage.get(argl[0], argl[1])
+        if obj is None:
             print("** no instance found **")
             return False
         if len(argl) == 2:
@@ -186,23 +254,30 @@ class HBNBCommand(cmd.Cmd):
                 print("** value missing **")
                 return False
 
+        try:
+            storage.new(obj)  # raises before any change if read-only
+        except io.UnsupportedOperation:
+            print("** storage is read-only **")
+            return False
+        clsdict = getattr(obj.__class__, "_model", obj.__class__).__dict__
         if len(argl) == 4:
-            obj = objdict["{}.{}".format(argl[0], argl[1])]
-            if argl[2] in obj.__class__.__dict__.keys():
-                valtype = type(obj.__class__.__dict__[argl[2]])
-                obj.__dict__[argl[2]] = valtype(argl[3])
-            else:
-                obj.__dict__[argl[2]] = argl[3]
+            attrs = {argl[2]: argl[3]}
         elif type(eval(argl[2])) == dict:
-            obj = objdict["{}.{}".format(argl[0], argl[1])]
-            for k, v in eval(argl[2]).items():
-                if (k in obj.__class__.__dict__.keys() and
-                        type(obj.__class__.__dict__[k]) in {str, int, float}):
-                    valtype = type(obj.__class__.__dict__[k])
-                    obj.__dict__[k] = valtype(v)
-                else:
-                    obj.__dict__[k] = v
-        storage.save()
+            attrs = eval(argl[2])
+        else:
+            attrs = {}
+        for k in attrs:
+            if isinstance(getattr(obj.__class__, k, None), property):
+                print("** attribute can't be set **")
+                return False
+        for k, v in attrs.items():
+            valtype = type(clsdict.get(k))
+            if valtype in {str, int, float}:
+                setattr(obj, k, valtype(v))
+            else:
+                setattr(obj, k, v)
+        storage.new(obj)
+        storage.commit()
 
 
 if __name__ == "__main__":
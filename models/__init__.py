@@ -1,7 +1,18 @@
 #!/usr/bin/python3
 """__init__ magic method for models directory"""
-from models.engine.file_storage import FileStorage
+import atexit
+import os
 
+if os.getenv("HBNB_TYPE_STORAGE") == "sqlite":
+    from models.engine.sqlite_storage import SQLiteStorage
+    storage = SQLiteStorage()
+else:
+    from models.engine.file_storage import FileStorage
+    storage = FileStorage()
 
-storage = FileStorage()
+if os.getenv("HBNB_COMPACT_MODELS") == "1":
+    from models.base_model import classes, compact
+    for cls in list(classes.values()):
+        compact(cls)
 storage.reload()
+atexit.register(storage.flush)
@@ -1,51 +1,234 @@
 #!/usr/bin/python3
 """Defines the BaseModel class."""
 import models
+import os
 from uuid import uuid4
 from datetime import datetime
 
+classes = {}
+"""dict: The model classes by name, filled in as they are defined."""
+
+defer_timestamps = os.getenv("HBNB_DEFER_TIMESTAMPS") == "1"
+"""bool: Whether timestamp strings are only parsed when first read."""
+
+timeform = "%Y-%m-%dT%H:%M:%S.%f"
+
+
+def parse_datetime(value):
+    """Return the datetime of an ISO 8601 string.
+
+    datetime.fromisoformat() is used first as it's much faster than
+    datetime.strptime(), which stays the fallback for legacy formats.
+    """
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return datetime.strptime(value, timeform)
+
+
+class Timestamp:
+    """Represent a datetime attribute of a model.
+
+    The value is kept in the instance __dict__, or in a slot for compact
+    models. A string stored there is parsed into a datetime the first
+    time the attribute is read.
+    """
+
+    def __init__(self, slot=None):
+        """Initialize a new Timestamp.
+
+        Args:
+            slot (member_descriptor): The slot holding the value, if any.
+        """
+        self.slot = slot
+
+    def __set_name__(self, owner, name):
+        """Remember the name of the attribute."""
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        """Return the datetime of obj, parsing it if needed."""
+        if obj is None:
+            return self
+        try:
+            if self.slot is None:
+                value = obj.__dict__[self.name]
+            else:
+                value = self.slot.__get__(obj)
+        except (KeyError, AttributeError):
+            raise AttributeError(self.name) from None
+        if type(value) is str:
+            value = parse_datetime(value)
+            self.__set__(obj, value)
+        return value
+
+    def __set__(self, obj, value):
+        """Set the datetime of obj."""
+        if self.slot is None:
+            obj.__dict__[self.name] = value
+        else:
+            self.slot.__set__(obj, value)
+
 
 class BaseModel:
     """Represents the BaseModel of the AirBnB project."""
 
+    created_at = Timestamp()
+    updated_at = Timestamp()
+
+    def __init_subclass__(cls, **kwargs):
+        """Register a new model class in classes."""
+        super().__init_subclass__(**kwargs)
+        classes[cls.__name__] = cls
+
     def __init__(self, *args, **kwargs):
         """Initialize a new BaseModel.
 
+        When defer_timestamps is set, created_at and updated_at strings
+        from kwargs are stored as-is and parsed on first read.
+
         Args:
             *args (any): Unused.
             **kwargs (dict): Key/value pairs of attributes.
         """
-        timeform = "%Y-%m-%dT%H:%M:%S.%f"
-        self.id = str(uuid4())
-        self.created_at = datetime.today()
-        self.updated_at = datetime.today()
+        if "id" not in kwargs:
+            self.id = str(uuid4())
+        if "created_at" not in kwargs:
+            self.created_at = datetime.today()
+        if "updated_at" not in kwargs:
+            self.updated_at = datetime.today()
         if len(kwargs) != 0:
             for k, v in kwargs.items():
                 if k == "created_at" or k == "updated_at":
-                    self._dict_[k] = datetime.strptime(v, timeform)
-                else:
-                    self._dict_[k] = v
+                    if type(v) is not str or not defer_timestamps:
+                        v = parse_datetime(v)
+                    setattr(self, k, v)
+                elif k != "__class__":
+                    setattr(self, k, v)
         else:
             models.storage.new(self)
 
     def save(self):
         """Update updated_at with the current datetime."""
         self.updated_at = datetime.today()
-        models.storage.save()
+        models.storage.new(self)
+        models.storage.commit()
 
     def to_dict(self):
         """Return the dictionary of the BaseModel instance.
 
         Includes the key/value pair _class_ representing
-        the class name of the object.
+        the class name of the object. Timestamps that were never read
+        are returned in their original string form.
         """
-        rdict = self._dict_.copy()
-        rdict["created_at"] = self.created_at.isoformat()
-        rdict["updated_at"] = self.updated_at.isoformat()
-        rdict["_class"] = self.class.name_
+        rdict = dict(self._attrs())
+        for k in ("created_at", "updated_at"):
+            if type(rdict[k]) is not str:
+                rdict[k] = rdict[k].isoformat()
+        rdict["__class__"] = self.__class__.__name__
         return rdict
 
     def __str__(self):
         """Return the print/str representation of the BaseModel instance."""
-        clname = self._class.name_
-        return "[{}] ({}) {}".format(clname, self.id, self._dict_)
+        clname = self.__class__.__name__
+        self.created_at, self.updated_at  # parse deferred timestamps
+        return "[{}] ({}) {}".format(clname, self.id, self._attrs())
+
+    def _attrs(self):
+        """Return the dictionary of the instance attributes."""
+        return self.__dict__
+
+
+classes["BaseModel"] = BaseModel
+
+
+class Compact:
+    """Represent the storage of the instances of a compact model class.
+
+    id, the timestamps and the attributes declared by the model live in
+    slots, so an instance needs no __dict__. Other attributes, such as
+    those added by the console update command, go to an overflow
+    dictionary created on first use. An unset declared attribute reads
+    as the default of the model.
+
+    Attributes:
+        _model (type): The model class the compact class derives from.
+        _members (tuple): The attribute name and slot of each slot.
+    """
+
+    __slots__ = ("_extra",)
+
+    def __getattr__(self, name):
+        """Return an overflow attribute or the default of the model."""
+        if name != "_extra":
+            extra = self.__extra()
+            if extra is not None and name in extra:
+                return extra[name]
+        return getattr(type(self)._model, name)
+
+    def __setattr__(self, name, value):
+        """Set a slot or an overflow attribute."""
+        if hasattr(getattr(type(self), name, None), "__set__"):
+            object.__setattr__(self, name, value)
+            return
+        extra = self.__extra()
+        if extra is None:
+            extra = {}
+            object.__setattr__(self, "_extra", extra)
+        extra[name] = value
+
+    def __extra(self):
+        """Return the overflow dictionary, or None if there is none."""
+        try:
+            return Compact._extra.__get__(self)
+        except AttributeError:
+            return None
+
+    def _attrs(self):
+        """Return the dictionary of the instance attributes."""
+        attrs = {}
+        for name, member in type(self)._members:
+            try:
+                attrs[name] = member.__get__(self)
+            except AttributeError:
+                pass
+        extra = self.__extra()
+        if extra is not None:
+            attrs.update(extra)
+        return attrs
+
+
+def compact(cls):
+    """Define the compact variant of a model class and register it.
+
+    The variant is a subclass of cls with the same name, which replaces
+    cls in classes, so the objects created from storage or the console
+    use it.
+
+    Args:
+        cls (type): A model class.
+
+    Returns:
+        The compact class.
+    """
+    declared = []
+    for klass in reversed(cls.__mro__):
+        for name, value in vars(klass).items():
+            if (not name.startswith("_") and not callable(value) and
+                    not isinstance(value, (Timestamp, property)) and
+                    name not in declared):
+                declared.append(name)
+    slots = ["id", "_created_at", "_updated_at"] + declared
+    compact_cls = type(cls)(cls.__name__, (Compact, cls), {
+        "__slots__": tuple(slots),
+        "__module__": cls.__module__,
+        "__doc__": cls.__doc__,
+        "_model": cls,
+    })
+    for name in ("created_at", "updated_at"):
+        timestamp = Timestamp(vars(compact_cls)["_" + name])
+        timestamp.__set_name__(compact_cls, name)
+        setattr(compact_cls, name, timestamp)
+    compact_cls._members = tuple(
+        (name.lstrip("_"), vars(compact_cls)[name]) for name in slots)
+    return compact_cls
@@ -1,6 +1,8 @@
 #!/usr/bin/python3
 """Defines the City city."""
+import models
 from models.base_model import BaseModel
+from models.place import Place
 
 
 class City(BaseModel):
@@ -14,3 +16,10 @@ class City(BaseModel):
     state_id = ""
     name = ""
 
+    _indexes = ("state_id",)
+    _children = (("Place", "city_id"),)
+
+    @property
+    def places(self):
+        """list: The places of the city."""
+        return list(models.storage.find(Place, city_id=self.id).values())
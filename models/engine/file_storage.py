@@ -1,7 +1,20 @@
 #!/usr/bin/python3
 """Defines the FileStorage class."""
+import io
 import json
-from models.base_model import BaseModel
+import mmap
+import os
+import queue
+import tempfile
+import threading
+import time
+import zlib
+from models.engine.indexes import BitmapIndex, ColumnStore, GridIndex
+from models.engine.indexes import GroupStats, HashIndex
+from models.engine.indexes import SortedIndex, TextIndex
+from models.engine.json_stream import has_lines, line_offsets
+from models.engine.serializers import get_serializer
+from models.base_model import BaseModel, classes
 from models.user import User
 from models.state import State
 from models.city import City
@@ -9,41 +22,1273 @@ from models.place import Place
 from models.amenity import Amenity
 from models.review import Review
 
+_umask = os.umask(0)
+os.umask(_umask)
+
+
+def _within(value, low, high):
+    """Return whether value is a number between low and high, or None."""
+    if low is None and high is None:
+        return True
+    if type(value) not in (int, float):
+        return False
+    return ((low is None or value >= low) and
+            (high is None or value <= high))
+
 
 class FileStorage:
     """Represent an abstracted storage engine.
 
+    The snapshot format is chosen with HBNB_STORAGE_FORMAT, one of the
+    names in models.engine.serializers (json by default).
+
+    When journaling is enabled (HBNB_STORAGE_JOURNAL=1), save() appends one
+    record per changed object to a journal next to the snapshot instead of
+    rewriting the whole file. The snapshot is only rewritten (compacted) once
+    the journal holds __compact_after records.
+
+    Snapshots are written to a temporary file which then replaces
+    __file_path, so a crash never leaves a truncated snapshot behind.
+    HBNB_STORAGE_DURABILITY sets when data is forced to disk: "none"
+    leaves it to the OS, "fsync" syncs every snapshot and journal append,
+    and "group" syncs snapshots but only every __group_size journal
+    records or __group_window seconds, and on flush().
+
+    With HBNB_STORAGE_SHARDING set, the snapshot is split into shards
+    stored next to __file_path, e.g. file.User.json: "class" keeps one
+    shard per class and "hash:N" spreads the keys over N shards by hash.
+    A snapshot only rewrites the shards whose objects changed since the
+    previous one.
+
+    Saves can be coalesced: with HBNB_SAVE_BATCH set above 1, save() only
+    writes once that many saves are pending or once the oldest of them is
+    HBNB_SAVE_WINDOW seconds old (when that is set), and flush() writes
+    them right away. The window is only checked by the next save(), no
+    timer fires on its own; pending saves are written by flush(), which
+    models registers to run at interpreter exit.
+
+    With HBNB_STORAGE_BACKGROUND=1, the dirty objects are serialized by
+    the caller but the files are written by a background thread, in
+    order. At most __queue_size writes can wait for that thread; further
+    saves block until it catches up. flush() waits until every queued
+    write is on disk. The error of a failed write is raised by the next
+    save() or flush(), before any new change is taken, and the next write
+    is then a full snapshot so that nothing that failed is lost.
+
+    Serialized dictionaries are cached per key, so commit() only calls
+    to_dict() on the objects marked dirty through new() or delete().
+    BaseModel.save() and the console report their changes that way; a
+    plain save() serializes every loaded object.
+
+    When lazy loading is enabled (HBNB_STORAGE_LAZY=1), reload() only keeps
+    the serialized dictionary of each object; the instance is created the
+    first time it's returned by all(), find() or get(). The sorted, geo,
+    aggregate, bitmap and text indexes of the classes it loads are only
+    built by the first query needing them.
+
+    With HBNB_STORAGE_MMAP=1, storage is read-only: reload() maps JSON
+    snapshots in memory and only reads the key and byte range of each
+    object, which is decoded the first time it's needed. Snapshots
+    written on a single line are loaded lazily instead. Processes
+    mapping the same snapshot share its pages. Attributes aren't indexed
+    in that mode, and new(), delete(), save() and commit() raise
+    io.UnsupportedOperation.
+
+    The keys of each class are indexed so that all(cls) and count(cls) do
+    not have to scan the objects of the other classes. The attributes a
+    model lists in its _indexes tuple are indexed as well, for find(),
+    and the numeric attributes listed in its _columns tuple are stored in
+    a ColumnStore, for between(). The positions of the objects of a model
+    naming its latitude and longitude attributes in _geo are kept in a
+    GridIndex, for near() and within(). The list attributes a model
+    names in _bitmaps get a BitmapIndex, for having(). Every attribute a
+    model declares with an int or float default is kept sorted in a
+    SortedIndex, for order(). The words of the text attributes a model
+    lists in _text go to a TextIndex, for search(); the word counts of
+    the objects of each snapshot file are written next to it whenever
+    it's rewritten, e.g. file.json.text, and read back by reload()
+    instead of tokenizing those objects again while the file is
+    unchanged. For each attribute a model names in _aggregates, a
+    GroupStats keeps the count, sum, min, max and average of its numeric
+    attributes per value of that attribute, for stats(); the groups of
+    a foreign key are rolled up by an attribute of the objects it points
+    to when the model maps that attribute in _rollups.
+    Keys added to or deleted from the dictionary returned by all() are
+    picked up by the next call and saved like any other change.
+
     Attributes:
+        __serializer: The snapshot format.
         __file_path (str): The name of the file to save objects to.
         __objects (dict): A dictionary of instantiated objects.
+        __journaling (bool): Whether save() appends to the journal.
+        __compact_after (int): Journal records allowed before compaction.
+        __dirty (set): Keys created, updated or deleted since last save.
+        __cache (dict): The last serialized dictionary of each object.
+        __journal_size (int): Number of records currently in the journal.
+        __durability (str): One of "none", "fsync" or "group".
+        __group_size (int): Journal records per group commit.
+        __group_window (float): Seconds between group commits.
+        __unsynced (int): Journal records not synced to disk yet.
+        __synced_at (float): The time of the last journal sync.
+        __batch_size (int): Saves coalesced into one write.
+        __batch_window (float): Seconds a save may wait, 0 for no limit.
+        __pending_saves (int): Saves not written yet.
+        __pending_since (float): The time of the oldest pending save.
+        __background (bool): Whether files are written by __writer.
+        __queue_size (int): Writes allowed to wait for __writer.
+        __queue (queue.Queue): The writes waiting for __writer.
+        __writer (threading.Thread): The background writer thread.
+        __error (Exception): The error of the last failed background write.
+        __failed (bool): Whether a write failed since the last snapshot.
+        __by_class (dict): The set of keys of each class name.
+        __attr_indexes (dict): The HashIndex of each indexed attribute,
+            by class name.
+        __columns (dict): The ColumnStore of each class with _columns.
+        __geo (dict): The GridIndex of each class with _geo.
+        __bitmaps (dict): The BitmapIndex of each list attribute, by
+            class name.
+        __sorted (dict): The SortedIndex of each numeric attribute, by
+            class name.
+        __aggregates (dict): The GroupStats of each grouping attribute, by
+            class name.
+        __numeric (dict): The numeric attributes of each class.
+        __text (dict): The TextIndex of each class with _text.
+        __text_loaded (bool): Whether the objects being loaded are
+            already in __text.
+        __indexed (dict): The __objects dictionary the indexes describe.
+        __size (int): The number of keys in the indexes.
+        __lazy (bool): Whether reload() defers creating the instances.
+        __unloaded (set): Keys stored in __cache but not in __objects yet.
+        __deferred (dict): The keys not in the sorted, geo, aggregate,
+            bitmap and text indexes of their class yet, by class name,
+            each mapped to whether its text is still to be indexed.
+        __sharding (str): "class", "hash" or "" when not sharded.
+        __shard_count (int): The number of shards in "hash" sharding.
+        __stale_shards (set): Shards changed since the last snapshot, or
+            None when every shard must be rewritten.
+        __reload_workers (int): Processes decoding a snapshot on reload.
+        __mmap (bool): Whether storage is a read-only mapped snapshot.
+        __offsets (dict): The mapped buffer and byte range of the value of
+            each unloaded key not in __cache.
     """
-    __file_path = "file.json"
+    __serializer = get_serializer(os.getenv("HBNB_STORAGE_FORMAT", "json"))
+    __file_path = "file" + __serializer.extension
     __objects = {}
+    __journaling = os.getenv("HBNB_STORAGE_JOURNAL") == "1"
+    __compact_after = int(os.getenv("HBNB_JOURNAL_COMPACT", "1000"))
+    __dirty = set()
+    __cache = {}
+    __journal_size = 0
+    __durability = os.getenv("HBNB_STORAGE_DURABILITY", "none")
+    if __durability not in ("none", "fsync", "group"):
+        raise ValueError("HBNB_STORAGE_DURABILITY must be one of none, "
+                         "fsync or group, not '{}'".format(__durability))
+    __group_size = int(os.getenv("HBNB_GROUP_COMMIT_SIZE", "64"))
+    __group_window = float(os.getenv("HBNB_GROUP_COMMIT_WINDOW", "1"))
+    __unsynced = 0
+    __synced_at = 0.0
+    __batch_size = int(os.getenv("HBNB_SAVE_BATCH", "1"))
+    __batch_window = float(os.getenv("HBNB_SAVE_WINDOW", "0"))
+    __pending_saves = 0
+    __pending_since = 0.0
+    __background = os.getenv("HBNB_STORAGE_BACKGROUND") == "1"
+    __queue_size = int(os.getenv("HBNB_STORAGE_QUEUE", "8"))
+    __queue = None
+    __writer = None
+    __error = None
+    __failed = False
+    __by_class = {}
+    __attr_indexes = {}
+    __columns = {}
+    __geo = {}
+    __bitmaps = {}
+    __sorted = {}
+    __aggregates = {}
+    __numeric = {}
+    __text = {}
+    __text_loaded = False
+    __indexed = None
+    __size = 0
+    __lazy = os.getenv("HBNB_STORAGE_LAZY") == "1"
+    __unloaded = set()
+    __deferred = {}
+    __sharding = os.getenv("HBNB_STORAGE_SHARDING", "")
+    __shard_count = 0
+    if __sharding.startswith("hash:") and __sharding[5:].isdigit():
+        __shard_count = int(__sharding[5:])
+        __sharding = "hash"
+    if (__sharding not in ("", "class", "hash") or
+            __sharding == "hash" and __shard_count == 0):
+        raise ValueError("HBNB_STORAGE_SHARDING must be class or hash:N, "
+                         "not '{}'".format(__sharding))
+    __stale_shards = None
+    __reload_workers = int(os.getenv("HBNB_RELOAD_WORKERS", "1"))
+    __mmap = os.getenv("HBNB_STORAGE_MMAP") == "1"
+    __offsets = {}
+
+    def all(self, cls=None):
+        """Return the dictionary __objects.
+
+        Args:
+            cls (type or str): Only return the objects of this class.
+        """
+        self.__sync()
+        if cls is None:
+            for key in list(FileStorage.__unloaded):
+                self.__materialize(key)
+            return FileStorage.__objects
+        keys = FileStorage.__by_class.get(self.__name(cls), ())
+        return {key: self.__get(key) for key in keys}
+
+    def count(self, cls=None):
+        """Return the number of stored objects, optionally of a class.
+
+        Args:
+            cls (type or str): Only count the objects of this class.
+        """
+        self.__sync()
+        if cls is None:
+            return len(FileStorage.__objects) + len(FileStorage.__unloaded)
+        return len(FileStorage.__by_class.get(self.__name(cls), ()))
+
+    def find(self, cls, **kwargs):
+        """Return the objects of a class whose attributes match kwargs.
+
+        Indexed attributes are looked up in their HashIndex, the others
+        are compared on the remaining candidates, without creating the
+        instances of lazily loaded candidates that don't match.
+
+        Args:
+            cls (type or str): The class of the objects to find.
+            **kwargs (dict): The attribute values to match.
+        """
+        self.__sync()
+        return {key: self.__get(key)
+                for key in self.__find(self.__name(cls), kwargs)}
+
+    def __find(self, cls_name, kwargs):
+        """Return the keys of the objects of cls_name matching kwargs."""
+        indexes = FileStorage.__attr_indexes.get(cls_name, {})
+        keys = None
+        others = {}
+        for attr, value in kwargs.items():
+            if attr in indexes:
+                found = indexes[attr].get(value)
+                keys = found if keys is None else keys & found
+            else:
+                others[attr] = value
+        if keys is None:
+            keys = FileStorage.__by_class.get(cls_name, ())
+        return [key for key in keys
+                if all(self.__attr(key, attr) == value
+                       for attr, value in others.items())]
+
+    def between(self, cls, **kwargs):
+        """Return the objects of a class whose attributes are in ranges.
+
+        The ranges are matched on the columns of the class when it lists
+        every attribute in _columns, and on each object otherwise.
+
+        Args:
+            cls (type or str): The class of the objects to find.
+            **kwargs (dict): The (low, high) inclusive bounds of each
+                attribute, where None leaves a bound open.
+        """
+        self.__sync()
+        cls_name = self.__name(cls)
+        store = FileStorage.__columns.get(cls_name)
+        if store is not None and all(a in store.attrs for a in kwargs):
+            keys = store.select(kwargs)
+        else:
+            keys = [key for key in FileStorage.__by_class.get(cls_name, ())
+                    if all(_within(self.__attr(key, attr), low, high)
+                           for attr, (low, high) in kwargs.items())]
+        return {key: self.__get(key) for key in keys}
+
+    def near(self, cls, latitude, longitude, km):
+        """Return the objects of a class within km of a point.
+
+        The objects are ordered by distance. Only the classes listing
+        their coordinates in _geo can be searched.
+
+        Args:
+            cls (type or str): The class of the objects to find.
+            latitude (float): The latitude of the point.
+            longitude (float): The longitude of the point.
+            km (float): The radius of the search, in km.
+        """
+        self.__sync()
+        self.__build(self.__name(cls))
+        grid = FileStorage.__geo.get(self.__name(cls))
+        if grid is None:
+            return {}
+        return {key: self.__get(key)
+                for key, distance in grid.near(latitude, longitude, km)}
+
+    def within(self, cls, south, west, north, east):
+        """Return the objects of a class inside a bounding box.
+
+        Only the classes listing their coordinates in _geo can be
+        searched.
+
+        Args:
+            cls (type or str): The class of the objects to find.
+            south (float): The lowest latitude of the box.
+            west (float): The westmost longitude of the box, greater than
+                east if the box crosses the 180th meridian.
+            north (float): The highest latitude of the box.
+            east (float): The eastmost longitude of the box.
+        """
+        self.__sync()
+        self.__build(self.__name(cls))
+        grid = FileStorage.__geo.get(self.__name(cls))
+        if grid is None:
+            return {}
+        return {key: self.__get(key)
+                for key in grid.within(south, west, north, east)}
+
+    def having(self, cls, attr, all_of=(), any_of=()):
+        """Return the objects of a class whose list attribute holds items.
+
+        Attributes the model lists in _bitmaps are matched on their
+        BitmapIndex, the others on each object.
+
+        Args:
+            cls (type or str): The class of the objects to find.
+            attr (str): The name of the list attribute.
+            all_of (list): The items the list must all hold.
+            any_of (list): The items the list must hold at least one of,
+                if any.
+        """
+        self.__sync()
+        cls_name = self.__name(cls)
+        self.__build(cls_name)
+        index = FileStorage.__bitmaps.get(cls_name, {}).get(attr)
+        if index is not None:
+            keys = index.select(all_of, any_of)
+        else:
+            keys = []
+            for key in FileStorage.__by_class.get(cls_name, ()):
+                items = self.__attr(key, attr)
+                if (type(items) in (list, tuple) and
+                        all(item in items for item in all_of) and
+                        (len(any_of) == 0 or
+                         any(item in items for item in any_of))):
+                    keys.append(key)
+        return {key: self.__get(key) for key in keys}
 
-    def all(self):
-        """Return the dictionary __objects."""
-        return FileStorage.__objects
+    def order(self, cls, attr, low=None, high=None, reverse=False,
+              offset=0, limit=None):
+        """Return the objects of a class sorted by a numeric attribute.
+
+        Objects whose value isn't a number are left out. Attributes the
+        model declares with an int or float default are read from their
+        SortedIndex, the others are sorted on each call.
+
+        Args:
+            cls (type or str): The class of the objects to return.
+            attr (str): The name of the attribute to sort by.
+            low (float): The lowest value to return, None for no bound.
+            high (float): The highest value to return, None for no bound.
+            reverse (bool): Whether to return the highest values first.
+            offset (int): The number of objects to skip.
+            limit (int): The maximum number of objects to return.
+        """
+        self.__sync()
+        cls_name = self.__name(cls)
+        self.__build(cls_name)
+        index = FileStorage.__sorted.get(cls_name, {}).get(attr)
+        if index is None:
+            index = SortedIndex(attr)
+            for key in FileStorage.__by_class.get(cls_name, ()):
+                index.add(key, self.__attr(key, attr))
+        keys = index.range(low, high, reverse, offset, limit)
+        return {key: self.__get(key) for key in keys}
+
+    def search(self, cls, query, limit=None):
+        """Return the objects of a class matching words, best match first.
+
+        The objects are ranked with BM25 on the words of their text
+        attributes. Only the classes listing those attributes in _text
+        can be searched.
+
+        Args:
+            cls (type or str): The class of the objects to find.
+            query (str): The words to look for.
+            limit (int): The maximum number of objects to return.
+        """
+        self.__sync()
+        self.__build(self.__name(cls))
+        index = FileStorage.__text.get(self.__name(cls))
+        if index is None:
+            return {}
+        return {key: self.__get(key)
+                for key, score in index.search(query, limit)}
+
+    def stats(self, cls, attr, value=None):
+        """Return aggregates of the objects of a class grouped by attr.
+
+        Each aggregate is a dictionary as returned by GroupStats.get():
+        the number of objects and the count, sum, min, max and avg of
+        each numeric attribute the model declares. Attributes the model
+        names in _aggregates are read from their GroupStats, those it
+        maps in _rollups combine the groups of their foreign key, and the
+        others are grouped on each call.
+
+        Args:
+            cls (type or str): The class of the objects to aggregate.
+            attr (str): The name of the grouping attribute.
+            value (any): Only return the aggregates of this group.
+
+        Returns:
+            The aggregates of value, or a dictionary of the aggregates of
+            each group having objects.
+        """
+        self.__sync()
+        cls_name = self.__name(cls)
+        rollup = getattr(classes.get(cls_name), "_rollups", {}).get(attr)
+        if rollup is None:
+            index = self.__group_stats(cls_name, attr)
+            if value is not None:
+                return index.get(value)
+            return {group: index.get(group) for group in index.groups()}
+        fk, parent = rollup
+        index = self.__group_stats(cls_name, fk)
+        if value is not None:
+            keys = self.__find(parent, {attr: value})
+            return index.combine(key.split(".", 1)[1] for key in keys)
+        rolled = {}
+        for group in index.groups():
+            key = "{}.{}".format(parent, group)
+            if key in FileStorage.__objects or key in FileStorage.__unloaded:
+                rolled.setdefault(self.__attr(key, attr), []).append(group)
+        return {group: index.combine(groups)
+                for group, groups in rolled.items()}
+
+    def __group_stats(self, cls_name, attr):
+        """Return the GroupStats of the objects of cls_name by attr."""
+        self.__build(cls_name)
+        index = FileStorage.__aggregates.get(cls_name, {}).get(attr)
+        if index is None:
+            fields = self.__numeric_attrs(classes.get(cls_name))
+            index = GroupStats(attr, fields)
+            for key in FileStorage.__by_class.get(cls_name, ()):
+                index.add(key, self.__attr(key, attr),
+                          {field: self.__attr(key, field) for field in fields})
+        return index
+
+    def get(self, cls, id):
+        """Return the object of a class with the given id, or None.
+
+        Args:
+            cls (type or str): The class of the object.
+            id (str): The id of the object.
+        """
+        self.__sync()
+        key = "{}.{}".format(self.__name(cls), id)
+        if key in FileStorage.__objects or key in FileStorage.__unloaded:
+            return self.__get(key)
+        return None
 
     def new(self, obj):
         """Set in __objects obj with key <obj_class_name>.id"""
-        ocname = obj._class.name_
-        FileStorage.__objects["{}.{}".format(ocname, obj.id)] = obj
+        self.__writable()
+        ocname = obj.__class__.__name__
+        key = "{}.{}".format(ocname, obj.id)
+        self.__sync()
+        FileStorage.__objects[key] = obj
+        FileStorage.__unloaded.discard(key)
+        self.__index(key)
+        FileStorage.__dirty.add(key)
+
+    def delete(self, obj=None, cascade=False):
+        """Delete obj from __objects if it's inside.
+
+        Args:
+            obj (BaseModel): The object to delete.
+            cascade (bool): Whether to delete the objects depending on obj
+                as well, following the _children of each model. They're
+                removed from the indexes in one batch and written by the
+                next commit(), without being instantiated.
+        """
+        self.__writable()
+        if obj is None:
+            return
+        key = "{}.{}".format(obj.__class__.__name__, obj.id)
+        self.__sync()
+        if not cascade:
+            if self.__drop(key):
+                FileStorage.__dirty.add(key)
+            return
+        keys = self.__closure(key)
+        by_class = {}
+        for key in keys:
+            by_class.setdefault(key.split(".", 1)[0], []).append(key)
+        for cls_name, cls_keys in by_class.items():
+            for index in FileStorage.__sorted.get(cls_name, {}).values():
+                index.remove_many(cls_keys)
+        for key in keys:
+            if self.__drop(key):
+                FileStorage.__dirty.add(key)
+
+    def __closure(self, key):
+        """Return key and the keys of the objects depending on it.
+
+        A model lists the classes depending on it in _children, each with
+        the attribute holding the id of their parent, which is looked up
+        through find() indexes, recursively.
+        """
+        keys = [key]
+        seen = {key}
+        for key in keys:
+            cls_name, id = key.split(".", 1)
+            children = getattr(classes.get(cls_name), "_children", ())
+            for child, attr in children:
+                for child_key in self.__find(child, {attr: id}):
+                    if child_key not in seen:
+                        seen.add(child_key)
+                        keys.append(child_key)
+        return keys
 
     def save(self):
-        """Serialize __objects to the JSON file __file_path."""
-        odict = FileStorage.__objects
-        objdict = {obj: odict[obj].to_dict() for obj in odict.keys()}
-        with open(FileStorage.__file_path, "w") as f:
-            json.dump(objdict, f)
+        """Persist every loaded object, or queue it.
+
+        Objects changed without being passed to new() are saved as well,
+        at the cost of serializing each of them again. Only the objects
+        whose dictionary changed are written to the journal.
+        """
+        self.__writable()
+        self.__sync()
+        FileStorage.__dirty.update(FileStorage.__objects)
+        self.commit()
+
+    def commit(self):
+        """Persist the changes reported through new() and delete().
+
+        The changes are written right away unless saves are coalesced and
+        neither the batch size nor the batch window is reached yet, in
+        which case they wait for a later save(), commit() or flush().
+        """
+        self.__writable()
+        now = time.monotonic()
+        if FileStorage.__pending_saves == 0:
+            FileStorage.__pending_since = now
+        FileStorage.__pending_saves += 1
+        window = FileStorage.__batch_window
+        if (FileStorage.__pending_saves >= FileStorage.__batch_size or
+                (window > 0 and now - FileStorage.__pending_since >= window)):
+            self.__flush()
+
+    def flush(self):
+        """Write the changes of the pending saves, if any.
+
+        Also syncs the journal records a group commit left unsynced and
+        waits for the background writer to finish every queued write.
+        """
+        self.__flush()
+        if FileStorage.__durability == "group":
+            self.__submit(self.__sync_journal, self.__journal_path())
+        if FileStorage.__writer is not None:
+            FileStorage.__queue.join()
+        self.__raise()
+
+    def __flush(self):
+        """Write or queue the changes of the pending saves, if any.
+
+        Appends to the journal when journaling is enabled, otherwise
+        serializes __objects to the file __file_path.
+        """
+        self.__raise()
+        if FileStorage.__pending_saves == 0 and not FileStorage.__failed:
+            return
+        FileStorage.__pending_saves = 0
+        if FileStorage.__journaling and not FileStorage.__failed:
+            self.__append()
+            if FileStorage.__journal_size < FileStorage.__compact_after:
+                return
+        self.__compact()
+
+    def __submit(self, func, *args):
+        """Call func with args, in the background writer if enabled."""
+        if not FileStorage.__background:
+            try:
+                func(*args)
+            except BaseException:
+                FileStorage.__failed = True
+                raise
+            return
+        if FileStorage.__writer is None:
+            FileStorage.__queue = queue.Queue(FileStorage.__queue_size)
+            FileStorage.__writer = threading.Thread(
+                target=self.__run, args=(FileStorage.__queue,), daemon=True)
+            FileStorage.__writer.start()
+        FileStorage.__queue.put((func, args))
+
+    @staticmethod
+    def __run(tasks):
+        """Run the writes queued in tasks, forever."""
+        while True:
+            func, args = tasks.get()
+            try:
+                func(*args)
+            except Exception as e:
+                FileStorage.__failed = True
+                FileStorage.__error = e
+            finally:
+                tasks.task_done()
+
+    def __raise(self):
+        """Raise the error of a failed background write, if any."""
+        error = FileStorage.__error
+        if error is not None:
+            FileStorage.__error = None
+            raise error
 
     def reload(self):
-        """Deserialize the JSON file __file_path to __objects, if it exists."""
+        """Deserialize the file __file_path to __objects, if it exists.
+
+        JSON snapshots are decoded one object at a time, or in parallel
+        chunks with HBNB_RELOAD_WORKERS above 1, and the records found in
+        the journal are replayed on top of the snapshot.
+
+        Once every shard is loaded into empty storage, the shards match
+        their files, so only those the journal changes are stale.
+        """
+        if FileStorage.__writer is not None:
+            FileStorage.__queue.join()
+        self.__raise()
+        paths = self.__snapshot_paths()
+        self.__sync()
+        empty = FileStorage.__size == 0
         try:
-            with open(FileStorage.__file_path) as f:
-                objdict = json.load(f)
-                for o in objdict.values():
-                    cls_name = o["_class_"]
-                    del o["_class_"]
-                    self.new(eval(cls_name)(**o))
+            for path in paths:
+                FileStorage.__text_loaded = empty and self.__load_text(path)
+                try:
+                    self.__load_file(path)
+                except FileNotFoundError:
+                    pass
+        finally:
+            FileStorage.__text_loaded = False
+        if empty and FileStorage.__sharding:
+            FileStorage.__stale_shards = set()
+        self.__replay()
+
+    def __snapshot_paths(self):
+        """Return the paths of the snapshot files, in loading order."""
+        if FileStorage.__sharding:
+            return [self.__shard_path(s) for s in sorted(self.__shards())]
+        return [FileStorage.__file_path]
+
+    def __signature(self, path):
+        """Return the path, size and mtime of the file at path, if any."""
+        try:
+            st = os.stat(path)
         except FileNotFoundError:
+            return []
+        return [[path, st.st_size, st.st_mtime_ns]]
+
+    def __load_text(self, path):
+        """Read the word counts written with the snapshot file at path.
+
+        They're only used when the snapshot file and the _text
+        attributes of each model are unchanged since they were written,
+        and are added to the text indexes before the objects of the file
+        are loaded.
+
+        Returns:
+            Whether the word counts were read.
+        """
+        if FileStorage.__mmap:
+            return False
+        try:
+            with open(self.__text_path(path)) as f:
+                data = json.load(f)
+            if data["snapshot"] != self.__signature(path):
+                return False
+            indexes = data["indexes"]
+            if indexes.keys() != self.__text_attrs().keys():
+                return False
+            for cls_name, attrs in self.__text_attrs().items():
+                if indexes[cls_name]["attrs"] != list(attrs):
+                    return False
+                if type(indexes[cls_name]["counts"]) is not dict:
+                    return False
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        for cls_name, attrs in self.__text_attrs().items():
+            if cls_name not in FileStorage.__text:
+                FileStorage.__text[cls_name] = TextIndex(attrs)
+            for key, counts in indexes[cls_name]["counts"].items():
+                FileStorage.__text[cls_name].add_counts(key, counts)
+        return True
+
+    def __text_attrs(self):
+        """Return the _text attributes of each class that has some."""
+        return {cls_name: tuple(cls._text)
+                for cls_name, cls in classes.items()
+                if len(getattr(cls, "_text", ())) != 0}
+
+    def __load_file(self, path):
+        """Load the objects of the snapshot at path.
+
+        The snapshot is decoded by __reload_workers processes when there
+        are several and the format supports it.
+        """
+        serializer = FileStorage.__serializer
+        if FileStorage.__mmap and not serializer.binary:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size > 0:
+                    buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    try:
+                        if has_lines(buf):
+                            self.__map(buf)
+                            return
+                    except ValueError:
+                        pass
+                    buf.close()
+        workers = FileStorage.__reload_workers
+        if workers > 1 and hasattr(serializer, "load_parallel"):
+            pairs = serializer.load_parallel(path, workers)
+            if pairs is not None:
+                for key, o in pairs:
+                    self.__load(key, o)
+                return
+        with open(path, "rb" if serializer.binary else "r") as f:
+            for key, o in serializer.load(f):
+                self.__load(key, o)
+
+    def __map(self, buf):
+        """Index the objects of the mapped snapshot buf without decoding.
+
+        Raises:
+            ValueError: If buf isn't one entry per line, before any object
+                is indexed.
+        """
+        self.__sync()
+        for key, start, end in list(line_offsets(buf)):
+            FileStorage.__objects.pop(key, None)
+            FileStorage.__cache.pop(key, None)
+            FileStorage.__offsets[key] = (buf, start, end)
+            FileStorage.__unloaded.add(key)
+            self.__index(key)
+
+    def __cached(self, key):
+        """Return the serialized dictionary of an unloaded key."""
+        o = FileStorage.__cache.get(key)
+        if o is None:
+            buf, start, end = FileStorage.__offsets[key]
+            o = json.loads(buf[start:end])
+        return o
+
+    def __writable(self):
+        """Raise if storage is a read-only mapped snapshot."""
+        if FileStorage.__mmap:
+            raise io.UnsupportedOperation("storage is read-only")
+
+    def __journal_path(self):
+        """Return the path of the journal for __file_path."""
+        return FileStorage.__file_path + ".log"
+
+    @staticmethod
+    def __text_path(path):
+        """Return the path of the word counts of the snapshot at path."""
+        return path + ".text"
+
+    def __shard(self, key):
+        """Return the name of the shard key is stored in."""
+        if FileStorage.__sharding == "class":
+            return key.split(".", 1)[0]
+        return str(zlib.crc32(key.encode()) % FileStorage.__shard_count)
+
+    def __shards(self):
+        """Return the names of every shard that may exist."""
+        if FileStorage.__sharding == "class":
+            return set(classes) | set(FileStorage.__by_class)
+        return {str(i) for i in range(FileStorage.__shard_count)}
+
+    def __shard_path(self, shard):
+        """Return the path of the snapshot of a shard."""
+        root, ext = os.path.splitext(FileStorage.__file_path)
+        return "{}.{}{}".format(root, shard, ext)
+
+    @staticmethod
+    def __name(cls):
+        """Return the class name of cls, which may already be a name."""
+        return cls if isinstance(cls, str) else cls.__name__
+
+    def __sync(self):
+        """Rebuild the indexes if __objects was replaced or edited."""
+        if FileStorage.__indexed is not FileStorage.__objects:
+            FileStorage.__indexed = FileStorage.__objects
+            FileStorage.__by_class = {}
+            FileStorage.__attr_indexes = {}
+            FileStorage.__columns = {}
+            FileStorage.__geo = {}
+            FileStorage.__bitmaps = {}
+            FileStorage.__sorted = {}
+            FileStorage.__aggregates = {}
+            FileStorage.__text = {}
+            FileStorage.__unloaded = set()
+            FileStorage.__deferred = {}
+            FileStorage.__cache = {}
+            FileStorage.__offsets = {}
+            FileStorage.__size = 0
+            FileStorage.__stale_shards = None
+            for key in FileStorage.__objects:
+                self.__index(key)
+        elif (len(FileStorage.__objects) + len(FileStorage.__unloaded) !=
+              FileStorage.__size):
+            self.__reconcile()
+
+    def __reconcile(self):
+        """Index the keys added to __objects and drop the deleted ones."""
+        indexed = set().union(*FileStorage.__by_class.values())
+        stored = FileStorage.__objects.keys() | FileStorage.__unloaded
+        for key in indexed - stored:
+            FileStorage.__cache.pop(key, None)
+            self.__unindex(key)
+            FileStorage.__dirty.add(key)
+        for key in stored - indexed:
+            self.__index(key)
+            FileStorage.__dirty.add(key)
+
+    def __class(self, key):
+        """Return the class of the object stored under key."""
+        obj = FileStorage.__objects.get(key)
+        if obj is not None:
+            return type(obj)
+        return classes[self.__cached(key)["__class__"]]
+
+    def __attr(self, key, attr):
+        """Return the value of an attribute of the object under key."""
+        obj = FileStorage.__objects.get(key)
+        if obj is not None:
+            return getattr(obj, attr, None)
+        o = self.__cached(key)
+        if attr in o:
+            return o[attr]
+        return getattr(self.__class(key), attr, None)
+
+    def __get(self, key):
+        """Return the object stored under key, creating it if needed."""
+        obj = FileStorage.__objects.get(key)
+        if obj is None:
+            obj = self.__materialize(key)
+        return obj
+
+    def __materialize(self, key):
+        """Instantiate the cached dictionary of key into __objects.
+
+        The dictionary is dropped from the cache so that a loaded object
+        isn't held twice; the next snapshot serializes it again.
+        """
+        o = self.__cached(key)
+        FileStorage.__cache.pop(key, None)
+        FileStorage.__offsets.pop(key, None)
+        obj = classes[o["__class__"]](**o)
+        FileStorage.__objects[key] = obj
+        FileStorage.__unloaded.discard(key)
+        return obj
+
+    def __index(self, key):
+        """Add key to the indexes, or refresh its indexed values."""
+        cls_name = key.split(".", 1)[0]
+        keys = FileStorage.__by_class.setdefault(cls_name, set())
+        if key not in keys:
+            keys.add(key)
+            FileStorage.__size += 1
+        if FileStorage.__mmap:
+            return
+        cls = classes.get(cls_name)
+        attrs = getattr(cls, "_indexes", ())
+        if len(attrs) != 0:
+            indexes = FileStorage.__attr_indexes.setdefault(cls_name, {})
+            for attr in attrs:
+                if attr not in indexes:
+                    indexes[attr] = HashIndex(attr)
+                indexes[attr].add(key, self.__attr(key, attr))
+        attrs = getattr(cls, "_columns", ())
+        if len(attrs) != 0:
+            if cls_name not in FileStorage.__columns:
+                FileStorage.__columns[cls_name] = ColumnStore(attrs)
+            FileStorage.__columns[cls_name].set(
+                key, {attr: self.__attr(key, attr) for attr in attrs})
+        deferred = FileStorage.__deferred.get(cls_name)
+        if deferred is not None:
+            deferred[key] = not FileStorage.__text_loaded
+        else:
+            self.__index_more(key, not FileStorage.__text_loaded)
+
+    def __index_more(self, key, text):
+        """Add key to the sorted, geo, aggregate, bitmap and text indexes.
+
+        Args:
+            key (str): The key of the object.
+            text (bool): Whether to add key to the text index as well.
+        """
+        cls_name = key.split(".", 1)[0]
+        cls = classes.get(cls_name)
+        sorted_indexes = FileStorage.__sorted.setdefault(cls_name, {})
+        for attr in self.__numeric_attrs(cls):
+            if attr not in sorted_indexes:
+                sorted_indexes[attr] = SortedIndex(attr)
+            sorted_indexes[attr].add(key, self.__attr(key, attr))
+        attrs = getattr(cls, "_geo", ())
+        if len(attrs) != 0:
+            if cls_name not in FileStorage.__geo:
+                FileStorage.__geo[cls_name] = GridIndex(attrs)
+            FileStorage.__geo[cls_name].add(
+                key, *(self.__attr(key, attr) for attr in attrs))
+        attrs = getattr(cls, "_aggregates", ())
+        if len(attrs) != 0:
+            values = {field: self.__attr(key, field)
+                      for field in self.__numeric_attrs(cls)}
+            aggregates = FileStorage.__aggregates.setdefault(cls_name, {})
+            for attr in attrs:
+                if attr not in aggregates:
+                    aggregates[attr] = GroupStats(
+                        attr, self.__numeric_attrs(cls))
+                aggregates[attr].add(key, self.__attr(key, attr), values)
+        attrs = getattr(cls, "_bitmaps", ())
+        if len(attrs) != 0:
+            bitmaps = FileStorage.__bitmaps.setdefault(cls_name, {})
+            for attr in attrs:
+                if attr not in bitmaps:
+                    bitmaps[attr] = BitmapIndex(attr)
+                bitmaps[attr].add(key, self.__attr(key, attr))
+        attrs = getattr(cls, "_text", ())
+        if len(attrs) != 0 and text:
+            if cls_name not in FileStorage.__text:
+                FileStorage.__text[cls_name] = TextIndex(attrs)
+            values = (self.__attr(key, attr) for attr in attrs)
+            FileStorage.__text[cls_name].add(
+                key, " ".join(v for v in values if type(v) is str))
+
+    def __build(self, cls_name):
+        """Add the deferred keys of cls_name to their indexes, if any."""
+        keys = FileStorage.__deferred.pop(cls_name, None)
+        if keys is not None:
+            for key, text in keys.items():
+                self.__index_more(key, text)
+
+    def __numeric_attrs(self, cls):
+        """Return the attributes cls declares with an int or float default."""
+        if cls is None:
+            return ()
+        attrs = FileStorage.__numeric.get(cls)
+        if attrs is None:
+            model = getattr(cls, "_model", cls)
+            attrs = tuple(name for name in dir(model)
+                          if not name.startswith("_") and
+                          type(getattr(model, name)) in (int, float))
+            FileStorage.__numeric[cls] = attrs
+        return attrs
+
+    def __unindex(self, key):
+        """Remove key from the indexes."""
+        cls_name = key.split(".", 1)[0]
+        keys = FileStorage.__by_class.get(cls_name)
+        if keys is not None and key in keys:
+            keys.remove(key)
+            FileStorage.__size -= 1
+        FileStorage.__deferred.get(cls_name, {}).pop(key, None)
+        for index in FileStorage.__attr_indexes.get(cls_name, {}).values():
+            index.remove(key)
+        if cls_name in FileStorage.__columns:
+            FileStorage.__columns[cls_name].remove(key)
+        if cls_name in FileStorage.__geo:
+            FileStorage.__geo[cls_name].remove(key)
+        for index in FileStorage.__sorted.get(cls_name, {}).values():
+            index.remove(key)
+        for index in FileStorage.__bitmaps.get(cls_name, {}).values():
+            index.remove(key)
+        for index in FileStorage.__aggregates.get(cls_name, {}).values():
+            index.remove(key)
+        if cls_name in FileStorage.__text:
+            FileStorage.__text[cls_name].remove(key)
+
+    def __drop(self, key):
+        """Remove key from __objects and the indexes, if it's inside."""
+        if key in FileStorage.__unloaded:
+            FileStorage.__unloaded.discard(key)
+        elif FileStorage.__objects.pop(key, None) is None:
+            return False
+        FileStorage.__cache.pop(key, None)
+        FileStorage.__offsets.pop(key, None)
+        self.__unindex(key)
+        return True
+
+    def __load(self, key, o):
+        """Store the serialized object o under key.
+
+        The instance is created right away unless lazy loading is enabled.
+        """
+        self.__sync()
+        FileStorage.__cache[key] = o
+        FileStorage.__offsets.pop(key, None)
+        if FileStorage.__lazy or FileStorage.__mmap:
+            cls_name = key.split(".", 1)[0]
+            if len(FileStorage.__by_class.get(cls_name, ())) == 0:
+                FileStorage.__deferred.setdefault(cls_name, {})
+            FileStorage.__objects.pop(key, None)
+            FileStorage.__unloaded.add(key)
+        else:
+            self.__materialize(key)
+        self.__index(key)
+
+    def __serialize(self):
+        """Refresh the cache for the dirty keys and return the changed ones.
+
+        A dirty object whose dictionary equals its cached one is unchanged.
+        Changed objects are indexed again, in case they were edited
+        without being passed to new().
+        """
+        self.__sync()
+        odict = FileStorage.__objects
+        cache = FileStorage.__cache
+        dirty = FileStorage.__dirty
+        FileStorage.__dirty = set()
+        changed = set()
+        for key in dirty:
+            if key in odict:
+                o = odict[key].to_dict()
+                if cache.get(key) != o:
+                    cache[key] = o
+                    changed.add(key)
+                    self.__index(key)
+            elif key not in FileStorage.__unloaded:
+                cache.pop(key, None)
+                changed.add(key)
+        if FileStorage.__sharding and FileStorage.__stale_shards is not None:
+            FileStorage.__stale_shards.update(map(self.__shard, changed))
+        return changed
+
+    def __append(self):
+        """Append one journal record per dirty key."""
+        cache = FileStorage.__cache
+        dirty = self.__serialize()
+        if len(dirty) == 0:
             return
+        lines = []
+        for key in dirty:
+            if key in cache:
+                record = ["set", key, cache[key]]
+            else:
+                record = ["del", key]
+            lines.append(json.dumps(record) + "\n")
+        FileStorage.__journal_size += len(lines)
+        self.__submit(self.__write_journal, self.__journal_path(),
+                      "".join(lines), len(lines))
+
+    def __write_journal(self, path, text, count):
+        """Append the text of count journal records to path.
+
+        Unless durability is "none", the directory is synced when the
+        journal is created, so that the file itself survives a crash.
+        """
+        created = not os.path.exists(path)
+        with open(path, "a") as f:
+            f.write(text)
+            if self.__commit(count):
+                f.flush()
+                os.fsync(f.fileno())
+        if created and FileStorage.__durability != "none":
+            self.__sync_directory(path)
+
+    def __sync_journal(self, path):
+        """Sync the journal at path if some records are unsynced."""
+        if FileStorage.__unsynced == 0:
+            return
+        with open(path, "a") as f:
+            os.fsync(f.fileno())
+        FileStorage.__unsynced = 0
+        FileStorage.__synced_at = time.monotonic()
+
+    def __commit(self, count):
+        """Return whether count new journal records must be synced now."""
+        durability = FileStorage.__durability
+        if durability == "fsync":
+            return True
+        if durability != "group":
+            return False
+        FileStorage.__unsynced += count
+        now = time.monotonic()
+        if (FileStorage.__unsynced < FileStorage.__group_size and
+                now - FileStorage.__synced_at < FileStorage.__group_window):
+            return False
+        FileStorage.__unsynced = 0
+        FileStorage.__synced_at = now
+        return True
+
+    def __compact(self):
+        """Rewrite the snapshot and discard the journal it supersedes."""
+        self.__serialize()
+        if FileStorage.__sharding:
+            snapshots = self.__stale_snapshots()
+        else:
+            odict = FileStorage.__objects
+            cache = FileStorage.__cache
+            for key in odict.keys() - cache.keys():
+                cache[key] = odict[key].to_dict()
+            objdict = {key: cache[key] for key in odict.keys()}
+            for key in FileStorage.__unloaded:
+                objdict[key] = cache[key]
+            snapshots = {FileStorage.__file_path: objdict}
+        FileStorage.__journal_size = 0
+        FileStorage.__failed = False
+        self.__submit(self.__write_snapshots, snapshots,
+                      self.__text_counts(snapshots), self.__journal_path())
+
+    def __text_counts(self, snapshots):
+        """Return the text indexes of the objects of each snapshot.
+
+        Returns:
+            The attributes and word counts of each class with _text, by
+            snapshot path, or None while some objects aren't in the text
+            indexes yet.
+        """
+        attrs = self.__text_attrs()
+        if any(any(FileStorage.__deferred.get(cls_name, {}).values())
+               for cls_name in attrs):
+            return None
+        texts = {}
+        for path, objdict in snapshots.items():
+            keys = {cls_name: [] for cls_name in attrs}
+            for key in objdict:
+                cls_keys = keys.get(key.split(".", 1)[0])
+                if cls_keys is not None:
+                    cls_keys.append(key)
+            texts[path] = {}
+            for cls_name, cls_attrs in attrs.items():
+                index = FileStorage.__text.get(cls_name)
+                texts[path][cls_name] = {
+                    "attrs": list(cls_attrs),
+                    "counts": {} if index is None else
+                    index.counts(keys[cls_name])}
+        return texts
+
+    def __stale_snapshots(self):
+        """Return the dictionaries of the shards to rewrite, by path."""
+        stale = FileStorage.__stale_shards
+        if stale is None or FileStorage.__failed:
+            stale = self.__shards()
+        FileStorage.__stale_shards = set()
+        odict = FileStorage.__objects
+        cache = FileStorage.__cache
+        shards = {shard: {} for shard in stale}
+        for cls_name, keys in FileStorage.__by_class.items():
+            if FileStorage.__sharding == "class" and cls_name not in shards:
+                continue
+            for key in keys:
+                objdict = shards.get(self.__shard(key))
+                if objdict is None:
+                    continue
+                if key not in cache:
+                    cache[key] = odict[key].to_dict()
+                objdict[key] = cache[key]
+        return {self.__shard_path(s): shards[s] for s in shards}
+
+    def __write_snapshots(self, snapshots, texts, journal_path):
+        """Replace the snapshots and remove the journal they cover.
+
+        The text indexes of each snapshot are written next to it along
+        with its size and mtime, which reload() checks before using them.
+        They're never synced: a text index lost in a crash no longer
+        matches its snapshot and is rebuilt by reload().
+
+        Args:
+            snapshots (dict): The dictionary of objects of each snapshot,
+                by path. The file of an empty shard is removed instead.
+            texts (dict): The text indexes of each snapshot, by path, as
+                returned by __text_counts().
+            journal_path (str): The path of the journal.
+        """
+        for path, objdict in snapshots.items():
+            if len(objdict) == 0 and FileStorage.__sharding:
+                for name in (path, self.__text_path(path)):
+                    try:
+                        os.remove(name)
+                    except FileNotFoundError:
+                        pass
+                continue
+            self.__write(path, objdict)
+            if texts is not None:
+                data = {"snapshot": self.__signature(path),
+                        "indexes": texts[path]}
+                self.__replace(self.__text_path(path),
+                               lambda f: json.dump(data, f), False, False)
+        try:
+            os.remove(journal_path)
+        except FileNotFoundError:
+            pass
+        else:
+            if FileStorage.__durability != "none":
+                self.__sync_directory(journal_path)
+        FileStorage.__unsynced = 0
+
+    def __write(self, path, objdict):
+        """Atomically replace the snapshot at path with objdict."""
+        serializer = FileStorage.__serializer
+        self.__replace(path, lambda f: serializer.dump(objdict, f),
+                       serializer.binary, FileStorage.__durability != "none")
+
+    def __replace(self, path, dump, binary, durable):
+        """Atomically replace the file at path with what dump writes.
+
+        Args:
+            path (str): The path of the file.
+            dump (function): Writes the content to the file it's given.
+            binary (bool): Whether the file is opened in binary.
+            durable (bool): Whether the file is synced to disk.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".",
+                                   suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "wb" if binary else "w") as f:
+                dump(f)
+                if durable:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.chmod(tmp, 0o666 & ~_umask)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+        if durable:
+            self.__sync_directory(path)
+
+    @staticmethod
+    def __sync_directory(path):
+        """Sync the directory of path, making its entries durable."""
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def __replay(self):
+        """Apply the records of the journal to __objects, if it exists.
+
+        A last record without its newline was torn by a crash while being
+        appended, and is ignored.
+        """
+        count = 0
+        try:
+            with open(self.__journal_path()) as f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        break
+                    record = json.loads(line)
+                    if (FileStorage.__sharding and
+                            FileStorage.__stale_shards is not None):
+                        FileStorage.__stale_shards.add(
+                            self.__shard(record[1]))
+                    if record[0] == "set":
+                        self.__load(record[1], record[2])
+                    else:
+                        self.__drop(record[1])
+                    count += 1
+        except FileNotFoundError:
+            pass
+        FileStorage.__journal_size = count
@@ -0,0 +1,696 @@
+#!/usr/bin/python3
+"""Defines the secondary indexes maintained by the storage engines."""
+import math
+import re
+from array import array
+from bisect import bisect_left, bisect_right, insort
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+EARTH_RADIUS = 6371.0088
+"""float: The mean radius of the Earth, in km."""
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Return the great-circle distance between two points, in km."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) *
+         math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+
+class HashIndex:
+    """Represent an index of the keys of objects by an attribute value.
+
+    Attributes:
+        attr (str): The name of the indexed attribute.
+    """
+
+    def __init__(self, attr):
+        """Initialize a new HashIndex.
+
+        Args:
+            attr (str): The name of the indexed attribute.
+        """
+        self.attr = attr
+        self.__keys = {}
+        self.__values = {}
+
+    def add(self, key, value):
+        """Index key under value, replacing its previous value if any."""
+        if key in self.__values:
+            if self.__values[key] == value:
+                return
+            self.remove(key)
+        self.__values[key] = value
+        self.__keys.setdefault(value, set()).add(key)
+
+    def remove(self, key):
+        """Remove key from the index, if it's inside."""
+        if key not in self.__values:
+            return
+        value = self.__values.pop(key)
+        keys = self.__keys[value]
+        keys.discard(key)
+        if len(keys) == 0:
+            del self.__keys[value]
+
+    def get(self, value):
+        """Return the set of keys indexed under value."""
+        return self.__keys.get(value, set())
+
+
+class BitmapIndex:
+    """Represent an index of the keys of objects by the items of a list.
+
+    Each key gets an ordinal, reused once the key is removed, and each
+    item a bitmap of the ordinals of the keys whose list holds it.
+    Objects holding every item or any of several items are then found
+    with bitwise ANDs and ORs. Like roaring bitmaps, a bitmap is split
+    into chunks of 2 ** chunk_bits ordinals, each a Python int, and only
+    the chunks holding a key are stored, so updating a bitmap doesn't
+    copy all of it. Items that aren't strings or numbers aren't indexed.
+
+    Attributes:
+        attr (str): The name of the indexed attribute.
+        chunk_bits (int): The number of low bits of an ordinal giving its
+            position in its chunk.
+    """
+
+    chunk_bits = 16
+
+    def __init__(self, attr):
+        """Initialize a new BitmapIndex.
+
+        Args:
+            attr (str): The name of the indexed attribute.
+        """
+        self.attr = attr
+        self.__bitmaps = {}
+        self.__ordinals = {}
+        self.__keys = []
+        self.__free = []
+        self.__items = {}
+
+    def __len__(self):
+        """Return the number of indexed keys."""
+        return len(self.__ordinals)
+
+    def add(self, key, items):
+        """Index key under each of items, replacing its previous ones."""
+        if type(items) not in (list, tuple):
+            items = ()
+        items = frozenset(i for i in items if type(i) in (str, int, float))
+        if self.__items.get(key) == items:
+            return
+        self.remove(key)
+        if self.__free:
+            ordinal = self.__free.pop()
+            self.__keys[ordinal] = key
+        else:
+            ordinal = len(self.__keys)
+            self.__keys.append(key)
+        self.__ordinals[key] = ordinal
+        self.__items[key] = items
+        chunk = ordinal >> self.chunk_bits
+        bit = 1 << (ordinal & ((1 << self.chunk_bits) - 1))
+        for item in items:
+            chunks = self.__bitmaps.setdefault(item, {})
+            chunks[chunk] = chunks.get(chunk, 0) | bit
+
+    def remove(self, key):
+        """Remove key from the index, if it's inside."""
+        ordinal = self.__ordinals.pop(key, None)
+        if ordinal is None:
+            return
+        chunk = ordinal >> self.chunk_bits
+        bit = 1 << (ordinal & ((1 << self.chunk_bits) - 1))
+        for item in self.__items.pop(key):
+            chunks = self.__bitmaps[item]
+            bits = chunks[chunk] & ~bit
+            if bits != 0:
+                chunks[chunk] = bits
+            elif len(chunks) > 1:
+                del chunks[chunk]
+            else:
+                del self.__bitmaps[item]
+        self.__keys[ordinal] = None
+        self.__free.append(ordinal)
+
+    def select(self, all_of=(), any_of=()):
+        """Return the keys whose list holds the given items, in order.
+
+        Args:
+            all_of (list): The items the list must all hold.
+            any_of (list): The items the list must hold at least one of,
+                if any.
+        """
+        bitmaps = []
+        for item in set(all_of):
+            if item not in self.__bitmaps:
+                return []
+            bitmaps.append(self.__bitmaps[item])
+        if len(any_of) != 0:
+            merged = {}
+            for item in set(any_of):
+                for chunk, bits in self.__bitmaps.get(item, {}).items():
+                    merged[chunk] = merged.get(chunk, 0) | bits
+            bitmaps.append(merged)
+        if len(bitmaps) == 0:
+            return [key for key in self.__keys if key is not None]
+        bitmaps.sort(key=len)
+        keys = []
+        for chunk, bits in sorted(bitmaps[0].items()):
+            for other in bitmaps[1:]:
+                bits &= other.get(chunk, 0)
+            keys += self.__decode(chunk, bits)
+        return keys
+
+    def __decode(self, chunk, bits):
+        """Return the keys of the ordinals set in bits, in order."""
+        keys = []
+        base = chunk << self.chunk_bits
+        data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+        for i, byte in enumerate(data):
+            while byte:
+                low = byte & -byte
+                keys.append(self.__keys[base + i * 8 + low.bit_length() - 1])
+                byte ^= low
+        return keys
+
+
+class GroupStats:
+    """Represent aggregates of objects grouped by an attribute value.
+
+    Each group keeps its number of objects and, for each numeric field,
+    the sum and the sorted values of the objects whose value is a
+    number, so the count, sum, min, max and average of a field are read
+    without scanning the group. Values added to a group are appended and
+    only sorted the next time the group is read or removed from, so
+    that adding many objects, e.g. on reload, sorts each group once.
+
+    Attributes:
+        attr (str): The name of the grouping attribute.
+        fields (tuple): The names of the aggregated numeric attributes.
+    """
+
+    def __init__(self, attr, fields):
+        """Initialize a new GroupStats.
+
+        Args:
+            attr (str): The name of the grouping attribute.
+            fields (tuple): The names of the aggregated numeric attributes.
+        """
+        self.attr = attr
+        self.fields = tuple(fields)
+        self.__groups = {}
+        self.__keys = {}
+        self.__unsorted = set()
+
+    def __len__(self):
+        """Return the number of grouped keys."""
+        return len(self.__keys)
+
+    def add(self, key, group, values):
+        """Add key to group with values, replacing its previous entry.
+
+        Args:
+            key (str): The key of the object.
+            group (any): The value of the grouping attribute.
+            values (dict): The value of each field for the object.
+        """
+        values = {field: values.get(field) for field in self.fields
+                  if type(values.get(field)) in (int, float)}
+        if self.__keys.get(key) == (group, values):
+            return
+        self.remove(key)
+        self.__keys[key] = (group, values)
+        entry = self.__groups.setdefault(group, {"count": 0, "sums": {},
+                                                 "values": {}})
+        entry["count"] += 1
+        for field, value in values.items():
+            entry["sums"][field] = entry["sums"].get(field, 0) + value
+            entry["values"].setdefault(field, []).append(value)
+        if len(values) != 0:
+            self.__unsorted.add(group)
+
+    def remove(self, key):
+        """Remove key from its group, if it's inside."""
+        if key not in self.__keys:
+            return
+        group, values = self.__keys.pop(key)
+        entry = self.__groups[group]
+        entry["count"] -= 1
+        if entry["count"] == 0:
+            del self.__groups[group]
+            self.__unsorted.discard(group)
+            return
+        self.__sort(group)
+        for field, value in values.items():
+            entry["sums"][field] -= value
+            column = entry["values"][field]
+            del column[bisect_left(column, value)]
+
+    def groups(self):
+        """Return the values of the grouping attribute having objects."""
+        return list(self.__groups)
+
+    def get(self, group):
+        """Return the aggregates of a group, see combine()."""
+        return self.combine((group,))
+
+    def combine(self, groups):
+        """Return the aggregates of the objects of several groups.
+
+        Returns:
+            A dictionary with the number of objects under "count" and,
+            for each field, a dictionary of the count, sum, min, max and
+            avg of the values that are numbers; min, max and avg are None
+            when there are none.
+        """
+        groups = set(groups)
+        for group in groups & self.__unsorted:
+            self.__sort(group)
+        entries = [self.__groups[g] for g in groups if g in self.__groups]
+        stats = {"count": sum(entry["count"] for entry in entries)}
+        for field in self.fields:
+            columns = [entry["values"][field] for entry in entries
+                       if len(entry["values"].get(field, ())) != 0]
+            count = sum(len(column) for column in columns)
+            total = sum(entry["sums"].get(field, 0) for entry in entries)
+            stats[field] = {
+                "count": count,
+                "sum": total,
+                "min": min((c[0] for c in columns), default=None),
+                "max": max((c[-1] for c in columns), default=None),
+                "avg": total / count if count != 0 else None,
+            }
+        return stats
+
+    def __sort(self, group):
+        """Sort the values of group if some were appended since."""
+        if group in self.__unsorted:
+            self.__unsorted.discard(group)
+            for column in self.__groups[group]["values"].values():
+                column.sort()
+
+
+class SortedIndex:
+    """Represent the keys of objects sorted by a numeric attribute.
+
+    Objects whose value isn't a number aren't indexed. Keys with equal
+    values are sorted by key. Added keys are only merged into the sorted
+    entries by the next lookup or removal, so that adding many keys, e.g.
+    on reload, sorts them once instead of inserting each in place.
+
+    Attributes:
+        attr (str): The name of the indexed attribute.
+    """
+
+    def __init__(self, attr):
+        """Initialize a new SortedIndex.
+
+        Args:
+            attr (str): The name of the indexed attribute.
+        """
+        self.attr = attr
+        self.__entries = []
+        self.__added = []
+        self.__values = {}
+
+    def __len__(self):
+        """Return the number of indexed keys."""
+        return len(self.__values)
+
+    def add(self, key, value):
+        """Index key under value, replacing its previous value if any."""
+        if key in self.__values:
+            if self.__values[key] == value:
+                return
+            self.remove(key)
+        if type(value) not in (int, float) or value != value:
+            return
+        self.__values[key] = value
+        self.__added.append((value, key))
+
+    def __merge(self):
+        """Merge the keys added since the last lookup into the entries."""
+        if len(self.__added) == 1:
+            insort(self.__entries, self.__added[0])
+        elif len(self.__added) != 0:
+            self.__entries += self.__added
+            self.__entries.sort()
+        self.__added = []
+
+    def remove(self, key):
+        """Remove key from the index, if it's inside."""
+        if key not in self.__values:
+            return
+        self.__merge()
+        entry = (self.__values.pop(key), key)
+        del self.__entries[bisect_left(self.__entries, entry)]
+
+    def remove_many(self, keys):
+        """Remove several keys from the index in a single pass.
+
+        Removing keys one at a time shifts the entries after each of
+        them, so a large batch is filtered out at once instead.
+        """
+        removed = {key for key in keys if key in self.__values}
+        if len(removed) < 2:
+            for key in removed:
+                self.remove(key)
+            return
+        self.__merge()
+        for key in removed:
+            del self.__values[key]
+        self.__entries = [entry for entry in self.__entries
+                          if entry[1] not in removed]
+
+    def range(self, low=None, high=None, reverse=False, offset=0,
+              limit=None):
+        """Return the keys whose value is between low and high, in order.
+
+        Args:
+            low (float): The lowest value to return, None for no bound.
+            high (float): The highest value to return, None for no bound.
+            reverse (bool): Whether to return the highest values first.
+            offset (int): The number of keys to skip.
+            limit (int): The maximum number of keys to return.
+        """
+        self.__merge()
+        entries = self.__entries
+        first = 0 if low is None else bisect_left(entries, (low,))
+        end = len(entries)
+        if high is not None:
+            end = bisect_right(entries, high, key=lambda entry: entry[0])
+        if not reverse:
+            start = first + offset
+            stop = end if limit is None else min(end, start + limit)
+            return [key for value, key in entries[start:stop]]
+        stop = end - offset
+        start = first if limit is None else max(first, stop - limit)
+        if stop <= start:
+            return []
+        return [key for value, key in reversed(entries[start:stop])]
+
+
+class ColumnStore:
+    """Represent numeric attributes of objects as one array per attribute.
+
+    Values are stored as floats, and values that aren't numbers as NaN,
+    which no range matches. Rows are kept dense: removing a key moves the
+    last row into its place. When numpy is installed, select() compares
+    whole columns at once through views of the arrays.
+
+    Attributes:
+        attrs (tuple): The names of the stored attributes.
+    """
+
+    def __init__(self, attrs):
+        """Initialize a new ColumnStore.
+
+        Args:
+            attrs (iterable): The names of the stored attributes.
+        """
+        self.attrs = tuple(attrs)
+        self.__columns = {attr: array("d") for attr in self.attrs}
+        self.__keys = []
+        self.__rows = {}
+
+    def __len__(self):
+        """Return the number of stored keys."""
+        return len(self.__keys)
+
+    def set(self, key, values):
+        """Store the attribute values of key, replacing its previous ones.
+
+        Args:
+            key (str): The key of the object.
+            values (dict): The value of each attribute in attrs.
+        """
+        row = self.__rows.get(key)
+        if row is None:
+            row = len(self.__keys)
+            self.__rows[key] = row
+            self.__keys.append(key)
+            for column in self.__columns.values():
+                column.append(0.0)
+        for attr, column in self.__columns.items():
+            value = values.get(attr)
+            if type(value) in (int, float):
+                column[row] = value
+            else:
+                column[row] = float("nan")
+
+    def remove(self, key):
+        """Remove key from the store, if it's inside."""
+        row = self.__rows.pop(key, None)
+        if row is None:
+            return
+        last = self.__keys.pop()
+        if last != key:
+            self.__keys[row] = last
+            self.__rows[last] = row
+        for column in self.__columns.values():
+            value = column.pop()
+            if last != key:
+                column[row] = value
+
+    def select(self, ranges):
+        """Return the keys whose values are within every range.
+
+        Args:
+            ranges (dict): The (low, high) inclusive bounds of attributes,
+                where None leaves a bound open.
+        """
+        if len(self.__keys) == 0:
+            return []
+        if numpy is not None:
+            mask = numpy.ones(len(self.__keys), dtype=bool)
+            for attr, (low, high) in ranges.items():
+                column = numpy.frombuffer(self.__columns[attr])
+                if low is not None:
+                    mask &= column >= low
+                if high is not None:
+                    mask &= column <= high
+            return [self.__keys[i] for i in numpy.flatnonzero(mask)]
+        rows = None
+        for attr, (low, high) in ranges.items():
+            if low is None and high is None:
+                continue
+            low = float("-inf") if low is None else low
+            high = float("inf") if high is None else high
+            column = self.__columns[attr]
+            if rows is None:
+                rows = [i for i, v in enumerate(column) if low <= v <= high]
+            else:
+                rows = [i for i in rows if low <= column[i] <= high]
+        if rows is None:
+            return list(self.__keys)
+        return [self.__keys[i] for i in rows]
+
+
+class GridIndex:
+    """Represent an index of the keys of objects by their position.
+
+    The points are grouped in cells of cell degrees of latitude and
+    longitude, so a query only looks at the cells its area overlaps.
+    Objects whose coordinates aren't numbers aren't indexed.
+
+    Attributes:
+        attrs (tuple): The names of the latitude and longitude attributes.
+        cell (float): The size of a cell, in degrees.
+    """
+
+    def __init__(self, attrs, cell=0.5):
+        """Initialize a new GridIndex.
+
+        Args:
+            attrs (tuple): The names of the latitude and longitude
+                attributes.
+            cell (float): The size of a cell, in degrees.
+        """
+        self.attrs = tuple(attrs)
+        self.cell = cell
+        self.__cells = {}
+        self.__points = {}
+
+    def __len__(self):
+        """Return the number of indexed keys."""
+        return len(self.__points)
+
+    def __cell(self, lat, lon):
+        """Return the cell of a point."""
+        return (math.floor(lat / self.cell), math.floor(lon / self.cell))
+
+    def add(self, key, lat, lon):
+        """Index key at a point, replacing its previous point if any."""
+        self.remove(key)
+        if type(lat) not in (int, float) or type(lon) not in (int, float):
+            return
+        cell = self.__cell(lat, lon)
+        self.__points[key] = (lat, lon, cell)
+        self.__cells.setdefault(cell, set()).add(key)
+
+    def remove(self, key):
+        """Remove key from the index, if it's inside."""
+        point = self.__points.pop(key, None)
+        if point is None:
+            return
+        keys = self.__cells[point[2]]
+        keys.discard(key)
+        if len(keys) == 0:
+            del self.__cells[point[2]]
+
+    def within(self, south, west, north, east):
+        """Return the keys whose point is inside a bounding box.
+
+        A box whose west is greater than its east crosses the 180th
+        meridian.
+        """
+        if west > east:
+            return (self.within(south, west, north, 180) +
+                    self.within(south, -180, north, east))
+        i0, j0 = self.__cell(south, west)
+        i1, j1 = self.__cell(north, east)
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > len(self.__cells):
+            cells = [c for c in self.__cells
+                     if i0 <= c[0] <= i1 and j0 <= c[1] <= j1]
+        else:
+            cells = [(i, j) for i in range(i0, i1 + 1)
+                     for j in range(j0, j1 + 1) if (i, j) in self.__cells]
+        keys = []
+        for cell in cells:
+            for key in self.__cells[cell]:
+                lat, lon = self.__points[key][:2]
+                if south <= lat <= north and west <= lon <= east:
+                    keys.append(key)
+        return keys
+
+    def near(self, lat, lon, km):
+        """Return the (key, distance) pairs of the points within km.
+
+        The pairs are sorted by distance, in km, from (lat, lon).
+        """
+        dlat = math.degrees(km / EARTH_RADIUS)
+        south, north = lat - dlat, lat + dlat
+        widest = math.cos(math.radians(min(90, max(abs(south),
+                                                   abs(north)))))
+        if widest <= 0 or km / (EARTH_RADIUS * widest) >= math.pi:
+            west, east = -180, 180
+        else:
+            dlon = math.degrees(km / (EARTH_RADIUS * widest))
+            west, east = lon - dlon, lon + dlon
+            if west < -180:
+                west += 360
+            if east > 180:
+                east -= 360
+        pairs = []
+        for key in self.within(south, west, north, east):
+            distance = haversine(lat, lon, *self.__points[key][:2])
+            if distance <= km:
+                pairs.append((key, distance))
+        pairs.sort(key=lambda pair: pair[1])
+        return pairs
+
+
+def tokenize(text):
+    """Return the lowercase words of text."""
+    return re.findall(r"\w+", text.lower())
+
+
+class TextIndex:
+    """Represent an inverted index of the words of objects' text.
+
+    search() ranks the keys with Okapi BM25.
+
+    Attributes:
+        attrs (tuple): The names of the indexed text attributes.
+        k1 (float): The BM25 term frequency saturation.
+        b (float): The BM25 document length normalization.
+    """
+
+    def __init__(self, attrs, k1=1.2, b=0.75):
+        """Initialize a new TextIndex.
+
+        Args:
+            attrs (tuple): The names of the indexed text attributes.
+            k1 (float): The BM25 term frequency saturation.
+            b (float): The BM25 document length normalization.
+        """
+        self.attrs = tuple(attrs)
+        self.k1 = k1
+        self.b = b
+        self.__postings = {}
+        self.__docs = {}
+        self.__lengths = {}
+        self.__total = 0
+
+    def __len__(self):
+        """Return the number of indexed keys."""
+        return len(self.__docs)
+
+    def add(self, key, text):
+        """Index the words of text under key, replacing its previous ones."""
+        counts = {}
+        for term in tokenize(text):
+            counts[term] = counts.get(term, 0) + 1
+        self.add_counts(key, counts)
+
+    def add_counts(self, key, counts):
+        """Index key with the number of times each word appears in it."""
+        self.remove(key)
+        self.__docs[key] = counts
+        self.__lengths[key] = sum(counts.values())
+        self.__total += self.__lengths[key]
+        for term, count in counts.items():
+            self.__postings.setdefault(term, {})[key] = count
+
+    def remove(self, key):
+        """Remove key from the index, if it's inside."""
+        counts = self.__docs.pop(key, None)
+        if counts is None:
+            return
+        self.__total -= self.__lengths.pop(key)
+        for term in counts:
+            keys = self.__postings[term]
+            del keys[key]
+            if len(keys) == 0:
+                del self.__postings[term]
+
+    def counts(self, keys=None):
+        """Return the word counts of each key, as given to add_counts().
+
+        Args:
+            keys (iterable): Only return the counts of these keys.
+        """
+        if keys is None:
+            return dict(self.__docs)
+        return {key: self.__docs[key] for key in keys if key in self.__docs}
+
+    def search(self, query, limit=None):
+        """Return the (key, score) pairs matching query, best first.
+
+        Args:
+            query (str): The words to look for.
+            limit (int): The maximum number of pairs to return.
+        """
+        count = len(self.__docs)
+        if count == 0:
+            return []
+        average = self.__total / count or 1
+        scores = {}
+        for term in set(tokenize(query)):
+            keys = self.__postings.get(term, {})
+            idf = math.log(1 + (count - len(keys) + 0.5) /
+                           (len(keys) + 0.5))
+            for key, tf in keys.items():
+                norm = self.k1 * (1 - self.b + self.b *
+                                  self.__lengths[key] / average)
+                scores[key] = (scores.get(key, 0) +
+                               idf * tf * (self.k1 + 1) / (tf + norm))
+        pairs = sorted(scores.items(), key=lambda pair: (-pair[1], pair[0]))
+        return pairs if limit is None else pairs[:limit]
@@ -0,0 +1,229 @@
+#!/usr/bin/python3
+"""Defines an incremental reader for the JSON object of a snapshot."""
+import json
+import os
+
+_decoder = json.JSONDecoder()
+_whitespace = " \t\n\r"
+
+
+def iterload(f, chunk_size=65536):
+    """Yield the key/value pairs of the JSON object stored in a file.
+
+    The file is read chunk_size characters at a time and each value is
+    decoded as soon as it's complete, so neither the whole text nor the
+    whole object has to be held in memory.
+
+    Args:
+        f (file): A text file positioned at the start of a JSON object.
+        chunk_size (int): The number of characters to read at once.
+
+    Raises:
+        json.JSONDecodeError: If the file doesn't hold a JSON object.
+    """
+    reader = _Reader(f, chunk_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        reader.pos += 1
+        return
+    while True:
+        key = reader.decode()
+        if type(key) is not str:
+            reader.fail("Expecting property name enclosed in double quotes")
+        reader.expect(":")
+        yield key, reader.decode()
+        if reader.peek() == ",":
+            reader.pos += 1
+        else:
+            reader.expect("}")
+            return
+
+
+def dump_lines(objdict, f):
+    """Write objdict to a text file as a JSON object, one entry per line.
+
+    The entries of the object then start on known line boundaries, which
+    lets line_ranges() split the file into independent chunks.
+
+    Args:
+        objdict (dict): The dictionary to write.
+        f (file): A text file opened for writing.
+    """
+    f.write("{")
+    sep = "\n"
+    for key, value in objdict.items():
+        f.write(sep + json.dumps(key) + ": " + json.dumps(value))
+        sep = ",\n"
+    f.write("\n}\n")
+
+
+def has_lines(f):
+    """Return whether a binary file was written by dump_lines().
+
+    Its first entry line must decode on its own and it must end with the
+    closing line, which rules out JSON indented by json.dump(). The
+    position of the file is moved.
+
+    Args:
+        f (file or mmap.mmap): The file, opened in binary.
+    """
+    f.seek(0)
+    if f.readline() != b"{\n":
+        return False
+    line = f.readline()
+    if line != b"}\n":
+        try:
+            entry = json.loads(b"{" + line.rstrip(b"\n").rstrip(b",") + b"}")
+        except ValueError:
+            return False
+        if len(entry) != 1:
+            return False
+    f.seek(-3, os.SEEK_END)
+    return f.read() == b"\n}\n"
+
+
+def line_ranges(path, parts):
+    """Split a file written by dump_lines() into byte ranges of entries.
+
+    Args:
+        path (str): The path of the file.
+        parts (int): The number of ranges wanted.
+
+    Returns:
+        A list of at most parts (start, end) byte offsets, each range
+        holding whole entry lines, or None if the file wasn't written by
+        dump_lines().
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        if not has_lines(f):
+            return None
+        bounds = [2]
+        for i in range(1, parts):
+            f.seek(max(bounds[-1], size * i // parts))
+            f.readline()
+            if f.tell() >= size:
+                break
+            if f.tell() > bounds[-1]:
+                bounds.append(f.tell())
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def line_offsets(buf):
+    """Yield the key and value byte range of each entry of a buffer.
+
+    Only the keys are decoded; json.loads(buf[start:end]) decodes the
+    value of an entry.
+
+    Args:
+        buf (bytes or mmap.mmap): The content of a file written by
+            dump_lines().
+
+    Raises:
+        ValueError: If buf wasn't written by dump_lines().
+    """
+    if buf[:2] != b"{\n":
+        raise ValueError("not a snapshot with one entry per line")
+    pos = 2
+    while True:
+        end = buf.find(b"\n", pos)
+        if end < 0:
+            raise ValueError("truncated snapshot")
+        if buf[pos:end] == b"}":
+            return
+        sep = buf.find(b'": ', pos, end)
+        if sep < 0:
+            raise ValueError("invalid snapshot entry at {}".format(pos))
+        stop = end - 1 if buf[end - 1:end] == b"," else end
+        yield json.loads(buf[pos:sep + 1]), sep + 3, stop
+        pos = end + 1
+
+
+def read_lines(path, start, end):
+    """Return the entry lines in a byte range as the text of an object.
+
+    Args:
+        path (str): The path of a file written by dump_lines().
+        start (int): The offset of the first line of the range.
+        end (int): The offset just after the last line of the range.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode("utf-8")
+    lines = [line.rstrip(",") for line in text.splitlines()]
+    if len(lines) != 0 and lines[-1] == "}":
+        lines.pop()
+    return "{" + ",".join(lines) + "}"
+
+
+def load_lines(path, start, end):
+    """Return the key/value pairs of the entry lines in a byte range.
+
+    Args:
+        path (str): The path of a file written by dump_lines().
+        start (int): The offset of the first line of the range.
+        end (int): The offset just after the last line of the range.
+
+    Raises:
+        json.JSONDecodeError: If a line isn't a JSON object entry.
+    """
+    return list(json.loads(read_lines(path, start, end)).items())
+
+
+class _Reader:
+    """Represent a buffered cursor over the text of a file."""
+
+    def __init__(self, f, chunk_size):
+        """Initialize a new _Reader."""
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Read one more chunk, return False at the end of the file."""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if len(chunk) == 0:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Skip whitespace and return the next character, or ''."""
+        while True:
+            while (self.pos < len(self.buf) and
+                   self.buf[self.pos] in _whitespace):
+                self.pos += 1
+            if self.pos < len(self.buf) or not self.fill():
+                return self.buf[self.pos:self.pos + 1]
+
+    def expect(self, char):
+        """Consume char, which must be the next non-whitespace character."""
+        if self.peek() != char:
+            self.fail("Expecting '{}' delimiter".format(char))
+        self.pos += 1
+
+    def decode(self):
+        """Decode and consume the next JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            if end == len(self.buf) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+    def fail(self, msg):
+        """Raise a JSONDecodeError at the current position."""
+        raise json.JSONDecodeError(msg, self.buf, self.pos)
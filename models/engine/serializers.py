@@ -0,0 +1,164 @@
+#!/usr/bin/python3
+"""Defines the snapshot formats FileStorage can read and write."""
+import json
+import pickle
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from models.engine.json_stream import dump_lines, iterload
+from models.engine.json_stream import line_ranges, read_lines
+
+
+class JSONSerializer:
+    """Represent the JSON snapshot format: one object of dictionaries.
+
+    Each dictionary is written on its own line, so that a snapshot can be
+    split into chunks decoded by several processes.
+
+    Attributes:
+        extension (str): The file extension of the format.
+        binary (bool): Whether files of the format are opened in binary.
+    """
+
+    extension = ".json"
+    binary = False
+
+    def dump(self, objdict, f):
+        """Write the dictionaries of objdict to the file f."""
+        dump_lines(objdict, f)
+
+    def load(self, f):
+        """Yield the key/dictionary pairs stored in the file f."""
+        return iterload(f)
+
+    def load_parallel(self, path, workers):
+        """Return the key/dictionary pairs stored in the file at path.
+
+        The file is split into one chunk per worker process and each
+        chunk is decoded by its own process with json.loads(). Only
+        functions of the standard library are sent to the processes:
+        this runs while the models package is being imported, and
+        pickling one of its functions would wait for that import to end.
+        The pairs are checked and returned in file order.
+
+        Args:
+            path (str): The path of the snapshot.
+            workers (int): The number of processes to use.
+
+        Returns:
+            An iterator over the pairs, or None if the snapshot was
+            written in a single line and can't be split.
+        """
+        ranges = line_ranges(path, workers)
+        if ranges is None:
+            return None
+        texts = [read_lines(path, start, end) for start, end in ranges]
+        if len(texts) < 2:
+            chunks = [json.loads(text) for text in texts]
+        else:
+            with ProcessPoolExecutor(min(workers, len(texts))) as pool:
+                chunks = list(pool.map(json.loads, texts))
+        pairs = [pair for chunk in chunks for pair in chunk.items()]
+        _check(pairs)
+        return iter(pairs)
+
+
+class PickleSerializer:
+    """Represent the compact binary snapshot format.
+
+    The file starts with the magic header, followed by a pickle (protocol
+    5) of the attribute names of each distinct object shape and of one
+    tuple of values per object, so attribute names aren't repeated. Only
+    built-in containers and scalars are stored, and loading refuses any
+    other type.
+
+    Attributes:
+        extension (str): The file extension of the format.
+        binary (bool): Whether files of the format are opened in binary.
+        magic (bytes): The header identifying the format and its version.
+    """
+
+    extension = ".pkl"
+    binary = True
+    magic = b"HBNB\x01"
+
+    def dump(self, objdict, f):
+        """Write the dictionaries of objdict to the file f."""
+        shapes = {}
+        rows = []
+        for o in objdict.values():
+            shape = tuple(o)
+            index = shapes.setdefault(shape, len(shapes))
+            rows.append((index, tuple(o.values())))
+        f.write(self.magic)
+        pickle.dump({"shapes": list(shapes), "rows": rows}, f, protocol=5)
+
+    def load(self, f):
+        """Yield the key/dictionary pairs stored in the file f."""
+        if f.read(len(self.magic)) != self.magic:
+            raise ValueError("not a {} snapshot".format(type(self).__name__))
+        payload = _Unpickler(f).load()
+        shapes = payload["shapes"]
+        for index, values in payload["rows"]:
+            o = dict(zip(shapes[index], values))
+            yield "{}.{}".format(o["__class__"], o["id"]), o
+
+
+def _check(pairs):
+    """Raise ValueError if a key/dictionary pair doesn't match its key."""
+    for key, o in pairs:
+        if (type(o) is not dict or
+                "{}.{}".format(o.get("__class__"), o.get("id")) != key):
+            raise ValueError("invalid snapshot entry '{}'".format(key))
+
+
+class _Unpickler(pickle.Unpickler):
+    """Represent an unpickler limited to built-in types."""
+
+    def find_class(self, module, name):
+        """Refuse to load any global."""
+        raise pickle.UnpicklingError(
+            "global '{}.{}' is forbidden".format(module, name))
+
+
+serializers = {
+    "json": JSONSerializer(),
+    "pickle": PickleSerializer(),
+}
+"""dict: The available snapshot formats by name."""
+
+
+def get_serializer(name):
+    """Return the snapshot format called name.
+
+    Raises:
+        ValueError: If no format is called name.
+    """
+    if name not in serializers:
+        raise ValueError("unknown snapshot format '{}', expected one of "
+                         "{}".format(name, ", ".join(sorted(serializers))))
+    return serializers[name]
+
+
+def convert(src, dst, src_format, dst_format):
+    """Convert the snapshot file src into the snapshot file dst.
+
+    Args:
+        src (str): The path of the snapshot to read.
+        dst (str): The path of the snapshot to write.
+        src_format (str): The name of the format of src.
+        dst_format (str): The name of the format of dst.
+    """
+    reader = get_serializer(src_format)
+    writer = get_serializer(dst_format)
+    with open(src, "rb" if reader.binary else "r") as f:
+        objdict = dict(reader.load(f))
+    with open(dst, "wb" if writer.binary else "w") as f:
+        writer.dump(objdict, f)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 5:
+        print("Usage: {} <src> <src_format> <dst> <dst_format>".format(
+            sys.argv[0]), file=sys.stderr)
+        sys.exit(1)
+    convert(sys.argv[1], sys.argv[3], sys.argv[2], sys.argv[4])
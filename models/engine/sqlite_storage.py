@@ -0,0 +1,569 @@
+#!/usr/bin/python3
+"""Defines the SQLiteStorage class."""
+import json
+import os
+import sqlite3
+from models.base_model import classes
+from models.engine.indexes import GridIndex, tokenize
+from models.user import User
+from models.state import State
+from models.city import City
+from models.place import Place
+from models.amenity import Amenity
+from models.review import Review
+
+
+class SQLiteStorage:
+    """Represent a storage engine backed by a local SQLite database.
+
+    Each model class has its own table, with one row per object: the id,
+    the attributes the class lists in its _indexes tuple as indexed
+    columns, and the dictionary of the object as JSON. Counting,
+    filtering and sorting are done by SQLite, on json_extract() of the
+    other attributes. near() and within() scan the coordinates of the
+    rows of a class instead, as there is no spatial index. The text
+    attributes a model lists in _text are joined in an FTS5 table next
+    to its table, e.g. Place_text, sharing its rowids, for search().
+
+    Instances are created the first time they are returned and kept, so
+    the same id always gives the same instance until reload(). Objects
+    passed to new() or delete() are written to the current transaction
+    before any query, and commit() ends that transaction. save() writes
+    every loaded object first, like FileStorage.save().
+
+    Attributes:
+        __path (str): The path of the database, from HBNB_SQLITE_PATH.
+        __connection (sqlite3.Connection): The open database, if any.
+        __objects (dict): The instances loaded so far, by key.
+        __dirty (dict): The objects to write before the next query.
+        __deleted (set): The keys to delete before the next query.
+        __tables (set): The class names whose table exists.
+    """
+    __path = os.getenv("HBNB_SQLITE_PATH", "file.db")
+    __connection = None
+    __objects = {}
+    __dirty = {}
+    __deleted = set()
+    __tables = set()
+
+    def all(self, cls=None):
+        """Return the dictionary of the stored objects.
+
+        Args:
+            cls (type or str): Only return the objects of this class.
+        """
+        if cls is not None:
+            return self.__select(self.__name(cls), "", ())
+        for cls_name in classes:
+            self.__select(cls_name, "", ())
+        return SQLiteStorage.__objects
+
+    def count(self, cls=None):
+        """Return the number of stored objects, optionally of a class.
+
+        Args:
+            cls (type or str): Only count the objects of this class.
+        """
+        names = classes if cls is None else [self.__name(cls)]
+        total = 0
+        for cls_name in names:
+            if cls_name in classes:
+                self.__autoflush(cls_name)
+                self.__table(cls_name)
+                total += self.__execute(
+                    'SELECT COUNT(*) FROM "{}"'.format(cls_name)
+                ).fetchone()[0]
+        return total
+
+    def find(self, cls, **kwargs):
+        """Return the objects of a class whose attributes match kwargs.
+
+        Strings and numbers are matched by SQLite, through the indexed
+        column of the attribute if it has one. Other values are compared
+        on the instances of the rows matched so far.
+
+        Args:
+            cls (type or str): The class of the objects to find.
+            **kwargs (dict): The attribute values to match.
+        """
+        cls_name = self.__name(cls)
+        if cls_name not in classes:
+            return {}
+        clauses = []
+        params = []
+        others = {}
+        for attr, value in kwargs.items():
+            if type(value) not in (str, int, float):
+                others[attr] = value
+            else:
+                column, column_params = self.__column(cls_name, attr)
+                clauses.append("{} = ?".format(column))
+                params += column_params + [value]
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        objdict = self.__select(cls_name, where, params)
+        return {key: obj for key, obj in objdict.items()
+                if all(getattr(obj, attr, None) == value
+                       for attr, value in others.items())}
+
+    def between(self, cls, **kwargs):
+        """Return the objects of a class whose attributes are in ranges.
+
+        Args:
+            cls (type or str): The class of the objects to find.
+            **kwargs (dict): The (low, high) inclusive bounds of each
+                attribute, where None leaves a bound open.
+        """
+        cls_name = self.__name(cls)
+        if cls_name not in classes:
+            return {}
+        clauses = []
+        params = []
+        for attr, (low, high) in kwargs.items():
+            clause, clause_params = self.__range(cls_name, attr, low, high)
+            clauses.append(clause)
+            params += clause_params
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        return self.__select(cls_name, where, params)
+
+    def near(self, cls, latitude, longitude, km):
+        """Return the objects of a class within km of a point.
+
+        The objects are ordered by distance. Only the classes listing
+        their coordinates in _geo can be searched.
+
+        Args:
+            cls (type or str): The class of the objects to find.
+            latitude (float): The latitude of the point.
+            longitude (float): The longitude of the point.
+            km (float): The radius of the search, in km.
+        """
+        cls_name = self.__name(cls)
+        grid = self.__grid(cls_name)
+        if grid is None:
+            return {}
+        pairs = grid.near(latitude, longitude, km)
+        return self.__get_all(cls_name, (id for id, distance in pairs))
+
+    def within(self, cls, south, west, north, east):
+        """Return the objects of a class inside a bounding box.
+
+        Only the classes listing their coordinates in _geo can be
+        searched.
+
+        Args:
+            cls (type or str): The class of the objects to find.
+            south (float): The lowest latitude of the box.
+            west (float): The westmost longitude of the box, greater than
+                east if the box crosses the 180th meridian.
+            north (float): The highest latitude of the box.
+            east (float): The eastmost longitude of the box.
+        """
+        cls_name = self.__name(cls)
+        grid = self.__grid(cls_name)
+        if grid is None:
+            return {}
+        return self.__get_all(cls_name, grid.within(south, west, north, east))
+
+    def having(self, cls, attr, all_of=(), any_of=()):
+        """Return the objects of a class whose list attribute holds items.
+
+        The items are looked up by SQLite with json_each(). Objects that
+        don't set the attribute get the default of their class.
+
+        Args:
+            cls (type or str): The class of the objects to find.
+            attr (str): The name of the list attribute.
+            all_of (list): The items the list must all hold.
+            any_of (list): The items the list must hold at least one of,
+                if any.
+        """
+        cls_name = self.__name(cls)
+        if cls_name not in classes:
+            return {}
+        path = '$."{}"'.format(attr)
+        clauses = ["json_type(data, ?) = 'array'"]
+        params = [path]
+        for item in set(all_of):
+            clauses.append("EXISTS (SELECT 1 FROM json_each(data, ?) "
+                           "WHERE value = ?)")
+            params += [path, item]
+        if len(any_of) != 0:
+            clauses.append("EXISTS (SELECT 1 FROM json_each(data, ?) "
+                           "WHERE value IN ({}))".format(
+                               ", ".join("?" * len(any_of))))
+            params += [path] + list(any_of)
+        where = " WHERE " + " AND ".join(clauses)
+        default = getattr(classes[cls_name], attr, None)
+        if (type(default) in (list, tuple) and
+                all(item in default for item in all_of) and
+                (len(any_of) == 0 or any(item in default for item in any_of))):
+            where += " OR json_type(data, ?) IS NULL"
+            params.append(path)
+        return self.__select(cls_name, where, params)
+
+    def order(self, cls, attr, low=None, high=None, reverse=False,
+              offset=0, limit=None):
+        """Return the objects of a class sorted by a numeric attribute.
+
+        Objects whose value isn't a number are left out, and objects
+        with equal values are sorted by id.
+
+        Args:
+            cls (type or str): The class of the objects to return.
+            attr (str): The name of the attribute to sort by.
+            low (float): The lowest value to return, None for no bound.
+            high (float): The highest value to return, None for no bound.
+            reverse (bool): Whether to return the highest values first.
+            offset (int): The number of objects to skip.
+            limit (int): The maximum number of objects to return.
+        """
+        cls_name = self.__name(cls)
+        if cls_name not in classes:
+            return {}
+        column, params = self.__column(cls_name, attr)
+        clause, clause_params = self.__range(cls_name, attr, low, high, True)
+        direction = "DESC" if reverse else "ASC"
+        where = " WHERE {0} ORDER BY {1} {2}, id {2} LIMIT ? OFFSET ?".format(
+            clause, column, direction)
+        params = clause_params + params + [-1 if limit is None else limit,
+                                           offset]
+        return self.__select(cls_name, where, params)
+
+    def search(self, cls, query, limit=None):
+        """Return the objects of a class matching words, best match first.
+
+        The objects are ranked by FTS5 with BM25 on the words of their
+        text attributes. Only the classes listing those attributes in
+        _text can be searched.
+
+        Args:
+            cls (type or str): The class of the objects to find.
+            query (str): The words to look for.
+            limit (int): The maximum number of objects to return.
+        """
+        cls_name = self.__name(cls)
+        terms = set(tokenize(query))
+        if (len(getattr(classes.get(cls_name), "_text", ())) == 0 or
+                len(terms) == 0):
+            return {}
+        join = (' JOIN (SELECT rowid AS hit, bm25("{0}_text") AS score '
+                'FROM "{0}_text" WHERE "{0}_text" MATCH ?) '
+                'ON "{0}".rowid = hit '
+                'ORDER BY score, id LIMIT ?').format(cls_name)
+        match = " OR ".join('"{}"'.format(term) for term in sorted(terms))
+        return self.__select(cls_name, join,
+                             [match, -1 if limit is None else limit])
+
+    def stats(self, cls, attr, value=None):
+        """Return aggregates of the objects of a class grouped by attr.
+
+        Each aggregate is a dictionary as returned by GroupStats.get():
+        the number of objects and the count, sum, min, max and avg of
+        each numeric attribute the model declares, computed by SQLite
+        with GROUP BY. The attributes a model maps in _rollups group the
+        objects by an attribute of the objects their foreign key points
+        to, joined by SQLite.
+
+        Args:
+            cls (type or str): The class of the objects to aggregate.
+            attr (str): The name of the grouping attribute.
+            value (any): Only return the aggregates of this group.
+
+        Returns:
+            The aggregates of value, or a dictionary of the aggregates of
+            each group having objects.
+        """
+        cls_name = self.__name(cls)
+        fields = self.__numeric_attrs(classes.get(cls_name))
+        empty = {"count": 0}
+        for field in fields:
+            empty[field] = {"count": 0, "sum": 0, "min": None, "max": None,
+                            "avg": None}
+        if cls_name not in classes:
+            return {} if value is None else empty
+        self.__autoflush(cls_name)
+        self.__table(cls_name)
+        source = '"{}"'.format(cls_name)
+        source_params = []
+        rollup = getattr(classes[cls_name], "_rollups", {}).get(attr)
+        if rollup is None:
+            group, params = self.__column(cls_name, attr)
+        else:
+            fk, parent = rollup
+            self.__autoflush(parent)
+            self.__table(parent)
+            column, source_params = self.__column(cls_name, fk)
+            source += ' JOIN "{0}" ON "{0}".id = {1}'.format(parent, column)
+            group, params = self.__column(parent, attr)
+        columns = [group + " AS g"]
+        aggregates = ["g", "COUNT(*)"]
+        for i, field in enumerate(fields):
+            column, column_params = self.__column(cls_name, field)
+            columns.append("CASE WHEN typeof({0}) IN ('integer', 'real') "
+                           "THEN {0} END AS f{1}".format(column, i))
+            params += column_params * 2
+            aggregates += ["{}(f{})".format(func, i)
+                           for func in ("COUNT", "SUM", "MIN", "MAX")]
+        sql = "SELECT {} FROM (SELECT {} FROM {})".format(
+            ", ".join(aggregates), ", ".join(columns), source)
+        params += source_params
+        if value is not None:
+            sql += " WHERE g = ?"
+            params.append(value)
+        stats = {}
+        for row in self.__execute(sql + " GROUP BY g", params):
+            entry = {"count": row[1]}
+            for i, field in enumerate(fields):
+                count, total, low, high = row[2 + 4 * i:6 + 4 * i]
+                total = 0 if total is None else total
+                entry[field] = {"count": count, "sum": total, "min": low,
+                                "max": high,
+                                "avg": total / count if count != 0 else None}
+            stats[row[0]] = entry
+        if value is not None:
+            return stats.get(value, empty)
+        return stats
+
+    def get(self, cls, id):
+        """Return the object of a class with the given id, or None.
+
+        Args:
+            cls (type or str): The class of the object.
+            id (str): The id of the object.
+        """
+        cls_name = self.__name(cls)
+        key = "{}.{}".format(cls_name, id)
+        if key in SQLiteStorage.__objects:
+            return SQLiteStorage.__objects[key]
+        if cls_name not in classes or key in SQLiteStorage.__deleted:
+            return None
+        return self.__select(cls_name, " WHERE id = ?", (id,)).get(key)
+
+    def new(self, obj):
+        """Set in __objects obj with key <obj_class_name>.id"""
+        key = "{}.{}".format(obj.__class__.__name__, obj.id)
+        SQLiteStorage.__objects[key] = obj
+        SQLiteStorage.__dirty[key] = obj
+        SQLiteStorage.__deleted.discard(key)
+
+    def delete(self, obj=None, cascade=False):
+        """Delete obj from the database if it's inside.
+
+        Args:
+            obj (BaseModel): The object to delete.
+            cascade (bool): Whether to delete the objects depending on obj
+                as well, following the _children of each model.
+        """
+        if obj is None:
+            return
+        key = "{}.{}".format(obj.__class__.__name__, obj.id)
+        SQLiteStorage.__objects.pop(key, None)
+        SQLiteStorage.__dirty.pop(key, None)
+        SQLiteStorage.__deleted.add(key)
+        if cascade:
+            for child, attr in getattr(obj, "_children", ()):
+                for child_obj in self.find(child, **{attr: obj.id}).values():
+                    self.delete(child_obj, cascade=True)
+
+    def save(self):
+        """Write every loaded object and commit the transaction."""
+        SQLiteStorage.__dirty.update(SQLiteStorage.__objects)
+        self.commit()
+
+    def commit(self):
+        """Write the objects passed to new() or delete() and commit."""
+        self.__autoflush()
+        self.__connect().commit()
+
+    def flush(self):
+        """Commit the pending changes, if any."""
+        if SQLiteStorage.__dirty or SQLiteStorage.__deleted:
+            self.commit()
+
+    def reload(self):
+        """Open the database and forget the instances loaded so far.
+
+        Changes not committed yet are rolled back.
+        """
+        if SQLiteStorage.__connection is not None:
+            SQLiteStorage.__connection.close()
+        SQLiteStorage.__connection = None
+        SQLiteStorage.__tables = set()
+        SQLiteStorage.__objects = {}
+        SQLiteStorage.__dirty = {}
+        SQLiteStorage.__deleted = set()
+        self.__connect()
+
+    @staticmethod
+    def __name(cls):
+        """Return the class name of cls, which may already be a name."""
+        return cls if isinstance(cls, str) else cls.__name__
+
+    def __connect(self):
+        """Return the connection to the database, opening it if needed."""
+        if SQLiteStorage.__connection is None:
+            SQLiteStorage.__connection = sqlite3.connect(SQLiteStorage.__path)
+        return SQLiteStorage.__connection
+
+    def __execute(self, sql, params=()):
+        """Execute sql with params and return the cursor."""
+        return self.__connect().execute(sql, params)
+
+    def __table(self, cls_name):
+        """Create the table of a class and its indexes, if needed."""
+        if cls_name in SQLiteStorage.__tables:
+            return
+        columns = getattr(classes[cls_name], "_indexes", ())
+        self.__execute('CREATE TABLE IF NOT EXISTS "{}" ({})'.format(
+            cls_name, ", ".join(["id TEXT PRIMARY KEY"] +
+                                ['"{}"'.format(c) for c in columns] +
+                                ["data TEXT NOT NULL"])))
+        for column in columns:
+            self.__execute(
+                'CREATE INDEX IF NOT EXISTS "{0}_{1}" ON "{0}" ("{1}")'
+                .format(cls_name, column))
+        attrs = getattr(classes[cls_name], "_text", ())
+        if len(attrs) != 0 and self.__execute(
+                "SELECT 1 FROM sqlite_master WHERE name = ?",
+                ("{}_text".format(cls_name),)).fetchone() is None:
+            self.__execute(
+                'CREATE VIRTUAL TABLE "{}_text" USING fts5(text, tokenize='
+                '"unicode61 remove_diacritics 0 tokenchars \'_\'")'
+                .format(cls_name))
+            rows = self.__execute('SELECT rowid, data FROM "{}"'.format(
+                cls_name)).fetchall()
+            self.__connect().executemany(
+                'INSERT INTO "{}_text" (rowid, text) VALUES (?, ?)'.format(
+                    cls_name),
+                [(rowid, self.__text(attrs, json.loads(data)))
+                 for rowid, data in rows])
+        SQLiteStorage.__tables.add(cls_name)
+
+    @staticmethod
+    def __text(attrs, o):
+        """Return the text attributes of the dictionary o, joined."""
+        values = (o.get(attr) for attr in attrs)
+        return " ".join(v for v in values if type(v) is str)
+
+    def __unindex(self, cls_name, id):
+        """Remove the row of id from the text table of its class."""
+        if len(getattr(classes[cls_name], "_text", ())) != 0:
+            self.__execute(
+                'DELETE FROM "{0}_text" WHERE rowid = '
+                '(SELECT rowid FROM "{0}" WHERE id = ?)'.format(cls_name),
+                (id,))
+
+    def __column(self, cls_name, attr):
+        """Return the SQL value of an attribute and its parameters.
+
+        Indexed attributes are read from their column, the others from
+        the JSON of the row, or the default of the class if it's a
+        string or a number.
+        """
+        if attr in getattr(classes[cls_name], "_indexes", ()):
+            return '"{}"."{}"'.format(cls_name, attr), []
+        default = getattr(classes[cls_name], attr, None)
+        if type(default) not in (str, int, float):
+            default = None
+        return ('COALESCE(json_extract("{}".data, ?), ?)'.format(cls_name),
+                ['$."{}"'.format(attr), default])
+
+    def __range(self, cls_name, attr, low, high, numeric=False):
+        """Return the SQL condition of an attribute between low and high.
+
+        The value must be a number unless both bounds are None and
+        numeric is False.
+        """
+        column, column_params = self.__column(cls_name, attr)
+        if low is None and high is None and not numeric:
+            return "1", []
+        clauses = ["typeof({}) IN ('integer', 'real')".format(column)]
+        params = list(column_params)
+        for bound, operator in ((low, ">="), (high, "<=")):
+            if bound is not None:
+                clauses.append("{} {} ?".format(column, operator))
+                params += column_params + [bound]
+        return "(" + " AND ".join(clauses) + ")", params
+
+    @staticmethod
+    def __numeric_attrs(cls):
+        """Return the attributes cls declares with an int or float default."""
+        if cls is None:
+            return ()
+        model = getattr(cls, "_model", cls)
+        return tuple(name for name in dir(model)
+                     if not name.startswith("_") and
+                     type(getattr(model, name)) in (int, float))
+
+    def __grid(self, cls_name):
+        """Return a GridIndex of the rows of a class, None without _geo."""
+        attrs = getattr(classes.get(cls_name), "_geo", ())
+        if len(attrs) == 0:
+            return None
+        self.__autoflush(cls_name)
+        self.__table(cls_name)
+        columns = [self.__column(cls_name, attr) for attr in attrs]
+        grid = GridIndex(attrs)
+        for id, lat, lon in self.__execute(
+                'SELECT id, {}, {} FROM "{}"'.format(
+                    columns[0][0], columns[1][0], cls_name),
+                columns[0][1] + columns[1][1]):
+            grid.add(id, lat, lon)
+        return grid
+
+    def __get_all(self, cls_name, ids):
+        """Return the objects of a class with the given ids, in order."""
+        objdict = {}
+        for id in ids:
+            objdict["{}.{}".format(cls_name, id)] = self.get(cls_name, id)
+        return objdict
+
+    def __autoflush(self, cls_name=None):
+        """Write the pending changes, only those of cls_name if given."""
+        for key in list(SQLiteStorage.__deleted):
+            name, id = key.split(".", 1)
+            if cls_name is None or name == cls_name:
+                self.__table(name)
+                self.__unindex(name, id)
+                self.__execute('DELETE FROM "{}" WHERE id = ?'.format(name),
+                               (id,))
+                SQLiteStorage.__deleted.discard(key)
+        for key, obj in list(SQLiteStorage.__dirty.items()):
+            name = key.split(".", 1)[0]
+            if cls_name is None or name == cls_name:
+                self.__write(name, obj)
+                del SQLiteStorage.__dirty[key]
+
+    def __write(self, cls_name, obj):
+        """Insert or replace the row of obj."""
+        self.__table(cls_name)
+        columns = getattr(classes[cls_name], "_indexes", ())
+        o = obj.to_dict()
+        values = [getattr(obj, c, None) for c in columns]
+        self.__unindex(cls_name, obj.id)
+        rowid = self.__execute(
+            'INSERT OR REPLACE INTO "{}" VALUES ({})'.format(
+                cls_name, ", ".join("?" * (len(columns) + 2))),
+            [obj.id] + values + [json.dumps(o)]).lastrowid
+        attrs = getattr(classes[cls_name], "_text", ())
+        if len(attrs) != 0:
+            self.__execute(
+                'INSERT INTO "{}_text" (rowid, text) VALUES (?, ?)'.format(
+                    cls_name), (rowid, self.__text(attrs, o)))
+
+    def __select(self, cls_name, where, params):
+        """Return the objects of the rows of a class matching where."""
+        if cls_name not in classes:
+            return {}
+        self.__autoflush(cls_name)
+        self.__table(cls_name)
+        objdict = {}
+        for id, data in self.__execute('SELECT id, data FROM "{}"{}'.format(
+                cls_name, where), params):
+            key = "{}.{}".format(cls_name, id)
+            obj = SQLiteStorage.__objects.get(key)
+            if obj is None:
+                obj = classes[cls_name](**json.loads(data))
+                SQLiteStorage.__objects[key] = obj
+            objdict[key] = obj
+        return objdict
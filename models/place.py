@@ -1,6 +1,9 @@
 #!/usr/bin/python3
 """Defines the Place class."""
+import models
 from models.base_model import BaseModel
+from models.amenity import Amenity
+from models.review import Review
 
 
 class Place(BaseModel):
@@ -32,4 +35,24 @@ class Place(BaseModel):
     longitude = 0.0
     amenity_ids = []
 
+    _indexes = ("city_id", "user_id")
+    _columns = ("number_rooms", "number_bathrooms", "max_guest",
+                "price_by_night", "latitude", "longitude")
+    _geo = ("latitude", "longitude")
+    _text = ("name", "description")
+    _bitmaps = ("amenity_ids",)
+    _aggregates = ("city_id",)
+    _rollups = {"state_id": ("city_id", "City")}
+    _children = (("Review", "place_id"),)
 
+    @property
+    def reviews(self):
+        """list: The reviews of the place."""
+        return list(models.storage.find(Review, place_id=self.id).values())
+
+    @property
+    def amenities(self):
+        """list: The amenities listed in amenity_ids that exist."""
+        amenities = (models.storage.get(Amenity, amenity_id)
+                     for amenity_id in self.amenity_ids)
+        return [amenity for amenity in amenities if amenity is not None]
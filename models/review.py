@@ -16,3 +16,6 @@ class Review(BaseModel):
     user_id = ""
     text = ""
 
+    _indexes = ("place_id", "user_id")
+    _text = ("text",)
+    _aggregates = ("place_id", "user_id")
@@ -1,6 +1,8 @@
 #!/usr/bin/python3
 """Defines the State class."""
+import models
 from models.base_model import BaseModel
+from models.city import City
 
 
 
@@ -12,3 +14,10 @@ class State(BaseModel):
     """
 
     name = ""
+
+    _children = (("City", "state_id"),)
+
+    @property
+    def cities(self):
+        """list: The cities of the state."""
+        return list(models.storage.find(City, state_id=self.id).values())
@@ -1,6 +1,8 @@
 #!/usr/bin/python3
 """Defines the User class."""
+import models
 from models.base_model import BaseModel
+from models.review import Review
 
 
 class User(BaseModel):
@@ -17,3 +19,8 @@ class User(BaseModel):
     password = ""
     first_name = ""
     last_name = ""
+
+    @property
+    def reviews(self):
+        """list: The reviews written by the user."""
+        return list(models.storage.find(Review, user_id=self.id).values())
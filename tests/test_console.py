@@ -10,11 +10,18 @@ Unittest classes:
     TestHBNBCommand_all
     TestHBNBCommand_destroy
     TestHBNBCommand_update
+    TestHBNBCommand_count
+    TestHBNBCommand_geo
+    TestHBNBCommand_search
+    TestHBNBCommand_stats
+    TestHBNBCommand_readonly
 """
+import ast
 import os
 import sys
 import unittest
 from models import storage
+from models.state import State
 from models.engine.file_storage import FileStorage
 from console import HBNBCommand
 from io import StringIO
@@ -65,7 +72,9 @@ class TestHBNBCommand_help(unittest.TestCase):
 
     def test_help_destroy(self):
         h = ("Usage: destroy <class> <id> or <class>.destroy(<id>)\n        "
-             "Delete a class instance of a given id.")
+             "Delete a class instance of a given id, along with the "
+             "instances\n        depending on it: the cities of a state, "
+             "the places of a city and\n        the reviews of a place.")
         with patch("sys.stdout", new=StringIO()) as output:
             self.assertFalse(HBNBCommand().onecmd("help destroy"))
             self.assertEqual(h, output.getvalue().strip())
@@ -99,7 +108,8 @@ class TestHBNBCommand_help(unittest.TestCase):
     def test_help(self):
         h = ("Documented commands (type help <topic>):\n"
              "========================================\n"
-             "EOF  all  count  create  destroy  help  quit  show  update")
+             "EOF  count   destroy  near  search  stats   within\n"
+             "all  create  help     quit  show    update")
         with patch("sys.stdout", new=StringIO()) as output:
             self.assertFalse(HBNBCommand().onecmd("help"))
             self.assertEqual(h, output.getvalue().strip())
@@ -116,6 +126,17 @@ class TestHBNBCommand_exit(unittest.TestCase):
         with patch("sys.stdout", new=StringIO()) as output:
             self.assertTrue(HBNBCommand().onecmd("EOF"))
 
+    def test_quit_flushes_storage(self):
+        with patch.object(storage, "flush") as flush:
+            HBNBCommand().onecmd("quit")
+        flush.assert_called_once_with()
+
+    def test_EOF_flushes_storage(self):
+        with patch("sys.stdout", new=StringIO()):
+            with patch.object(storage, "flush") as flush:
+                HBNBCommand().onecmd("EOF")
+        flush.assert_called_once_with()
+
 
 class TestHBNBCommand_create(unittest.TestCase):
     """Unittests for testing create from the HBNB command interpreter."""
@@ -134,6 +155,10 @@ class TestHBNBCommand_create(unittest.TestCase):
             os.remove("file.json")
         except IOError:
             pass
+        try:
+            os.remove("file.json.text")
+        except IOError:
+            pass
         try:
             os.rename("tmp", "file.json")
         except IOError:
@@ -216,6 +241,10 @@ class TestHBNBCommand_show(unittest.TestCase):
             os.remove("file.json")
         except IOError:
             pass
+        try:
+            os.remove("file.json.text")
+        except IOError:
+            pass
         try:
             os.rename("tmp", "file.json")
         except IOError:
@@ -469,6 +498,10 @@ class TestHBNBCommand_destroy(unittest.TestCase):
             os.remove("file.json")
         except IOError:
             pass
+        try:
+            os.remove("file.json.text")
+        except IOError:
+            pass
         try:
             os.rename("tmp", "file.json")
         except IOError:
@@ -705,6 +738,26 @@ class TestHBNBCommand_destroy(unittest.TestCase):
             self.assertFalse(HBNBCommand().onecmd(command))
             self.assertNotIn(obj, storage.all())
 
+    def test_destroy_cascades(self):
+        ids = {}
+        for cls_name in ("State", "City", "Place", "Review", "User"):
+            with patch("sys.stdout", new=StringIO()) as output:
+                HBNBCommand().onecmd("create {}".format(cls_name))
+            ids[cls_name] = output.getvalue().strip()
+        for cls_name, attr, parent in (("City", "state_id", "State"),
+                                       ("Place", "city_id", "City"),
+                                       ("Review", "place_id", "Place"),
+                                       ("Review", "user_id", "User")):
+            HBNBCommand().onecmd("update {} {} {} {}".format(
+                cls_name, ids[cls_name], attr, ids[parent]))
+        with patch("sys.stdout", new=StringIO()) as output:
+            command = "destroy State {}".format(ids["State"])
+            self.assertFalse(HBNBCommand().onecmd(command))
+            self.assertEqual("", output.getvalue())
+        for cls_name in ("State", "City", "Place", "Review"):
+            self.assertIsNone(storage.get(cls_name, ids[cls_name]))
+        self.assertIsNotNone(storage.get("User", ids["User"]))
+
 
 class TestHBNBCommand_all(unittest.TestCase):
     """Unittests for testing all of the HBNB command interpreter."""
@@ -723,6 +776,10 @@ class TestHBNBCommand_all(unittest.TestCase):
             os.remove("file.json")
         except IOError:
             pass
+        try:
+            os.remove("file.json.text")
+        except IOError:
+            pass
         try:
             os.rename("tmp", "file.json")
         except IOError:
@@ -869,6 +926,10 @@ class TestHBNBCommand_update(unittest.TestCase):
             os.remove("file.json")
         except IOError:
             pass
+        try:
+            os.remove("file.json.text")
+        except IOError:
+            pass
         try:
             os.rename("tmp", "file.json")
         except IOError:
@@ -1500,6 +1561,32 @@ class TestHBNBCommand_update(unittest.TestCase):
         test_dict = storage.all()["Place.{}".format(testId)].__dict__
         self.assertEqual(9.8, test_dict["latitude"])
 
+    def test_update_relationship(self):
+        correct = "** attribute can't be set **"
+        with patch("sys.stdout", new=StringIO()) as output:
+            HBNBCommand().onecmd("create State")
+            testId = output.getvalue().strip()
+        for testCmd in ("update State {} cities []".format(testId),
+                        "State.update({}, {{'name': 'CA', 'cities': []}})"
+                        .format(testId)):
+            with patch("sys.stdout", new=StringIO()) as output:
+                self.assertFalse(HBNBCommand().onecmd(testCmd))
+                self.assertEqual(correct, output.getvalue().strip())
+        self.assertNotIn("name", storage.get("State", testId).__dict__)
+
+    def test_update_foreign_key(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            HBNBCommand().onecmd("create State")
+            stateId = output.getvalue().strip()
+            HBNBCommand().onecmd("create City")
+            cityId = output.getvalue().strip().split()[-1]
+        state = storage.get("State", stateId)
+        HBNBCommand().onecmd("update City {} state_id {}".format(
+            cityId, stateId))
+        self.assertEqual([cityId], [city.id for city in state.cities])
+        HBNBCommand().onecmd("update City {} state_id other".format(cityId))
+        self.assertEqual([], state.cities)
+
 
 class TestHBNBCommand_count(unittest.TestCase):
     """Unittests for testing count method of HBNB comand interpreter."""
@@ -1518,6 +1605,10 @@ class TestHBNBCommand_count(unittest.TestCase):
             os.remove("file.json")
         except IOError:
             pass
+        try:
+            os.remove("file.json.text")
+        except IOError:
+            pass
         try:
             os.rename("tmp", "file.json")
         except IOError:
@@ -1566,5 +1657,237 @@ class TestHBNBCommand_count(unittest.TestCase):
             self.assertEqual("1", output.getvalue().strip())
 
 
+class TestHBNBCommand_geo(unittest.TestCase):
+    """Unittests for testing the near and within commands."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.ids = []
+        for lat, lon in ((-1.29, 36.82), (-1.31, 36.80), (-4.04, 39.67)):
+            with patch("sys.stdout", new=StringIO()) as output:
+                HBNBCommand().onecmd("create Place")
+            self.ids.append(output.getvalue().strip())
+            HBNBCommand().onecmd("update Place {} {{'latitude': {}, "
+                                 "'longitude': {}}}".format(
+                                     self.ids[-1], lat, lon))
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.remove("file.json.text")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+
+    def found(self, command):
+        """Return the ids printed by command, in order."""
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(command))
+        return [i for i in self.ids if i in output.getvalue()]
+
+    def test_help_near(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("help near"))
+        self.assertIn("near <class> <latitude>", output.getvalue())
+
+    def test_near(self):
+        self.assertEqual(self.ids[:2], self.found("near Place -1.29 36.82 10"))
+        self.assertEqual(self.ids, self.found("Place.near(-1.3, 36.8, 500)"))
+
+    def test_within(self):
+        self.assertEqual([self.ids[2]],
+                         self.found("within Place -5 39 -4 40"))
+        self.assertEqual(self.ids[:2],
+                         self.found("Place.within(-2, 36, -1, 37)"))
+
+    def test_errors(self):
+        for command, error in (
+                ("near", "** class name missing **"),
+                ("near MyModel 1 2 3", "** class doesn't exist **"),
+                ("near Place 1 2", "** coordinates missing **"),
+                ("within Place a b c d", "** invalid coordinates **")):
+            with patch("sys.stdout", new=StringIO()) as output:
+                self.assertFalse(HBNBCommand().onecmd(command))
+                self.assertEqual(error, output.getvalue().strip())
+
+
+class TestHBNBCommand_search(unittest.TestCase):
+    """Unittests for testing the search command."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.ids = []
+        for text in ("Quiet loft near the park", "Loud party loft",
+                     "Cozy cabin"):
+            with patch("sys.stdout", new=StringIO()) as output:
+                HBNBCommand().onecmd("create Review")
+            self.ids.append(output.getvalue().strip())
+            HBNBCommand().onecmd('update Review {} text "{}"'.format(
+                self.ids[-1], text))
+
+    def tearDown(self):
+        for path in ("file.json", "file.json.text"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+
+    def found(self, command):
+        """Return the ids printed by command, in order."""
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(command))
+        text = output.getvalue()
+        return sorted((i for i in self.ids if i in text), key=text.find)
+
+    def test_help_search(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("help search"))
+        self.assertIn("search <class> <words>", output.getvalue())
+
+    def test_search(self):
+        self.assertEqual(self.ids[:2], self.found("search Review quiet loft"))
+        self.assertEqual([self.ids[2]],
+                         self.found('Review.search("cabin")'))
+        self.assertEqual([], self.found("search Place loft"))
+
+    def test_search_after_destroy(self):
+        HBNBCommand().onecmd("destroy Review {}".format(self.ids[0]))
+        self.assertEqual([self.ids[1]], self.found("search Review loft"))
+
+    def test_errors(self):
+        for command, error in (
+                ("search", "** class name missing **"),
+                ("search MyModel loft", "** class doesn't exist **"),
+                ("search Review", "** words missing **")):
+            with patch("sys.stdout", new=StringIO()) as output:
+                self.assertFalse(HBNBCommand().onecmd(command))
+                self.assertEqual(error, output.getvalue().strip())
+
+
+class TestHBNBCommand_stats(unittest.TestCase):
+    """Unittests for testing the stats command."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.state_id = self.create("State")
+        self.city_id = self.create("City")
+        HBNBCommand().onecmd("update City {} state_id {}".format(
+            self.city_id, self.state_id))
+        for price in (80, 40):
+            place_id = self.create("Place")
+            HBNBCommand().onecmd("update Place {} {{'city_id': '{}', "
+                                 "'price_by_night': {}}}".format(
+                                     place_id, self.city_id, price))
+
+    def tearDown(self):
+        for path in ("file.json", "file.json.text"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+
+    def create(self, cls_name):
+        """Create an instance of cls_name with the console, return its id."""
+        with patch("sys.stdout", new=StringIO()) as output:
+            HBNBCommand().onecmd("create {}".format(cls_name))
+        return output.getvalue().strip()
+
+    def stats(self, command):
+        """Return the dictionary printed by command."""
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(command))
+        return ast.literal_eval(output.getvalue())
+
+    def test_help_stats(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("help stats"))
+        self.assertIn("stats <class> <attribute>", output.getvalue())
+
+    def test_stats_by_state(self):
+        stats = self.stats("stats Place state_id {}".format(self.state_id))
+        self.assertEqual(2, stats["count"])
+        self.assertEqual({"count": 2, "sum": 120, "min": 40, "max": 80,
+                          "avg": 60}, stats["price_by_night"])
+
+    def test_stats_by_city(self):
+        stats = self.stats('Place.stats("city_id")')
+        self.assertEqual([self.city_id], list(stats))
+        self.assertEqual(2, stats[self.city_id]["count"])
+
+    def test_stats_after_destroy(self):
+        HBNBCommand().onecmd("destroy City {}".format(self.city_id))
+        self.assertEqual({}, self.stats("stats Place state_id"))
+
+    def test_errors(self):
+        for command, error in (
+                ("stats", "** class name missing **"),
+                ("stats MyModel city_id", "** class doesn't exist **"),
+                ("stats Place", "** attribute name missing **")):
+            with patch("sys.stdout", new=StringIO()) as output:
+                self.assertFalse(HBNBCommand().onecmd(command))
+                self.assertEqual(error, output.getvalue().strip())
+
+
+class TestHBNBCommand_readonly(unittest.TestCase):
+    """Unittests for testing commands on a read-only mapped snapshot."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.state = State(name="California")
+        storage.new(self.state)
+        FileStorage._FileStorage__mmap = True
+
+    def tearDown(self):
+        FileStorage._FileStorage__mmap = False
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+
+    def test_read_only(self):
+        for command in ("create State",
+                        "update State {} name Nevada".format(self.state.id),
+                        'State.update("{}", {{"name": "Nevada"}})'.format(
+                            self.state.id),
+                        "destroy State {}".format(self.state.id)):
+            with patch("sys.stdout", new=StringIO()) as output:
+                self.assertFalse(HBNBCommand().onecmd(command))
+                self.assertEqual("** storage is read-only **",
+                                 output.getvalue().strip())
+        self.assertEqual([self.state], list(storage.all(State).values()))
+        self.assertEqual("California", self.state.name)
+        self.assertFalse(os.path.exists("file.json"))
+
+
 if __name__ == "__main__":
     unittest.main()
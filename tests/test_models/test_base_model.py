@@ -5,13 +5,18 @@ Unittest classes:
     TestBaseModel_instantiation
     TestBaseModel_save
     TestBaseModel_to_dict
+    TestBaseModel_classes
+    TestBaseModel_timestamps
+    TestBaseModel_compact
 """
 import os
 import models
 import unittest
+import tracemalloc
 from datetime import datetime
 from time import sleep
-from models.base_model import BaseModel
+from models.base_model import BaseModel, classes, compact, parse_datetime
+from models.place import Place
 
 
 class TestBaseModel_instantiation(unittest.TestCase):
@@ -102,6 +107,10 @@ class TestBaseModel_save(unittest.TestCase):
             os.remove("file.json")
         except IOError:
             pass
+        try:
+            os.remove("file.json.text")
+        except IOError:
+            pass
         try:
             os.rename("tmp", "file.json")
         except IOError:
@@ -188,6 +197,137 @@ class TestBaseModel_to_dict(unittest.TestCase):
             bm.to_dict(None)
 
 
+class TestBaseModel_classes(unittest.TestCase):
+    """Unittests for testing the registry of model classes."""
+
+    def test_models_are_registered(self):
+        from models.user import User
+        from models.review import Review
+        self.assertIs(BaseModel, classes["BaseModel"])
+        self.assertIs(User, classes["User"])
+        self.assertIs(Review, classes["Review"])
+
+    def test_subclass_is_registered(self):
+        class MyModel(BaseModel):
+            pass
+        try:
+            self.assertIs(MyModel, classes["MyModel"])
+        finally:
+            del classes["MyModel"]
+
+
+class TestBaseModel_timestamps(unittest.TestCase):
+    """Unittests for testing the parsing of BaseModel timestamps."""
+
+    def tearDown(self):
+        models.base_model.defer_timestamps = False
+
+    def test_parse_datetime(self):
+        dt = datetime(2023, 5, 16, 14, 18, 32, 663822)
+        self.assertEqual(dt, parse_datetime("2023-05-16T14:18:32.663822"))
+
+    def test_parse_datetime_without_microseconds(self):
+        dt = datetime(2023, 5, 16, 14, 18, 32)
+        self.assertEqual(dt, parse_datetime(dt.isoformat()))
+
+    def test_parse_datetime_invalid(self):
+        with self.assertRaises(ValueError):
+            parse_datetime("yesterday")
+
+    def test_timestamps_parsed_on_init(self):
+        dt = datetime.today()
+        bm = BaseModel(id="345", created_at=dt.isoformat())
+        self.assertEqual(dt, bm.__dict__["created_at"])
+
+    def test_deferred_timestamps(self):
+        models.base_model.defer_timestamps = True
+        dt = datetime.today()
+        bm = BaseModel(id="345", created_at=dt.isoformat(),
+                       updated_at=dt.isoformat())
+        self.assertEqual(dt.isoformat(), bm.__dict__["created_at"])
+        self.assertEqual(dt.isoformat(), bm.to_dict()["updated_at"])
+        self.assertEqual(dt, bm.created_at)
+        self.assertEqual(dt, bm.__dict__["created_at"])
+        self.assertEqual(dt.isoformat(), bm.to_dict()["created_at"])
+
+    def test_deferred_timestamps_str(self):
+        models.base_model.defer_timestamps = True
+        dt = datetime.today()
+        bm = BaseModel(id="345", created_at=dt.isoformat(),
+                       updated_at=dt.isoformat())
+        self.assertIn("'updated_at': " + repr(dt), bm.__str__())
+
+    def test_deferred_timestamps_with_None(self):
+        models.base_model.defer_timestamps = True
+        with self.assertRaises(TypeError):
+            BaseModel(id=None, created_at=None, updated_at=None)
+
+
+class TestBaseModel_compact(unittest.TestCase):
+    """Unittests for testing the compact variants of the models."""
+
+    def setUp(self):
+        self.Place = compact(Place)
+        self.kwargs = {"id": "p1", "__class__": "Place",
+                       "created_at": "2023-05-16T14:18:32.663822",
+                       "updated_at": "2023-05-16T14:18:32.663822",
+                       "name": "Loft", "max_guest": 4}
+
+    def tearDown(self):
+        classes["Place"] = Place
+
+    def test_registered(self):
+        self.assertIs(self.Place, classes["Place"])
+        self.assertEqual("Place", self.Place.__name__)
+        self.assertTrue(issubclass(self.Place, Place))
+
+    def test_defaults(self):
+        pl = self.Place(**self.kwargs)
+        self.assertEqual("Loft", pl.name)
+        self.assertEqual("", pl.city_id)
+        self.assertEqual([], pl.amenity_ids)
+        with self.assertRaises(AttributeError):
+            pl.nope
+
+    def test_to_dict_matches_model(self):
+        pl = self.Place(**self.kwargs)
+        self.assertEqual(Place(**self.kwargs).to_dict(), pl.to_dict())
+
+    def test_str(self):
+        pl = self.Place(**self.kwargs)
+        self.assertIn("[Place] (p1)", str(pl))
+        self.assertIn("'name': 'Loft'", str(pl))
+        self.assertIn("'created_at': datetime.datetime(2023", str(pl))
+
+    def test_overflow_attributes(self):
+        pl = self.Place(**self.kwargs)
+        pl.wifi = True
+        pl.name = "Flat"
+        self.assertTrue(pl.wifi)
+        self.assertEqual({"name": "Flat", "wifi": True},
+                         {k: v for k, v in pl.to_dict().items()
+                          if k in ("name", "wifi")})
+
+    def test_new_instance(self):
+        pl = self.Place()
+        self.assertIs(pl, models.storage.get(Place, pl.id))
+        self.assertEqual(datetime, type(pl.created_at))
+
+    def test_smaller_than_model(self):
+        kwargs = dict(self.kwargs, city_id="c1", user_id="u1",
+                      description="Nice", number_rooms=2,
+                      number_bathrooms=1, price_by_night=80,
+                      latitude=1.0, longitude=2.0, amenity_ids=["a1"])
+        sizes = []
+        for cls in (Place, self.Place):
+            tracemalloc.start()
+            objs = [cls(**kwargs) for i in range(1000)]
+            sizes.append(tracemalloc.get_traced_memory()[0])
+            tracemalloc.stop()
+            del objs
+        self.assertLess(sizes[1], sizes[0])
+
+
 if __name__ == "__main__":
     unittest.main()
 
@@ -5,6 +5,7 @@ Unittest classes:
     TestCity_instantiation
     TestCity_save
     TestCity_to_dict
+    TestCity_places
 """
 import os
 import models
@@ -12,6 +13,7 @@ import unittest
 from datetime import datetime
 from time import sleep
 from models.city import City
+from models.place import Place
 
 
 class TestCity_instantiation(unittest.TestCase):
@@ -105,6 +107,10 @@ class TestCity_save(unittest.TestCase):
             os.remove("file.json")
         except IOError:
             pass
+        try:
+            os.remove("file.json.text")
+        except IOError:
+            pass
         try:
             os.rename("tmp", "file.json")
         except IOError:
@@ -191,6 +197,20 @@ class TestCity_to_dict(unittest.TestCase):
             cy.to_dict(None)
 
 
+class TestCity_places(unittest.TestCase):
+    """Unittests for testing the places property of the City class."""
+
+    def test_places(self):
+        cy = City()
+        pl = Place()
+        pl.city_id = cy.id
+        models.storage.new(pl)
+        Place()
+        self.assertEqual([pl], cy.places)
+        models.storage.delete(pl)
+        self.assertEqual([], cy.places)
+
+
 if __name__ == "__main__":
     unittest.main()
 
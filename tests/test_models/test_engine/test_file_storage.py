@@ -4,14 +4,32 @@
 Unittest classes:
     TestFileStorage_instantiation
     TestFileStorage_methods
+    TestFileStorage_journal
+    TestFileStorage_lazy
+    TestFileStorage_format
+    TestFileStorage_durability
+    TestFileStorage_batch
+    TestFileStorage_background
+    TestFileStorage_sharding
+    TestFileStorage_mmap
+    TestFileStorage_text
 """
+import io
 import os
+import sys
+import glob
 import json
+import tempfile
+import threading
+import subprocess
 import models
 import unittest
 from datetime import datetime
+from time import monotonic, sleep
+from unittest.mock import patch
 from models.base_model import BaseModel
 from models.engine.file_storage import FileStorage
+from models.engine.serializers import JSONSerializer, serializers
 from models.user import User
 from models.state import State
 from models.place import Place
@@ -52,10 +70,11 @@ class TestFileStorage_methods(unittest.TestCase):
 
     @classmethod
     def tearDown(self):
-        try:
-            os.remove("file.json")
-        except IOError:
-            pass
+        for path in ("file.json", "file.json.text"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
         try:
             os.rename("tmp", "file.json")
         except IOError:
@@ -65,9 +84,320 @@ class TestFileStorage_methods(unittest.TestCase):
     def test_all(self):
         self.assertEqual(dict, type(models.storage.all()))
 
-    def test_all_with_arg(self):
-        with self.assertRaises(TypeError):
-            models.storage.all(None)
+    def test_all_with_None(self):
+        self.assertIs(models.storage.all(), models.storage.all(None))
+
+    def test_all_with_class(self):
+        us = User()
+        st = State()
+        users = models.storage.all(User)
+        self.assertEqual({"User." + us.id: us}, users)
+        self.assertEqual(users, models.storage.all("User"))
+        self.assertEqual({}, models.storage.all("MyModel"))
+
+    def test_all_with_class_after_delete(self):
+        us = User()
+        models.storage.delete(us)
+        self.assertEqual({}, models.storage.all(User))
+
+    def test_count(self):
+        FileStorage._FileStorage__objects = {}
+        User()
+        User()
+        State()
+        self.assertEqual(3, models.storage.count())
+        self.assertEqual(2, models.storage.count(User))
+        self.assertEqual(1, models.storage.count("State"))
+        self.assertEqual(0, models.storage.count("MyModel"))
+
+    def test_count_after_objects_replaced(self):
+        User()
+        FileStorage._FileStorage__objects = {}
+        self.assertEqual(0, models.storage.count(User))
+
+    def test_del_from_all(self):
+        us = User()
+        ct = City()
+        ct.state_id = "s1"
+        models.storage.save()
+        del models.storage.all()["User." + us.id]
+        del models.storage.all()["City." + ct.id]
+        self.assertEqual(0, models.storage.count(User))
+        self.assertEqual({}, models.storage.all(User))
+        self.assertIsNone(models.storage.get(User, us.id))
+        self.assertEqual({}, models.storage.find(City, state_id="s1"))
+        models.storage.save()
+        with open("file.json", "r") as f:
+            self.assertNotIn("User." + us.id, f.read())
+
+    def test_insert_into_all(self):
+        ct = City(id="c1", state_id="s1")
+        models.storage.all()["City.c1"] = ct
+        self.assertIs(ct, models.storage.get(City, "c1"))
+        self.assertEqual({"City.c1": ct},
+                         models.storage.find(City, state_id="s1"))
+
+    def test_find_by_indexed_attribute(self):
+        pl = Place()
+        rv1 = Review()
+        rv1.place_id = pl.id
+        rv1.save()
+        rv2 = Review()
+        self.assertEqual({"Review." + rv1.id: rv1},
+                         models.storage.find(Review, place_id=pl.id))
+        self.assertEqual({}, models.storage.find("Review", place_id="1"))
+
+    def test_find_follows_updates(self):
+        ct = City()
+        ct.state_id = "s1"
+        ct.save()
+        ct.state_id = "s2"
+        ct.save()
+        self.assertEqual({}, models.storage.find(City, state_id="s1"))
+        found = models.storage.find(City, state_id="s2")
+        self.assertIn("City." + ct.id, found)
+
+    def test_find_after_delete(self):
+        ct = City()
+        ct.state_id = "s1"
+        ct.save()
+        models.storage.delete(ct)
+        self.assertEqual({}, models.storage.find(City, state_id="s1"))
+
+    def test_find_by_several_attributes(self):
+        rv1 = Review()
+        rv1.place_id = "p1"
+        rv1.user_id = "u1"
+        rv1.text = "Great"
+        rv1.save()
+        rv2 = Review()
+        rv2.place_id = "p1"
+        rv2.user_id = "u2"
+        rv2.save()
+        found = models.storage.find(Review, place_id="p1", user_id="u1")
+        self.assertEqual(["Review." + rv1.id], list(found))
+        found = models.storage.find(Review, place_id="p1", text="Great")
+        self.assertEqual(["Review." + rv1.id], list(found))
+
+    def test_find_after_reload(self):
+        ct = City()
+        ct.state_id = "s1"
+        ct.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        found = models.storage.find(City, state_id="s1")
+        self.assertIn("City." + ct.id, found)
+
+    def test_between(self):
+        pl1 = Place()
+        pl1.price_by_night = 50
+        pl1.max_guest = 2
+        pl2 = Place()
+        pl2.price_by_night = 120
+        pl2.max_guest = 6
+        for pl in (pl1, pl2):
+            models.storage.new(pl)
+        self.assertEqual({"Place." + pl2.id: pl2}, models.storage.between(
+            Place, price_by_night=(100, 200), max_guest=(4, None)))
+        pl2.price_by_night = 90
+        models.storage.new(pl2)
+        self.assertEqual({"Place." + pl1.id, "Place." + pl2.id},
+                         set(models.storage.between(
+                             "Place", price_by_night=(None, 100))))
+        models.storage.delete(pl1)
+        self.assertEqual(["Place." + pl2.id], list(models.storage.between(
+            Place, price_by_night=(None, 100))))
+
+    def test_order(self):
+        places = []
+        for price in (80, 20, 50):
+            pl = Place()
+            pl.price_by_night = price
+            models.storage.new(pl)
+            places.append(pl)
+        cheapest = models.storage.order(Place, "price_by_night", limit=2)
+        self.assertEqual([places[1], places[2]], list(cheapest.values()))
+        priciest = models.storage.order("Place", "price_by_night",
+                                        reverse=True, limit=1)
+        self.assertEqual([places[0]], list(priciest.values()))
+        self.assertEqual([places[2]], list(models.storage.order(
+            Place, "price_by_night", low=30, high=60).values()))
+        places[0].price_by_night = 10
+        models.storage.new(places[0])
+        models.storage.delete(places[1])
+        self.assertEqual([places[0], places[2]], list(models.storage.order(
+            Place, "price_by_night").values()))
+
+    def test_search(self):
+        pl1 = Place()
+        pl1.name = "Quiet loft"
+        pl2 = Place()
+        pl2.description = "A loft by the beach, with a beach view"
+        Place().name = "Loft"
+        rv = Review()
+        rv.text = "Great beach"
+        for obj in (pl1, pl2, rv):
+            models.storage.new(obj)
+        self.assertEqual([pl2], list(models.storage.search(
+            Place, "beach").values()))
+        self.assertEqual([pl1], list(models.storage.search(
+            "Place", "quiet loft", limit=1).values()))
+        self.assertEqual([rv], list(models.storage.search(
+            Review, "BEACH").values()))
+        self.assertEqual({}, models.storage.search(User, "beach"))
+        pl1.name = "Beach house"
+        models.storage.new(pl1)
+        models.storage.delete(pl2)
+        self.assertEqual([pl1], list(models.storage.search(
+            Place, "beach").values()))
+
+    def test_having(self):
+        pl1 = Place()
+        pl1.amenity_ids = ["wifi", "pool"]
+        pl2 = Place()
+        pl2.amenity_ids = ["wifi"]
+        Place()
+        for obj in (pl1, pl2):
+            models.storage.new(obj)
+        self.assertEqual({"Place." + pl1.id, "Place." + pl2.id},
+                         set(models.storage.having(
+                             Place, "amenity_ids", ["wifi"])))
+        self.assertEqual([pl1], list(models.storage.having(
+            "Place", "amenity_ids", ["wifi", "pool"]).values()))
+        self.assertEqual([pl1], list(models.storage.having(
+            Place, "amenity_ids", any_of=["pool", "sauna"]).values()))
+        pl1.amenity_ids = ["sauna"]
+        models.storage.new(pl1)
+        models.storage.delete(pl2)
+        self.assertEqual({}, models.storage.having(
+            Place, "amenity_ids", ["wifi"]))
+        self.assertEqual([pl1], list(models.storage.having(
+            Place, "amenity_ids", any_of=["sauna"]).values()))
+
+    def test_having_without_bitmap(self):
+        us = User()
+        us.tags = ["admin", "host"]
+        User().tags = "admin"
+        self.assertEqual([us], list(models.storage.having(
+            User, "tags", ["host"], ["admin", "guest"]).values()))
+        self.assertEqual({}, models.storage.having(User, "tags", ["guest"]))
+
+    def test_stats(self):
+        st = State()
+        cy1 = City()
+        cy1.state_id = st.id
+        cy2 = City()
+        cy2.state_id = st.id
+        places = []
+        for city, price in ((cy1, 80), (cy1, 20), (cy2, 50), (None, 10)):
+            pl = Place()
+            pl.city_id = city.id if city else "nowhere"
+            pl.price_by_night = price
+            places.append(pl)
+        for obj in [cy1, cy2] + places:
+            models.storage.new(obj)
+        stats = models.storage.stats(Place, "city_id", cy1.id)
+        self.assertEqual(2, stats["count"])
+        self.assertEqual(50, stats["price_by_night"]["avg"])
+        self.assertEqual({cy1.id, cy2.id, "nowhere"},
+                         set(models.storage.stats("Place", "city_id")))
+        stats = models.storage.stats(Place, "state_id", st.id)
+        self.assertEqual(3, stats["count"])
+        self.assertEqual(20, stats["price_by_night"]["min"])
+        self.assertEqual([st.id], list(models.storage.stats(
+            Place, "state_id")))
+        places[0].price_by_night = 5
+        models.storage.new(places[0])
+        models.storage.delete(places[1])
+        stats = models.storage.stats(Place, "state_id", st.id)
+        self.assertEqual(2, stats["count"])
+        self.assertEqual(55, stats["price_by_night"]["sum"])
+        cy2.state_id = "elsewhere"
+        models.storage.new(cy2)
+        self.assertEqual(1, models.storage.stats(
+            Place, "state_id", st.id)["count"])
+        self.assertEqual(0, models.storage.stats(
+            Place, "state_id", "nowhere")["count"])
+
+    def test_stats_reviews(self):
+        us = User()
+        for place_id in ("p1", "p1", "p2"):
+            rv = Review()
+            rv.place_id = place_id
+            rv.user_id = us.id
+            models.storage.new(rv)
+        self.assertEqual({"p1": {"count": 2}, "p2": {"count": 1}},
+                         models.storage.stats(Review, "place_id"))
+        self.assertEqual({"count": 3},
+                         models.storage.stats(Review, "user_id", us.id))
+
+    def test_stats_undeclared_attribute(self):
+        us1 = User()
+        us1.last_name = "Holberton"
+        us1.age = 30
+        us2 = User()
+        us2.last_name = "Holberton"
+        us2.age = 40
+        stats = models.storage.stats(User, "last_name", "Holberton")
+        self.assertEqual(2, stats["count"])
+        self.assertEqual(1, len(models.storage.stats(User, "last_name")))
+
+    def test_delete_cascade(self):
+        st = State()
+        cy = City()
+        cy.state_id = st.id
+        pl = Place()
+        pl.city_id = cy.id
+        pl.price_by_night = 50
+        rv = Review()
+        rv.place_id = pl.id
+        rv.text = "Great"
+        other = Place()
+        other.price_by_night = 60
+        for obj in (cy, pl, rv, other):
+            models.storage.new(obj)
+        models.storage.delete(st, cascade=True)
+        for obj in (st, cy, pl, rv):
+            self.assertIsNone(models.storage.get(type(obj), obj.id))
+        self.assertEqual([other], list(models.storage.order(
+            Place, "price_by_night").values()))
+        self.assertEqual({}, models.storage.search(Review, "great"))
+        self.assertEqual({}, models.storage.find(Review, place_id=pl.id))
+        models.storage.save()
+        with open("file.json", "r") as f:
+            text = f.read()
+        self.assertNotIn(rv.id, text)
+        self.assertIn(other.id, text)
+
+    def test_delete_without_cascade(self):
+        cy = City()
+        pl = Place()
+        pl.city_id = cy.id
+        models.storage.new(pl)
+        models.storage.delete(cy)
+        self.assertIs(pl, models.storage.get(Place, pl.id))
+
+    def test_order_undeclared_attribute(self):
+        us1 = User()
+        us1.age = 40
+        us2 = User()
+        us2.age = 30
+        self.assertEqual([us2, us1],
+                         list(models.storage.order(User, "age").values()))
+
+    def test_between_without_columns(self):
+        us = User()
+        us.age = 30
+        User().age = "old"
+        self.assertEqual(["User." + us.id],
+                         list(models.storage.between(User, age=(18, 65))))
+
+    def test_get(self):
+        us = User()
+        self.assertIs(us, models.storage.get(User, us.id))
+        self.assertIs(us, models.storage.get("User", us.id))
+        self.assertIsNone(models.storage.get(User, "1"))
+        self.assertIsNone(models.storage.get(State, us.id))
 
     def test_new(self):
         bm = BaseModel()
@@ -164,11 +494,976 @@ class TestFileStorage_methods(unittest.TestCase):
         self.assertIn("Amenity." + am.id, objs)
         self.assertIn("Review." + rv.id, objs)
 
+    def test_reload_in_parallel(self):
+        ids = [User().id for i in range(20)]
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__reload_workers = 3
+        try:
+            models.storage.reload()
+        finally:
+            FileStorage._FileStorage__reload_workers = 1
+        self.assertEqual(sorted(ids), sorted(
+            o.id for o in models.storage.all(User).values()))
+
+    def test_import_reloads_in_parallel(self):
+        ids = [User().id for i in range(20)]
+        env = dict(os.environ, HBNB_RELOAD_WORKERS="2",
+                   PYTHONPATH=os.getcwd())
+        code = ("import models\n"
+                "print(sorted(o.id for o in models.storage.all().values()))")
+        with tempfile.TemporaryDirectory() as d:
+            FileStorage._FileStorage__file_path = os.path.join(d, "file.json")
+            try:
+                models.storage.save()
+            finally:
+                FileStorage._FileStorage__file_path = "file.json"
+            proc = subprocess.run([sys.executable, "-c", code], cwd=d,
+                                  env=env, stdout=subprocess.PIPE,
+                                  universal_newlines=True, timeout=60)
+        self.assertEqual(0, proc.returncode)
+        self.assertEqual(str(sorted(ids)), proc.stdout.strip())
+
+    def test_reload_keeps_no_serialized_copy(self):
+        us = User()
+        us.first_name = "Betty"
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual({}, FileStorage._FileStorage__cache)
+        models.storage.save()
+        with open("file.json", "r") as f:
+            self.assertEqual("Betty",
+                             json.load(f)["User." + us.id]["first_name"])
+
+    def test_save_serializes_only_dirty_objects(self):
+        bm = BaseModel()
+        us = User()
+        models.storage.save()
+        with patch.object(BaseModel, "to_dict", autospec=True,
+                          side_effect=BaseModel.to_dict) as to_dict:
+            us.first_name = "Betty"
+            us.save()
+        self.assertEqual(1, to_dict.call_count)
+        with open("file.json", "r") as f:
+            objdict = json.load(f)
+        self.assertIn("BaseModel." + bm.id, objdict)
+        self.assertEqual("Betty", objdict["User." + us.id]["first_name"])
+
+    def test_save_persists_unreported_changes(self):
+        us = User()
+        models.storage.save()
+        us.first_name = "Betty"
+        models.storage.save()
+        with open("file.json", "r") as f:
+            objdict = json.load(f)
+        self.assertEqual("Betty", objdict["User." + us.id]["first_name"])
+
+    def test_commit_serializes_only_dirty_objects(self):
+        BaseModel()
+        us = User()
+        models.storage.save()
+        with patch.object(BaseModel, "to_dict", autospec=True,
+                          side_effect=BaseModel.to_dict) as to_dict:
+            models.storage.new(us)
+            models.storage.commit()
+        self.assertEqual(1, to_dict.call_count)
+
+    def test_save_after_delete(self):
+        bm = BaseModel()
+        models.storage.save()
+        models.storage.delete(bm)
+        models.storage.save()
+        with open("file.json", "r") as f:
+            self.assertNotIn("BaseModel." + bm.id, f.read())
+
     def test_reload_with_arg(self):
         with self.assertRaises(TypeError):
             models.storage.reload(None)
 
 
+class TestFileStorage_journal(unittest.TestCase):
+    """Unittests for testing the journaling mode of the FileStorage class."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        models.storage.save()
+        FileStorage._FileStorage__journaling = True
+
+    def tearDown(self):
+        FileStorage._FileStorage__journaling = False
+        FileStorage._FileStorage__compact_after = 1000
+        for path in ("file.json", "file.json.log", "file.json.text"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_save_appends_to_journal(self):
+        bm = BaseModel()
+        bm.save()
+        with open("file.json") as f:
+            self.assertNotIn("BaseModel." + bm.id, f.read())
+        with open("file.json.log") as f:
+            lines = f.readlines()
+        self.assertEqual(1, len(lines))
+        record = json.loads(lines[0])
+        self.assertEqual(["set", "BaseModel." + bm.id], record[:2])
+
+    def test_save_only_appends_changes(self):
+        us = User()
+        st = State()
+        models.storage.save()
+        st.save()
+        with open("file.json.log") as f:
+            keys = [json.loads(line)[1] for line in f]
+        self.assertEqual(3, len(keys))
+        self.assertEqual("State." + st.id, keys[-1])
+
+    def test_save_only_appends_changed_objects(self):
+        us = User()
+        State()
+        models.storage.save()
+        us.first_name = "Betty"
+        models.storage.save()
+        with open("file.json.log") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(3, len(records))
+        self.assertEqual("Betty", records[-1][2]["first_name"])
+
+    def test_delete_appends_record(self):
+        bm = BaseModel()
+        models.storage.save()
+        models.storage.delete(bm)
+        models.storage.save()
+        with open("file.json.log") as f:
+            last = json.loads(f.readlines()[-1])
+        self.assertEqual(["del", "BaseModel." + bm.id], last)
+
+    def test_delete_cascade_appends_once(self):
+        st = State()
+        for i in range(3):
+            cy = City()
+            cy.state_id = st.id
+            models.storage.new(cy)
+        models.storage.save()
+        with patch("builtins.open", wraps=open) as opened:
+            models.storage.delete(st, cascade=True)
+            models.storage.commit()
+        self.assertEqual(1, opened.call_count)
+        with open("file.json.log") as f:
+            records = [json.loads(line) for line in f][-4:]
+        self.assertEqual(["del"] * 4, [record[0] for record in records])
+        self.assertEqual(0, models.storage.count(City))
+
+    def test_reload_replays_journal(self):
+        us = User()
+        st = State()
+        models.storage.save()
+        us.first_name = "Betty"
+        us.save()
+        models.storage.delete(st)
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        objs = models.storage.all()
+        self.assertIn("User." + us.id, objs)
+        self.assertEqual("Betty", objs["User." + us.id].first_name)
+        self.assertNotIn("State." + st.id, objs)
+
+    def test_compaction_rewrites_snapshot(self):
+        FileStorage._FileStorage__compact_after = 3
+        bm = BaseModel()
+        models.storage.save()
+        bm.save()
+        self.assertTrue(os.path.exists("file.json.log"))
+        bm.save()
+        self.assertFalse(os.path.exists("file.json.log"))
+        with open("file.json") as f:
+            self.assertIn("BaseModel." + bm.id, f.read())
+
+
+class TestFileStorage_lazy(unittest.TestCase):
+    """Unittests for testing the lazy loading mode of FileStorage."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.us = User()
+        self.us.first_name = "Betty"
+        self.ct = City()
+        self.ct.state_id = "s1"
+        self.ct.name = "Nairobi"
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__lazy = True
+        models.storage.reload()
+
+    def tearDown(self):
+        FileStorage._FileStorage__lazy = False
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.remove("file.json.text")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_reload_creates_no_instance(self):
+        self.assertEqual({}, FileStorage._FileStorage__objects)
+        self.assertEqual(2, models.storage.count())
+        self.assertEqual(1, models.storage.count(City))
+
+    def test_get_creates_instance(self):
+        us = models.storage.get(User, self.us.id)
+        self.assertEqual(User, type(us))
+        self.assertEqual("Betty", us.first_name)
+        self.assertEqual(["User." + self.us.id],
+                         list(FileStorage._FileStorage__objects))
+        self.assertIs(us, models.storage.get(User, self.us.id))
+        self.assertNotIn("User." + self.us.id,
+                         FileStorage._FileStorage__cache)
+
+    def test_all_creates_instances(self):
+        self.assertEqual(1, len(models.storage.all(User)))
+        self.assertEqual(1, len(FileStorage._FileStorage__objects))
+        self.assertEqual(2, len(models.storage.all()))
+
+    def test_find_creates_matches_only(self):
+        found = models.storage.find(City, name="Nairobi", state_id="s1")
+        self.assertEqual(["City." + self.ct.id], list(found))
+        self.assertEqual({}, models.storage.find(City, name="Mombasa"))
+        self.assertEqual(1, len(FileStorage._FileStorage__objects))
+
+    def test_save_keeps_unloaded_objects(self):
+        models.storage.get(User, self.us.id).save()
+        self.assertEqual(1, len(FileStorage._FileStorage__objects))
+        with open("file.json", "r") as f:
+            objdict = json.load(f)
+        self.assertIn("City." + self.ct.id, objdict)
+        self.assertIn("User." + self.us.id, objdict)
+
+    def test_delete_cascade_creates_no_instance(self):
+        models.storage.delete(State(id="s1"), cascade=True)
+        self.assertEqual({}, FileStorage._FileStorage__objects)
+        self.assertEqual(0, models.storage.count(City))
+        models.storage.save()
+        with open("file.json", "r") as f:
+            self.assertNotIn("City." + self.ct.id, f.read())
+
+    def test_delete_unloaded_object(self):
+        models.storage.delete(models.storage.get(City, self.ct.id))
+        models.storage.save()
+        self.assertIsNone(models.storage.get(City, self.ct.id))
+        self.assertEqual(1, models.storage.count())
+        with open("file.json", "r") as f:
+            self.assertNotIn("City." + self.ct.id, f.read())
+
+    def test_indexes_built_by_first_query(self):
+        FileStorage._FileStorage__lazy = False
+        for price, name in ((80, "quiet loft"), (40, "sunny loft")):
+            pl = Place()
+            pl.city_id = "c1"
+            pl.name = name
+            pl.price_by_night = price
+            pl.latitude = 1.0
+            pl.longitude = 2.0
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__lazy = True
+        models.storage.reload()
+        self.assertEqual({}, FileStorage._FileStorage__sorted)
+        self.assertEqual({}, FileStorage._FileStorage__geo)
+        pl = Place()
+        pl.name = "loft"
+        pl.price_by_night = 60
+        pl.save()
+        prices = models.storage.order(Place, "price_by_night").values()
+        self.assertEqual([40, 60, 80], [p.price_by_night for p in prices])
+        self.assertEqual(3, len(models.storage.search(Place, "loft")))
+        self.assertEqual(2, models.storage.stats(Place, "city_id",
+                                                 "c1")["count"])
+        self.assertEqual(2, len(models.storage.near(Place, 1.0, 2.0, 1)))
+        self.assertNotIn("Place", FileStorage._FileStorage__deferred)
+
+
+class TestFileStorage_format(unittest.TestCase):
+    """Unittests for testing FileStorage with the pickle format."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__serializer = serializers["pickle"]
+        FileStorage._FileStorage__file_path = "file.pkl"
+
+    def tearDown(self):
+        FileStorage._FileStorage__serializer = serializers["json"]
+        FileStorage._FileStorage__file_path = "file.json"
+        try:
+            os.remove("file.pkl")
+        except IOError:
+            pass
+        try:
+            os.remove("file.pkl.text")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_save_and_reload(self):
+        us = User()
+        us.first_name = "Betty"
+        pl = Place()
+        pl.amenity_ids = ["a", "b"]
+        models.storage.save()
+        with open("file.pkl", "rb") as f:
+            self.assertEqual(b"HBNB", f.read(4))
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        us = models.storage.get(User, us.id)
+        self.assertEqual("Betty", us.first_name)
+        pl = models.storage.get(Place, pl.id)
+        self.assertEqual(["a", "b"], pl.amenity_ids)
+
+
+class TestFileStorage_durability(unittest.TestCase):
+    """Unittests for testing the crash safety of FileStorage saves."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        FileStorage._FileStorage__durability = "none"
+        FileStorage._FileStorage__journaling = False
+        FileStorage._FileStorage__failed = False
+        for path in ("file.json", "file.json.log", "file.json.text"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_failed_save_keeps_snapshot(self):
+        bm = BaseModel()
+        models.storage.save()
+        with open("file.json", "r") as f:
+            before = f.read()
+        with patch.object(JSONSerializer, "dump", side_effect=OSError):
+            with self.assertRaises(OSError):
+                BaseModel().save()
+        with open("file.json", "r") as f:
+            self.assertEqual(before, f.read())
+        self.assertEqual([], [p for p in os.listdir(".") if
+                              p.startswith("file.json.") and
+                              p.endswith(".tmp")])
+
+    def test_no_fsync_by_default(self):
+        BaseModel()
+        with patch("os.fsync") as fsync:
+            models.storage.save()
+        fsync.assert_not_called()
+
+    def test_fsync_snapshot(self):
+        FileStorage._FileStorage__durability = "fsync"
+        BaseModel()
+        with patch("os.fsync") as fsync:
+            models.storage.save()
+        self.assertEqual(2, fsync.call_count)
+
+    def test_fsync_journal(self):
+        FileStorage._FileStorage__durability = "fsync"
+        FileStorage._FileStorage__journaling = True
+        bm = BaseModel()
+        with patch("os.fsync") as fsync:
+            bm.save()
+            self.assertEqual(2, fsync.call_count)
+            bm.save()
+        self.assertEqual(3, fsync.call_count)
+
+    def test_fsync_journal_removal(self):
+        FileStorage._FileStorage__durability = "fsync"
+        FileStorage._FileStorage__journaling = True
+        FileStorage._FileStorage__compact_after = 1
+        bm = BaseModel()
+        try:
+            with patch.object(FileStorage,
+                              "_FileStorage__sync_directory") as sync:
+                bm.save()
+        finally:
+            FileStorage._FileStorage__compact_after = 1000
+        self.assertFalse(os.path.exists("file.json.log"))
+        self.assertEqual(["file.json.log", "file.json", "file.json.log"],
+                         [call[0][0] for call in sync.call_args_list])
+
+    def test_group_commit_journal(self):
+        FileStorage._FileStorage__durability = "group"
+        FileStorage._FileStorage__journaling = True
+        FileStorage._FileStorage__group_size = 3
+        FileStorage._FileStorage__group_window = 3600
+        FileStorage._FileStorage__synced_at = monotonic()
+        bm = BaseModel()
+        try:
+            with patch("os.fsync") as fsync:
+                for i in range(6):
+                    bm.save()
+        finally:
+            FileStorage._FileStorage__group_size = 64
+            FileStorage._FileStorage__group_window = 1.0
+        self.assertEqual(3, fsync.call_count)
+
+    def test_flush_syncs_group_commit(self):
+        FileStorage._FileStorage__durability = "group"
+        FileStorage._FileStorage__journaling = True
+        FileStorage._FileStorage__group_window = 3600
+        FileStorage._FileStorage__synced_at = monotonic()
+        bm = BaseModel()
+        try:
+            with patch("os.fsync") as fsync:
+                bm.save()
+                bm.save()
+                self.assertEqual(1, fsync.call_count)
+                models.storage.flush()
+                self.assertEqual(2, fsync.call_count)
+                models.storage.flush()
+                self.assertEqual(2, fsync.call_count)
+        finally:
+            FileStorage._FileStorage__group_window = 1.0
+
+    def test_unknown_durability(self):
+        env = dict(os.environ, HBNB_STORAGE_DURABILITY="always",
+                   PYTHONPATH=os.getcwd())
+        with tempfile.TemporaryDirectory() as d:
+            proc = subprocess.run([sys.executable, "-c", "import models"],
+                                  cwd=d, env=env, stderr=subprocess.PIPE,
+                                  universal_newlines=True)
+        self.assertNotEqual(0, proc.returncode)
+        self.assertIn("ValueError", proc.stderr)
+
+    def test_torn_journal_record_ignored(self):
+        FileStorage._FileStorage__journaling = True
+        us = User()
+        us.save()
+        with open("file.json.log", "a") as f:
+            f.write('["set", "User.1", {"id": "1"')
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(["User." + us.id], list(models.storage.all()))
+
+
+class TestFileStorage_batch(unittest.TestCase):
+    """Unittests for testing the coalescing of FileStorage saves."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__batch_size = 3
+
+    def tearDown(self):
+        FileStorage._FileStorage__batch_size = 1
+        FileStorage._FileStorage__batch_window = 0
+        FileStorage._FileStorage__pending_saves = 0
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.remove("file.json.text")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_saves_are_coalesced(self):
+        bm = BaseModel()
+        bm.save()
+        bm.save()
+        self.assertFalse(os.path.exists("file.json"))
+        bm.save()
+        with open("file.json", "r") as f:
+            self.assertIn("BaseModel." + bm.id, f.read())
+
+    def test_flush(self):
+        bm = BaseModel()
+        bm.save()
+        models.storage.flush()
+        with open("file.json", "r") as f:
+            self.assertIn("BaseModel." + bm.id, f.read())
+
+    def test_pending_saves_written_at_exit(self):
+        env = dict(os.environ, HBNB_SAVE_BATCH="10",
+                   PYTHONPATH=os.getcwd())
+        with tempfile.TemporaryDirectory() as d:
+            subprocess.run([sys.executable, "-c",
+                            "from models.base_model import BaseModel\n"
+                            "BaseModel(id='ab').save()"],
+                           cwd=d, env=env, check=True)
+            with open(os.path.join(d, "file.json"), "r") as f:
+                self.assertIn("BaseModel.ab", f.read())
+
+    def test_flush_without_pending_save(self):
+        BaseModel()
+        models.storage.flush()
+        self.assertFalse(os.path.exists("file.json"))
+
+    def test_flush_with_arg(self):
+        with self.assertRaises(TypeError):
+            models.storage.flush(None)
+
+    def test_batch_window(self):
+        FileStorage._FileStorage__batch_size = 1000
+        FileStorage._FileStorage__batch_window = 0.05
+        bm = BaseModel()
+        bm.save()
+        self.assertFalse(os.path.exists("file.json"))
+        sleep(0.06)
+        bm.save()
+        self.assertTrue(os.path.exists("file.json"))
+
+
+class TestFileStorage_background(unittest.TestCase):
+    """Unittests for testing the background writer of FileStorage."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__background = True
+
+    def tearDown(self):
+        models.storage.flush()
+        FileStorage._FileStorage__background = False
+        FileStorage._FileStorage__journaling = False
+        FileStorage._FileStorage__queue_size = 8
+        FileStorage._FileStorage__writer = None
+        FileStorage._FileStorage__queue = None
+        FileStorage._FileStorage__error = None
+        FileStorage._FileStorage__failed = False
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.remove("file.json.text")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_flush_waits_for_writer(self):
+        bm = BaseModel()
+        bm.save()
+        models.storage.flush()
+        with open("file.json", "r") as f:
+            self.assertIn("BaseModel." + bm.id, f.read())
+
+    def test_journal_records_in_order(self):
+        FileStorage._FileStorage__journaling = True
+        bm = BaseModel()
+        for i in range(20):
+            bm.number = i
+            bm.save()
+        models.storage.flush()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(19, models.storage.get(BaseModel, bm.id).number)
+        os.remove("file.json.log")
+
+    def test_flush_raises_writer_error(self):
+        with patch.object(JSONSerializer, "dump", side_effect=OSError):
+            BaseModel().save()
+            with self.assertRaises(OSError):
+                models.storage.flush()
+        models.storage.flush()
+
+    def test_failed_journal_append_is_not_lost(self):
+        FileStorage._FileStorage__journaling = True
+        bm = BaseModel()
+        bm.save()
+        models.storage.flush()
+        us = User()
+        with patch("builtins.open", side_effect=OSError):
+            us.save()
+            models.storage._FileStorage__queue.join()
+        st = State()
+        with self.assertRaises(OSError):
+            st.save()
+        models.storage.flush()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertIsNotNone(models.storage.get(BaseModel, bm.id))
+        self.assertIsNotNone(models.storage.get(User, us.id))
+        self.assertIsNotNone(models.storage.get(State, st.id))
+        try:
+            os.remove("file.json.log")
+        except IOError:
+            pass
+
+    def test_back_pressure(self):
+        FileStorage._FileStorage__queue_size = 1
+        release = threading.Event()
+        dump = JSONSerializer.dump
+
+        def slow_dump(serializer, objdict, f):
+            release.wait()
+            dump(serializer, objdict, f)
+
+        bm = BaseModel()
+        try:
+            with patch.object(JSONSerializer, "dump", slow_dump):
+                bm.save()
+                bm.save()
+                saver = threading.Thread(target=bm.save)
+                saver.start()
+                saver.join(0.1)
+                self.assertTrue(saver.is_alive())
+                release.set()
+                saver.join()
+                models.storage.flush()
+        finally:
+            release.set()
+
+
+class TestFileStorage_sharding(unittest.TestCase):
+    """Unittests for testing the sharded snapshots of FileStorage."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__sharding = "class"
+
+    def tearDown(self):
+        FileStorage._FileStorage__sharding = ""
+        FileStorage._FileStorage__shard_count = 0
+        for path in glob.glob("file.*.json") + glob.glob("file.*.json.text"):
+            os.remove(path)
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_one_file_per_class(self):
+        us = User()
+        st = State()
+        models.storage.save()
+        self.assertFalse(os.path.exists("file.json"))
+        with open("file.User.json", "r") as f:
+            self.assertEqual(["User." + us.id], list(json.load(f)))
+        with open("file.State.json", "r") as f:
+            self.assertEqual(["State." + st.id], list(json.load(f)))
+
+    def test_only_changed_shards_rewritten(self):
+        User()
+        st = State()
+        models.storage.save()
+        with patch.object(JSONSerializer, "dump", autospec=True,
+                          side_effect=JSONSerializer.dump) as dump:
+            st.name = "Texas"
+            st.save()
+        self.assertEqual(1, dump.call_count)
+        self.assertEqual(["State." + st.id], list(dump.call_args[0][1]))
+
+    def test_empty_shard_removed(self):
+        st = State()
+        models.storage.save()
+        models.storage.delete(st)
+        models.storage.save()
+        self.assertFalse(os.path.exists("file.State.json"))
+
+    def test_reload(self):
+        us = User()
+        us.first_name = "Betty"
+        State()
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(2, models.storage.count())
+        self.assertEqual("Betty",
+                         models.storage.get(User, us.id).first_name)
+
+    def test_reload_keeps_unchanged_shards(self):
+        st = State()
+        Review()
+        models.storage.save()
+        mtime = os.stat("file.Review.json").st_mtime_ns
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        with patch.object(JSONSerializer, "dump", autospec=True,
+                          side_effect=JSONSerializer.dump) as dump:
+            st = models.storage.get(State, st.id)
+            st.name = "Texas"
+            st.save()
+        self.assertEqual(1, dump.call_count)
+        self.assertEqual(["State." + st.id], list(dump.call_args[0][1]))
+        self.assertEqual(mtime, os.stat("file.Review.json").st_mtime_ns)
+
+    def test_reload_marks_journal_shards_stale(self):
+        FileStorage._FileStorage__journaling = True
+        try:
+            us = User()
+            st = State()
+            models.storage.save()
+            FileStorage._FileStorage__objects = {}
+            models.storage.reload()
+            FileStorage._FileStorage__compact_after = 1
+            models.storage.get(User, us.id).save()
+        finally:
+            FileStorage._FileStorage__journaling = False
+            FileStorage._FileStorage__compact_after = 1000
+        self.assertFalse(os.path.exists("file.json.log"))
+        with open("file.State.json", "r") as f:
+            self.assertEqual(["State." + st.id], list(json.load(f)))
+
+    def test_text_indexes_per_shard(self):
+        rv = Review()
+        rv.text = "Quiet loft"
+        st = State()
+        models.storage.save()
+        with open("file.Review.json.text") as f:
+            data = json.load(f)
+        self.assertEqual(["Review." + rv.id],
+                         list(data["indexes"]["Review"]["counts"]))
+        self.assertEqual("file.Review.json", data["snapshot"][0][0])
+        mtime = os.stat("file.Review.json.text").st_mtime_ns
+        st.name = "Texas"
+        st.save()
+        self.assertEqual(mtime, os.stat("file.Review.json.text").st_mtime_ns)
+        data["indexes"]["Review"]["counts"]["Review." + rv.id] = {"mark": 1}
+        with open("file.Review.json.text", "w") as f:
+            json.dump(data, f)
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(["Review." + rv.id],
+                         list(models.storage.search(Review, "mark")))
+        models.storage.delete(models.storage.get(Review, rv.id))
+        models.storage.save()
+        self.assertFalse(os.path.exists("file.Review.json.text"))
+
+    def test_hash_sharding(self):
+        FileStorage._FileStorage__sharding = "hash"
+        FileStorage._FileStorage__shard_count = 4
+        ids = [User().id for i in range(20)]
+        models.storage.save()
+        self.assertLessEqual(len(glob.glob("file.[0-3].json")), 4)
+        self.assertGreater(len(glob.glob("file.[0-3].json")), 1)
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(sorted(ids), sorted(o.id for o in
+                                             models.storage.all().values()))
+
+
+class TestFileStorage_mmap(unittest.TestCase):
+    """Unittests for testing the read-only mapped mode of FileStorage."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.us = User()
+        self.us.first_name = "Betty"
+        self.ct = City()
+        self.ct.state_id = "s1"
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__mmap = True
+        models.storage.reload()
+
+    def tearDown(self):
+        FileStorage._FileStorage__mmap = False
+        FileStorage._FileStorage__objects = {}
+        models.storage.count()
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.remove("file.json.text")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+
+    def test_reload_decodes_nothing(self):
+        self.assertEqual({}, FileStorage._FileStorage__objects)
+        self.assertEqual({}, FileStorage._FileStorage__cache)
+        self.assertEqual(2, models.storage.count())
+        self.assertEqual(1, models.storage.count(City))
+
+    def test_get(self):
+        us = models.storage.get(User, self.us.id)
+        self.assertEqual("Betty", us.first_name)
+        self.assertEqual(["User." + self.us.id],
+                         list(FileStorage._FileStorage__objects))
+
+    def test_all_and_find(self):
+        self.assertEqual(["City." + self.ct.id],
+                         list(models.storage.all(City)))
+        self.assertEqual(["City." + self.ct.id],
+                         list(models.storage.find(City, state_id="s1")))
+        self.assertEqual({}, models.storage.find(City, state_id="s2"))
+        self.assertEqual(2, len(models.storage.all()))
+
+    def test_writes_raise(self):
+        with self.assertRaises(io.UnsupportedOperation):
+            User()
+        us = models.storage.get(User, self.us.id)
+        with self.assertRaises(io.UnsupportedOperation):
+            us.save()
+        with self.assertRaises(io.UnsupportedOperation):
+            models.storage.delete(us)
+        with self.assertRaises(io.UnsupportedOperation):
+            models.storage.save()
+
+    def test_single_line_snapshot(self):
+        with open("file.json", "r") as f:
+            objdict = json.load(f)
+        with open("file.json", "w") as f:
+            json.dump(objdict, f)
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual("Betty",
+                         models.storage.get(User, self.us.id).first_name)
+
+    def test_indented_snapshot(self):
+        with open("file.json", "r") as f:
+            objdict = json.load(f)
+        for indent in (0, 4):
+            with open("file.json", "w") as f:
+                json.dump(objdict, f, indent=indent)
+            FileStorage._FileStorage__objects = {}
+            models.storage.reload()
+            self.assertEqual("Betty",
+                             models.storage.get(User, self.us.id).first_name)
+            self.assertEqual(1, models.storage.count(City))
+
+
+class TestFileStorage_text(unittest.TestCase):
+    """Unittests for testing the text indexes written with snapshots."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "file.json")
+        FileStorage._FileStorage__file_path = self.path
+        FileStorage._FileStorage__objects = {}
+        self.rv = Review()
+        self.rv.text = "Quiet loft"
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        FileStorage._FileStorage__file_path = "file.json"
+        FileStorage._FileStorage__objects = {}
+        for name in os.listdir(self.tmpdir):
+            os.remove(os.path.join(self.tmpdir, name))
+        os.rmdir(self.tmpdir)
+
+    def edit_text(self, edit):
+        """Rewrite the text indexes file with edit applied to its data."""
+        with open(self.path + ".text") as f:
+            data = json.load(f)
+        edit(data)
+        with open(self.path + ".text", "w") as f:
+            json.dump(data, f)
+
+    def search(self, words):
+        """Reload storage and return the ids of the reviews matching words."""
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        return [o.id for o in models.storage.search(Review, words).values()]
+
+    def test_written_with_snapshot(self):
+        with open(self.path + ".text") as f:
+            data = json.load(f)
+        key = "Review." + self.rv.id
+        self.assertEqual({"quiet": 1, "loft": 1},
+                         data["indexes"]["Review"]["counts"][key])
+        self.assertEqual(["text"], data["indexes"]["Review"]["attrs"])
+        self.assertEqual(self.path, data["snapshot"][0][0])
+
+    def test_reload_reads_index(self):
+        key = "Review." + self.rv.id
+
+        def edit(data):
+            data["indexes"]["Review"]["counts"][key] = {"marker": 1}
+        self.edit_text(edit)
+        self.assertEqual([self.rv.id], self.search("marker"))
+        self.assertEqual([], self.search("quiet"))
+
+    def test_reload_ignores_stale_index(self):
+        def edit(data):
+            data["indexes"]["Review"]["counts"] = {}
+            data["snapshot"][0][2] -= 1
+        self.edit_text(edit)
+        self.assertEqual([self.rv.id], self.search("quiet"))
+
+    def test_reload_ignores_changed_attrs(self):
+        def edit(data):
+            data["indexes"]["Review"]["counts"] = {}
+            data["indexes"]["Review"]["attrs"] = ["title"]
+        self.edit_text(edit)
+        self.assertEqual([self.rv.id], self.search("quiet"))
+
+    def test_reload_without_index(self):
+        os.remove(self.path + ".text")
+        self.assertEqual([self.rv.id], self.search("loft"))
+
+    def test_journal_replayed_on_index(self):
+        FileStorage._FileStorage__journaling = True
+        try:
+            models.storage.reload()
+            rv = models.storage.get(Review, self.rv.id)
+            rv.text = "Loud party"
+            models.storage.new(rv)
+            models.storage.commit()
+            self.assertEqual([self.rv.id], self.search("party"))
+            self.assertEqual([], self.search("quiet"))
+        finally:
+            FileStorage._FileStorage__journaling = False
+            FileStorage._FileStorage__journal_size = 0
+
+
 if __name__ == "__main__":
     unittest.main()
 
@@ -0,0 +1,409 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/indexes.py.
+
+Unittest classes:
+    TestHashIndex
+    TestBitmapIndex
+    TestGroupStats
+    TestColumnStore
+    TestGridIndex
+    TestSortedIndex
+    TestTextIndex
+"""
+import unittest
+from models.engine.indexes import BitmapIndex, ColumnStore, GridIndex
+from models.engine.indexes import GroupStats, HashIndex
+from models.engine.indexes import SortedIndex, TextIndex, haversine
+from models.engine.indexes import tokenize
+
+
+class TestHashIndex(unittest.TestCase):
+    """Unittests for testing the HashIndex class."""
+
+    def test_attr(self):
+        self.assertEqual("state_id", HashIndex("state_id").attr)
+
+    def test_add_and_get(self):
+        index = HashIndex("state_id")
+        index.add("City.1", "s1")
+        index.add("City.2", "s1")
+        index.add("City.3", "s2")
+        self.assertEqual({"City.1", "City.2"}, index.get("s1"))
+        self.assertEqual({"City.3"}, index.get("s2"))
+
+    def test_get_missing_value(self):
+        self.assertEqual(set(), HashIndex("state_id").get("s1"))
+
+    def test_add_replaces_value(self):
+        index = HashIndex("state_id")
+        index.add("City.1", "s1")
+        index.add("City.1", "s2")
+        self.assertEqual(set(), index.get("s1"))
+        self.assertEqual({"City.1"}, index.get("s2"))
+
+    def test_remove(self):
+        index = HashIndex("state_id")
+        index.add("City.1", "s1")
+        index.remove("City.1")
+        index.remove("City.2")
+        self.assertEqual(set(), index.get("s1"))
+
+
+class TestColumnStore(unittest.TestCase):
+    """Unittests for testing the ColumnStore class."""
+
+    def setUp(self):
+        self.store = ColumnStore(("price", "guests"))
+        self.store.set("Place.1", {"price": 50, "guests": 2})
+        self.store.set("Place.2", {"price": 120, "guests": 4})
+        self.store.set("Place.3", {"price": 80.5, "guests": 6})
+
+    def test_attrs(self):
+        self.assertEqual(("price", "guests"), self.store.attrs)
+
+    def test_len(self):
+        self.assertEqual(3, len(self.store))
+
+    def test_select(self):
+        self.assertEqual({"Place.1", "Place.3"},
+                         set(self.store.select({"price": (50, 100)})))
+        self.assertEqual(["Place.3"], self.store.select(
+            {"price": (None, 100), "guests": (4, None)}))
+        self.assertEqual({"Place.1", "Place.2", "Place.3"},
+                         set(self.store.select({})))
+
+    def test_set_replaces_values(self):
+        self.store.set("Place.1", {"price": 500, "guests": 2})
+        self.assertEqual(["Place.1"],
+                         self.store.select({"price": (400, None)}))
+        self.assertEqual(3, len(self.store))
+
+    def test_remove(self):
+        self.store.remove("Place.1")
+        self.store.remove("Place.9")
+        self.assertEqual(2, len(self.store))
+        self.assertEqual({"Place.2", "Place.3"},
+                         set(self.store.select({"price": (0, None)})))
+        self.store.remove("Place.3")
+        self.assertEqual(["Place.2"], self.store.select({}))
+
+    def test_non_numbers_never_match(self):
+        self.store.set("Place.4", {"price": "cheap", "guests": True})
+        self.assertNotIn("Place.4", self.store.select({"price": (0, None)}))
+        self.assertNotIn("Place.4", self.store.select({"guests": (0, 9)}))
+
+    def test_empty(self):
+        self.assertEqual([], ColumnStore(("price",)).select({}))
+
+
+class TestGridIndex(unittest.TestCase):
+    """Unittests for testing the GridIndex class and haversine."""
+
+    def setUp(self):
+        self.grid = GridIndex(("latitude", "longitude"))
+        self.grid.add("Place.nairobi", -1.2921, 36.8219)
+        self.grid.add("Place.mombasa", -4.0435, 39.6682)
+        self.grid.add("Place.fiji", -17.71, 179.9)
+        self.grid.add("Place.samoa", -13.76, -172.1)
+
+    def test_haversine(self):
+        self.assertAlmostEqual(440, haversine(-1.2921, 36.8219,
+                                              -4.0435, 39.6682), delta=5)
+        self.assertEqual(0, haversine(10, 20, 10, 20))
+
+    def test_len(self):
+        self.assertEqual(4, len(self.grid))
+
+    def test_within(self):
+        self.assertEqual(["Place.nairobi"],
+                         self.grid.within(-2, 36, -1, 37))
+        self.assertEqual({"Place.nairobi", "Place.mombasa"},
+                         set(self.grid.within(-90, 0, 90, 170)))
+
+    def test_within_across_antimeridian(self):
+        self.assertEqual({"Place.fiji", "Place.samoa"},
+                         set(self.grid.within(-20, 170, -10, -170)))
+
+    def test_near(self):
+        pairs = self.grid.near(-1.3, 36.8, 500)
+        self.assertEqual(["Place.nairobi", "Place.mombasa"],
+                         [key for key, distance in pairs])
+        self.assertLess(pairs[0][1], 5)
+        self.assertEqual([], self.grid.near(-1.3, 36.8, 1))
+
+    def test_near_across_antimeridian(self):
+        keys = [key for key, distance in self.grid.near(-15, -178, 1000)]
+        self.assertEqual(["Place.fiji", "Place.samoa"], keys)
+
+    def test_add_replaces_point(self):
+        self.grid.add("Place.nairobi", 10.0, 10.0)
+        self.assertEqual([], self.grid.within(-2, 36, -1, 37))
+        self.assertEqual(4, len(self.grid))
+
+    def test_remove_and_non_numbers(self):
+        self.grid.remove("Place.nairobi")
+        self.grid.remove("Place.missing")
+        self.grid.add("Place.mombasa", "", None)
+        self.assertEqual(2, len(self.grid))
+
+
+class TestBitmapIndex(unittest.TestCase):
+    """Unittests for testing the BitmapIndex class."""
+
+    def setUp(self):
+        self.index = BitmapIndex("amenity_ids")
+        self.index.add("Place.0", ["wifi", "pool"])
+        self.index.add("Place.1", ["wifi", "parking"])
+        self.index.add("Place.2", ["wifi", "pool", "parking"])
+        self.index.add("Place.3", [])
+
+    def test_attr(self):
+        self.assertEqual("amenity_ids", self.index.attr)
+        self.assertEqual(4, len(self.index))
+
+    def test_all_of(self):
+        self.assertEqual(["Place.0", "Place.2"],
+                         self.index.select(["wifi", "pool"]))
+        self.assertEqual(["Place.2"],
+                         self.index.select(["pool", "parking", "wifi"]))
+        self.assertEqual([], self.index.select(["pool", "sauna"]))
+
+    def test_any_of(self):
+        self.assertEqual(["Place.0", "Place.1", "Place.2"],
+                         self.index.select(any_of=["pool", "parking"]))
+        self.assertEqual([], self.index.select(any_of=["sauna"]))
+
+    def test_all_and_any_of(self):
+        self.assertEqual(["Place.1", "Place.2"], self.index.select(
+            ["wifi"], ["parking", "sauna"]))
+
+    def test_no_items(self):
+        self.assertEqual(["Place.0", "Place.1", "Place.2", "Place.3"],
+                         self.index.select())
+
+    def test_add_replaces(self):
+        self.index.add("Place.0", ["sauna"])
+        self.assertEqual(["Place.2"], self.index.select(["pool"]))
+        self.assertEqual(["Place.0"], self.index.select(["sauna"]))
+
+    def test_other_values(self):
+        self.index.add("Place.4", "wifi")
+        self.index.add("Place.5", ["wifi", ["pool"], {"a": 1}])
+        self.assertEqual(["Place.0", "Place.1", "Place.2", "Place.5"],
+                         self.index.select(["wifi"]))
+
+    def test_remove_reuses_ordinal(self):
+        self.index.remove("Place.1")
+        self.index.remove("Place.9")
+        self.assertEqual(["Place.2"], self.index.select(["parking"]))
+        self.index.add("Place.4", ["parking"])
+        self.assertEqual(["Place.4", "Place.2"],
+                         self.index.select(["parking"]))
+
+    def test_chunks(self):
+        index = BitmapIndex("amenity_ids")
+        count = 3 * 2 ** BitmapIndex.chunk_bits
+        for i in range(count):
+            index.add(i, ["wifi"] if i % 1000 == 0 else ["pool"])
+        self.assertEqual(list(range(0, count, 1000)), index.select(["wifi"]))
+        index.remove(0)
+        self.assertEqual(list(range(1000, count, 1000)),
+                         index.select(["wifi"]))
+
+
+class TestGroupStats(unittest.TestCase):
+    """Unittests for testing the GroupStats class."""
+
+    def setUp(self):
+        self.stats = GroupStats("city_id", ("price_by_night", "max_guest"))
+        for i, (city, price) in enumerate(
+                (("c1", 80), ("c1", 20), ("c2", 50), ("c1", "n/a"))):
+            self.stats.add("Place.{}".format(i), city,
+                           {"price_by_night": price, "max_guest": 2})
+
+    def test_attrs(self):
+        self.assertEqual("city_id", self.stats.attr)
+        self.assertEqual(("price_by_night", "max_guest"), self.stats.fields)
+        self.assertEqual(4, len(self.stats))
+        self.assertEqual({"c1", "c2"}, set(self.stats.groups()))
+
+    def test_get(self):
+        stats = self.stats.get("c1")
+        self.assertEqual(3, stats["count"])
+        self.assertEqual({"count": 2, "sum": 100, "min": 20, "max": 80,
+                          "avg": 50}, stats["price_by_night"])
+        self.assertEqual(6, stats["max_guest"]["sum"])
+
+    def test_get_empty_group(self):
+        self.assertEqual({"count": 0,
+                          "price_by_night": {"count": 0, "sum": 0,
+                                             "min": None, "max": None,
+                                             "avg": None},
+                          "max_guest": {"count": 0, "sum": 0, "min": None,
+                                        "max": None, "avg": None}},
+                         self.stats.get("c9"))
+
+    def test_combine(self):
+        stats = self.stats.combine(["c1", "c2", "c9"])
+        self.assertEqual(4, stats["count"])
+        self.assertEqual({"count": 3, "sum": 150, "min": 20, "max": 80,
+                          "avg": 50}, stats["price_by_night"])
+
+    def test_add_replaces(self):
+        self.stats.add("Place.0", "c2", {"price_by_night": 10})
+        self.assertEqual(2, self.stats.get("c1")["count"])
+        self.assertEqual(20, self.stats.get("c1")["price_by_night"]["max"])
+        self.assertEqual(10, self.stats.get("c2")["price_by_night"]["min"])
+        self.assertEqual(1, self.stats.get("c2")["max_guest"]["count"])
+
+    def test_remove(self):
+        self.stats.remove("Place.2")
+        self.stats.remove("Place.9")
+        self.assertEqual(["c1"], self.stats.groups())
+        self.stats.remove("Place.1")
+        self.assertEqual({"count": 1, "sum": 80, "min": 80, "max": 80,
+                          "avg": 80}, self.stats.get("c1")["price_by_night"])
+
+    def test_add_after_get(self):
+        self.assertEqual(20, self.stats.get("c1")["price_by_night"]["min"])
+        for i, price in enumerate((90, 10, 30)):
+            self.stats.add("Place.{}".format(i + 5), "c1",
+                           {"price_by_night": price})
+        self.stats.remove("Place.1")
+        self.assertEqual({"count": 4, "sum": 210, "min": 10, "max": 90,
+                          "avg": 52.5}, self.stats.get("c1")["price_by_night"])
+
+
+class TestSortedIndex(unittest.TestCase):
+    """Unittests for testing the SortedIndex class."""
+
+    def setUp(self):
+        self.index = SortedIndex("price_by_night")
+        for i, price in enumerate((80, 20, 50, 50, 120)):
+            self.index.add("Place.{}".format(i), price)
+
+    def test_attr(self):
+        self.assertEqual("price_by_night", self.index.attr)
+
+    def test_remove_many(self):
+        self.index.remove_many(["Place.0", "Place.3", "Place.9"])
+        self.assertEqual(["Place.1", "Place.2", "Place.4"],
+                         self.index.range())
+        self.index.remove_many(["Place.2"])
+        self.assertEqual(2, len(self.index))
+        self.index.add("Place.0", 10)
+        self.assertEqual(["Place.0", "Place.1", "Place.4"],
+                         self.index.range())
+
+    def test_order(self):
+        self.assertEqual(["Place.1", "Place.2", "Place.3", "Place.0",
+                          "Place.4"], self.index.range())
+        self.assertEqual(["Place.4", "Place.0", "Place.3", "Place.2",
+                          "Place.1"], self.index.range(reverse=True))
+
+    def test_bounds(self):
+        self.assertEqual(["Place.2", "Place.3", "Place.0"],
+                         self.index.range(50, 80))
+        self.assertEqual(["Place.0", "Place.4"], self.index.range(low=51))
+        self.assertEqual(["Place.1"], self.index.range(high=49.5))
+        self.assertEqual([], self.index.range(200, 300))
+
+    def test_pages(self):
+        self.assertEqual(["Place.1", "Place.2"], self.index.range(limit=2))
+        self.assertEqual(["Place.3", "Place.0"],
+                         self.index.range(offset=2, limit=2))
+        self.assertEqual(["Place.4", "Place.0"],
+                         self.index.range(reverse=True, limit=2))
+        self.assertEqual(["Place.3"], self.index.range(
+            high=80, reverse=True, offset=1, limit=1))
+        self.assertEqual([], self.index.range(reverse=True, offset=9))
+
+    def test_add_replaces_value(self):
+        self.index.add("Place.4", 10)
+        self.assertEqual(["Place.4"], self.index.range(limit=1))
+        self.assertEqual(5, len(self.index))
+
+    def test_remove_and_non_numbers(self):
+        self.index.remove("Place.1")
+        self.index.remove("Place.9")
+        self.index.add("Place.2", "cheap")
+        self.index.add("Place.5", float("nan"))
+        self.assertEqual(["Place.3", "Place.0", "Place.4"],
+                         self.index.range())
+
+    def test_add_after_range(self):
+        self.assertEqual(["Place.1"], self.index.range(limit=1))
+        self.index.add("Place.5", 60)
+        self.assertEqual(["Place.3", "Place.5"], self.index.range(50, 60)[1:])
+        for i, price in enumerate((5, 100, 60)):
+            self.index.add("Place.{}".format(i + 6), price)
+        self.index.remove("Place.5")
+        self.assertEqual(["Place.6", "Place.1", "Place.2", "Place.3",
+                          "Place.8", "Place.0", "Place.7", "Place.4"],
+                         self.index.range())
+        self.assertEqual(8, len(self.index))
+
+
+class TestTextIndex(unittest.TestCase):
+    """Unittests for testing the TextIndex class."""
+
+    def setUp(self):
+        self.index = TextIndex(("text",))
+        self.index.add("Review.0", "Quiet loft, quiet street")
+        self.index.add("Review.1", "Beach loft")
+        self.index.add("Review.2", "A cabin in the woods, far from any "
+                       "loft or street noise")
+
+    def test_tokenize(self):
+        self.assertEqual(["a", "café", "for", "2"],
+                         tokenize("A Café, for 2!"))
+
+    def test_attrs(self):
+        self.assertEqual(("text",), self.index.attrs)
+        self.assertEqual(3, len(self.index))
+
+    def test_search_ranks(self):
+        keys = [key for key, score in self.index.search("quiet street")]
+        self.assertEqual(["Review.0", "Review.2"], keys)
+        keys = [key for key, score in self.index.search("loft")]
+        self.assertEqual(["Review.1", "Review.0", "Review.2"], keys)
+
+    def test_search_scores(self):
+        scores = [score for key, score in self.index.search("loft noise")]
+        self.assertEqual(3, len(scores))
+        self.assertEqual(sorted(scores, reverse=True), scores)
+        self.assertGreater(scores[-1], 0)
+
+    def test_search_limit_and_misses(self):
+        self.assertEqual(1, len(self.index.search("loft", 1)))
+        self.assertEqual([], self.index.search("castle"))
+        self.assertEqual([], self.index.search(""))
+        self.assertEqual([], TextIndex(("text",)).search("loft"))
+
+    def test_add_replaces(self):
+        self.index.add("Review.1", "Castle")
+        self.assertEqual([("Review.1", self.index.search("castle")[0][1])],
+                         self.index.search("castle"))
+        self.assertNotIn("Review.1",
+                         [key for key, score in self.index.search("loft")])
+
+    def test_remove(self):
+        self.index.remove("Review.0")
+        self.index.remove("Review.9")
+        self.assertEqual(2, len(self.index))
+        self.assertEqual([], self.index.search("quiet"))
+
+    def test_counts_round_trip(self):
+        index = TextIndex(("text",))
+        for key, counts in self.index.counts().items():
+            index.add_counts(key, counts)
+        self.assertEqual(self.index.search("quiet loft"),
+                         index.search("quiet loft"))
+        self.assertEqual({"beach": 1, "loft": 1},
+                         self.index.counts()["Review.1"])
+        self.assertEqual(["Review.1"],
+                         list(self.index.counts(["Review.1", "Review.9"])))
+
+
+if __name__ == "__main__":
+    unittest.main()
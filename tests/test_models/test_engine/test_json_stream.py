@@ -0,0 +1,123 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/json_stream.py.
+
+Unittest classes:
+    TestIterload
+    TestLines
+"""
+import os
+import json
+import unittest
+from io import BytesIO, StringIO
+from models.engine.json_stream import dump_lines, has_lines, iterload
+from models.engine.json_stream import line_offsets, line_ranges, load_lines
+
+
+class TestIterload(unittest.TestCase):
+    """Unittests for testing the iterload function."""
+
+    def test_empty_object(self):
+        self.assertEqual([], list(iterload(StringIO(" { } "))))
+
+    def test_pairs_in_order(self):
+        text = '{"a": {"id": "1"}, "b": [1, 2], "c": 3}'
+        pairs = list(iterload(StringIO(text)))
+        self.assertEqual([("a", {"id": "1"}), ("b", [1, 2]), ("c", 3)],
+                         pairs)
+
+    def test_small_chunks(self):
+        objdict = {"User.{}".format(i): {"id": str(i), "name": "é" * i,
+                                         "n": i * 1000}
+                   for i in range(50)}
+        text = json.dumps(objdict, indent=1)
+        for size in (1, 2, 7, 64):
+            pairs = iterload(StringIO(text), chunk_size=size)
+            self.assertEqual(objdict, dict(pairs))
+
+    def test_is_lazy(self):
+        pairs = iterload(StringIO('{"a": 1, "b": '))
+        self.assertEqual(("a", 1), next(pairs))
+        with self.assertRaises(json.JSONDecodeError):
+            next(pairs)
+
+    def test_empty_file(self):
+        with self.assertRaises(json.JSONDecodeError):
+            list(iterload(StringIO("")))
+
+    def test_not_an_object(self):
+        with self.assertRaises(json.JSONDecodeError):
+            list(iterload(StringIO("[1, 2]")))
+
+    def test_missing_closing_brace(self):
+        with self.assertRaises(json.JSONDecodeError):
+            list(iterload(StringIO('{"a": 1')))
+
+    def test_key_not_a_string(self):
+        with self.assertRaises(json.JSONDecodeError):
+            list(iterload(StringIO('{1: 2}')))
+
+
+class TestLines(unittest.TestCase):
+    """Unittests for testing the functions of one-entry-per-line files."""
+
+    objdict = {"User.{}".format(i): {"id": str(i), "name": "é,}" * i}
+               for i in range(50)}
+
+    def setUp(self):
+        with open("test.json", "w") as f:
+            dump_lines(self.objdict, f)
+
+    def tearDown(self):
+        os.remove("test.json")
+
+    def test_dump_is_json(self):
+        with open("test.json", "r") as f:
+            self.assertEqual(self.objdict, json.load(f))
+
+    def test_dump_empty(self):
+        f = StringIO()
+        dump_lines({}, f)
+        self.assertEqual({}, json.loads(f.getvalue()))
+
+    def test_ranges_cover_entries(self):
+        for parts in (1, 2, 3, 7, 100):
+            ranges = line_ranges("test.json", parts)
+            self.assertLessEqual(len(ranges), parts)
+            pairs = []
+            for start, end in ranges:
+                pairs += load_lines("test.json", start, end)
+            self.assertEqual(list(self.objdict.items()), pairs)
+
+    def test_offsets(self):
+        with open("test.json", "rb") as f:
+            buf = f.read()
+        pairs = [(key, json.loads(buf[start:end]))
+                 for key, start, end in line_offsets(buf)]
+        self.assertEqual(list(self.objdict.items()), pairs)
+        self.assertEqual([], list(line_offsets(b"{\n}\n")))
+        with self.assertRaises(ValueError):
+            list(line_offsets(b'{"a": 1}'))
+
+    def test_ranges_of_single_line_file(self):
+        with open("test.json", "w") as f:
+            json.dump(self.objdict, f)
+        self.assertIsNone(line_ranges("test.json", 4))
+
+    def test_ranges_of_indented_file(self):
+        for indent in (0, 4):
+            with open("test.json", "w") as f:
+                json.dump(self.objdict, f, indent=indent)
+            self.assertIsNone(line_ranges("test.json", 4))
+
+    def test_has_lines(self):
+        with open("test.json", "rb") as f:
+            self.assertTrue(has_lines(f))
+        for text in (b"{\n}\n", b'{\n"a": 1,\n"b": [2]\n}\n'):
+            self.assertTrue(has_lines(BytesIO(text)))
+        for text in (b'{"a": 1}\n', b'{\n    "a": 1\n}',
+                     b'{\n"a": {\n"b": 1\n}\n}\n', b'{\n"a": 1,\n'):
+            self.assertFalse(has_lines(BytesIO(text)))
+
+
+if __name__ == "__main__":
+    unittest.main()
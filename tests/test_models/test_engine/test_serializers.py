@@ -0,0 +1,143 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/serializers.py.
+
+Unittest classes:
+    TestJSONSerializer
+    TestPickleSerializer
+    TestGetSerializer
+    TestConvert
+"""
+import os
+import json
+import pickle
+import unittest
+from io import BytesIO, StringIO
+from models.engine.serializers import JSONSerializer, PickleSerializer
+from models.engine.serializers import convert, get_serializer, serializers
+
+objdict = {
+    "User.1": {"id": "1", "created_at": "2023-05-16T14:18:32.663822",
+               "updated_at": "2023-05-16T14:18:32.663822",
+               "first_name": "Betty", "__class__": "User"},
+    "Place.2": {"id": "2", "created_at": "2023-05-16T14:18:32.663822",
+                "updated_at": "2023-05-16T14:18:32.663822",
+                "max_guest": 4, "latitude": 1.5, "amenity_ids": ["a"],
+                "__class__": "Place"},
+    "User.3": {"id": "3", "created_at": "2023-05-16T14:18:32.663822",
+               "updated_at": "2023-05-16T14:18:32.663822",
+               "first_name": "Holberton", "__class__": "User"},
+}
+
+
+class TestJSONSerializer(unittest.TestCase):
+    """Unittests for testing the JSONSerializer class."""
+
+    def test_registered(self):
+        self.assertEqual(JSONSerializer, type(serializers["json"]))
+
+    def test_dump_is_json(self):
+        f = StringIO()
+        JSONSerializer().dump(objdict, f)
+        self.assertEqual(objdict, json.loads(f.getvalue()))
+
+    def test_round_trip(self):
+        f = StringIO()
+        JSONSerializer().dump(objdict, f)
+        f.seek(0)
+        self.assertEqual(objdict, dict(JSONSerializer().load(f)))
+
+
+    def test_load_parallel(self):
+        with open("test.json", "w") as f:
+            JSONSerializer().dump(objdict, f)
+        try:
+            pairs = JSONSerializer().load_parallel("test.json", 2)
+            self.assertEqual(list(objdict.items()), list(pairs))
+        finally:
+            os.remove("test.json")
+
+    def test_load_parallel_rejects_bad_key(self):
+        with open("test.json", "w") as f:
+            JSONSerializer().dump({"User.9": objdict["User.1"]}, f)
+        try:
+            with self.assertRaises(ValueError):
+                JSONSerializer().load_parallel("test.json", 2)
+        finally:
+            os.remove("test.json")
+
+    def test_load_parallel_single_line(self):
+        with open("test.json", "w") as f:
+            json.dump(objdict, f)
+        try:
+            self.assertIsNone(JSONSerializer().load_parallel("test.json", 2))
+        finally:
+            os.remove("test.json")
+
+
+class TestPickleSerializer(unittest.TestCase):
+    """Unittests for testing the PickleSerializer class."""
+
+    def test_registered(self):
+        self.assertEqual(PickleSerializer, type(serializers["pickle"]))
+
+    def test_round_trip(self):
+        f = BytesIO()
+        PickleSerializer().dump(objdict, f)
+        f.seek(0)
+        self.assertEqual(objdict, dict(PickleSerializer().load(f)))
+
+    def test_smaller_than_json(self):
+        many = {}
+        for i in range(100):
+            o = dict(objdict["User.1"], id=str(i))
+            many["User.{}".format(i)] = o
+        f = BytesIO()
+        PickleSerializer().dump(many, f)
+        self.assertLess(len(f.getvalue()), len(json.dumps(many)))
+
+    def test_bad_magic(self):
+        with self.assertRaises(ValueError):
+            list(PickleSerializer().load(BytesIO(b"{}")))
+
+    def test_refuses_globals(self):
+        f = BytesIO(PickleSerializer.magic + pickle.dumps(os.getcwd))
+        with self.assertRaises(pickle.UnpicklingError):
+            list(PickleSerializer().load(f))
+
+
+class TestGetSerializer(unittest.TestCase):
+    """Unittests for testing the get_serializer function."""
+
+    def test_known(self):
+        self.assertIs(serializers["pickle"], get_serializer("pickle"))
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError) as cm:
+            get_serializer("yaml")
+        self.assertIn("yaml", str(cm.exception))
+        self.assertIn("json, pickle", str(cm.exception))
+
+
+class TestConvert(unittest.TestCase):
+    """Unittests for testing the convert function."""
+
+    def tearDown(self):
+        for path in ("test.json", "test.pkl", "back.json"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+
+    def test_json_to_pickle_and_back(self):
+        with open("test.json", "w") as f:
+            json.dump(objdict, f)
+        convert("test.json", "test.pkl", "json", "pickle")
+        with open("test.pkl", "rb") as f:
+            self.assertEqual(objdict, dict(PickleSerializer().load(f)))
+        convert("test.pkl", "back.json", "pickle", "json")
+        with open("back.json", "r") as f:
+            self.assertEqual(objdict, json.load(f))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,295 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/sqlite_storage.py.
+
+Unittest classes:
+    TestSQLiteStorage_instantiation
+    TestSQLiteStorage_methods
+"""
+import os
+import sqlite3
+import unittest
+from models.base_model import BaseModel
+from models.engine.sqlite_storage import SQLiteStorage
+from models.user import User
+from models.state import State
+from models.city import City
+from models.place import Place
+
+
+class TestSQLiteStorage_instantiation(unittest.TestCase):
+    """Unittests for testing instantiation of the SQLiteStorage class."""
+
+    def test_SQLiteStorage_instantiation_no_args(self):
+        self.assertEqual(type(SQLiteStorage()), SQLiteStorage)
+
+    def test_SQLiteStorage_instantiation_with_arg(self):
+        with self.assertRaises(TypeError):
+            SQLiteStorage(None)
+
+    def test_default_path(self):
+        self.assertEqual("file.db", SQLiteStorage._SQLiteStorage__path)
+
+
+class TestSQLiteStorage_methods(unittest.TestCase):
+    """Unittests for testing methods of the SQLiteStorage class."""
+
+    def setUp(self):
+        SQLiteStorage._SQLiteStorage__path = "test.db"
+        self.storage = SQLiteStorage()
+        self.storage.reload()
+
+    def tearDown(self):
+        SQLiteStorage._SQLiteStorage__connection.close()
+        SQLiteStorage._SQLiteStorage__connection = None
+        SQLiteStorage._SQLiteStorage__path = "file.db"
+        os.remove("test.db")
+
+    def reopen(self):
+        """Commit and reload, so objects are read back from the database."""
+        self.storage.commit()
+        self.storage.reload()
+
+    def test_new_and_get(self):
+        us = User()
+        us.first_name = "Betty"
+        self.storage.new(us)
+        self.assertIs(us, self.storage.get(User, us.id))
+        self.reopen()
+        got = self.storage.get("User", us.id)
+        self.assertIsNot(us, got)
+        self.assertEqual(us.to_dict(), got.to_dict())
+        self.assertIs(got, self.storage.get(User, us.id))
+        self.assertIsNone(self.storage.get(User, "nope"))
+        self.assertIsNone(self.storage.get("MyModel", us.id))
+
+    def test_one_table_per_class(self):
+        self.storage.new(User())
+        self.storage.new(City())
+        self.storage.commit()
+        with sqlite3.connect("test.db") as db:
+            tables = {row[0] for row in db.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        self.assertIn("User", tables)
+        self.assertIn("City", tables)
+
+    def test_all(self):
+        us = User()
+        st = State()
+        self.storage.new(us)
+        self.storage.new(st)
+        self.reopen()
+        objs = self.storage.all()
+        self.assertEqual({"User." + us.id, "State." + st.id}, set(objs))
+        self.assertEqual(["User." + us.id], list(self.storage.all(User)))
+        self.assertEqual({}, self.storage.all("MyModel"))
+
+    def test_count(self):
+        for i in range(3):
+            self.storage.new(User())
+        self.storage.new(State())
+        self.assertEqual(4, self.storage.count())
+        self.assertEqual(3, self.storage.count(User))
+        self.assertEqual(1, self.storage.count("State"))
+        self.assertEqual(0, self.storage.count("MyModel"))
+
+    def test_find(self):
+        ct1 = City()
+        ct1.state_id = "s1"
+        ct1.name = "Nairobi"
+        ct2 = City()
+        ct2.state_id = "s1"
+        ct3 = City()
+        ct3.state_id = "s2"
+        for ct in (ct1, ct2, ct3):
+            self.storage.new(ct)
+        self.reopen()
+        self.assertEqual({"City." + ct1.id, "City." + ct2.id},
+                         set(self.storage.find(City, state_id="s1")))
+        self.assertEqual(["City." + ct1.id], list(self.storage.find(
+            City, state_id="s1", name="Nairobi")))
+        self.assertEqual(["City." + ct2.id], list(self.storage.find(
+            City, state_id="s1", name="")))
+
+    def test_find_other_values(self):
+        pl = Place()
+        pl.amenity_ids = ["a"]
+        pl.max_guest = 4
+        self.storage.new(pl)
+        self.storage.new(Place())
+        self.reopen()
+        self.assertEqual(["Place." + pl.id], list(self.storage.find(
+            Place, amenity_ids=["a"], max_guest=4)))
+
+    def test_delete(self):
+        us = User()
+        self.storage.new(us)
+        self.storage.commit()
+        self.storage.delete(us)
+        self.assertIsNone(self.storage.get(User, us.id))
+        self.assertEqual(0, self.storage.count(User))
+        self.reopen()
+        self.assertEqual({}, self.storage.all(User))
+
+    def test_delete_cascade(self):
+        st = State()
+        cy = City()
+        cy.state_id = st.id
+        pl = Place()
+        pl.city_id = cy.id
+        other = City()
+        for obj in (st, cy, pl, other):
+            self.storage.new(obj)
+        self.reopen()
+        self.storage.delete(self.storage.get(State, st.id), cascade=True)
+        self.reopen()
+        self.assertEqual(["City." + other.id], list(self.storage.all(City)))
+        self.assertEqual({}, self.storage.all(Place))
+
+    def test_delete_None(self):
+        self.storage.delete(None)
+
+    def test_save_writes_loaded_objects(self):
+        us = User()
+        self.storage.new(us)
+        self.storage.commit()
+        us.first_name = "Betty"
+        self.storage.save()
+        self.storage.reload()
+        self.assertEqual("Betty", self.storage.get(User, us.id).first_name)
+
+    def test_reload_drops_uncommitted(self):
+        us = User()
+        self.storage.new(us)
+        self.storage.count()
+        self.storage.reload()
+        self.assertIsNone(self.storage.get(User, us.id))
+
+    def test_timestamps_round_trip(self):
+        bm = BaseModel()
+        self.storage.new(bm)
+        self.reopen()
+        self.assertEqual(bm.created_at,
+                         self.storage.get(BaseModel, bm.id).created_at)
+
+    def places(self):
+        """Store four places and return them, read back from the database."""
+        rows = ((80, 1.0, 2.0, ["a1", "a2"]), (40, 1.01, 2.0, ["a1"]),
+                (60, 50.0, 179.9, None), ("n/a", 0.0, 0.0, None))
+        places = []
+        for price, latitude, longitude, amenity_ids in rows:
+            pl = Place()
+            pl.price_by_night = price
+            pl.latitude = latitude
+            pl.longitude = longitude
+            if amenity_ids is not None:
+                pl.amenity_ids = amenity_ids
+            self.storage.new(pl)
+            places.append("Place." + pl.id)
+        self.reopen()
+        return places
+
+    def test_between(self):
+        pl = self.places()
+        self.assertEqual({pl[0], pl[2]}, set(self.storage.between(
+            Place, price_by_night=(50, None))))
+        self.assertEqual([pl[1]], list(self.storage.between(
+            Place, price_by_night=(None, 50), latitude=(1, 2))))
+        self.assertEqual(4, len(self.storage.between(
+            Place, price_by_night=(None, None))))
+
+    def test_order(self):
+        pl = self.places()
+        self.assertEqual([pl[1], pl[2], pl[0]], list(self.storage.order(
+            Place, "price_by_night")))
+        self.assertEqual([pl[2], pl[1]], list(self.storage.order(
+            Place, "price_by_night", reverse=True, offset=1, limit=2)))
+        self.assertEqual([pl[2]], list(self.storage.order(
+            Place, "price_by_night", 50, 70)))
+        self.assertEqual({}, self.storage.order("MyModel", "price"))
+
+    def test_near_and_within(self):
+        pl = self.places()
+        self.assertEqual([pl[0], pl[1]], list(self.storage.near(
+            Place, 1.0, 2.0, 5)))
+        self.assertEqual([pl[2]], list(self.storage.within(
+            Place, 40, 170, 60, -170)))
+        self.assertEqual({}, self.storage.near(City, 1.0, 2.0, 5))
+
+    def test_having(self):
+        pl = self.places()
+        self.assertEqual({pl[0], pl[1]}, set(self.storage.having(
+            Place, "amenity_ids", ["a1"])))
+        self.assertEqual([pl[0]], list(self.storage.having(
+            Place, "amenity_ids", ["a1"], ["a2", "a9"])))
+        self.assertEqual(4, len(self.storage.having(Place, "amenity_ids")))
+        self.assertEqual({}, self.storage.having(Place, "name", ["a1"]))
+
+    def test_search(self):
+        pl1 = Place()
+        pl1.name = "Quiet loft"
+        pl1.description = "A loft near the park"
+        pl2 = Place()
+        pl2.name = "Sunny house"
+        pl2.description = "On a quiet street"
+        self.storage.new(pl1)
+        self.storage.new(pl2)
+        self.reopen()
+        self.assertEqual(["Place." + pl1.id], list(self.storage.search(
+            Place, "LOFT")))
+        self.assertEqual(["Place." + pl1.id, "Place." + pl2.id],
+                         list(self.storage.search(Place, "loft quiet")))
+        self.assertEqual(1, len(self.storage.search(Place, "quiet", 1)))
+        self.assertEqual({}, self.storage.search(Place, "  "))
+        self.assertEqual({}, self.storage.search(User, "loft"))
+        pl2 = self.storage.get(Place, pl2.id)
+        pl2.description = "No loft"
+        self.storage.new(pl2)
+        self.storage.delete(self.storage.get(Place, pl1.id))
+        self.reopen()
+        self.assertEqual(["Place." + pl2.id], list(self.storage.search(
+            Place, "loft quiet")))
+
+    def test_stats(self):
+        ct1 = City()
+        ct1.state_id = "s1"
+        ct2 = City()
+        ct2.state_id = "s2"
+        self.storage.new(ct1)
+        self.storage.new(ct2)
+        for city_id, price in ((ct1.id, 80), (ct1.id, 40), (ct2.id, "n/a")):
+            pl = Place()
+            pl.city_id = city_id
+            pl.price_by_night = price
+            self.storage.new(pl)
+        self.reopen()
+        stats = self.storage.stats(Place, "city_id", ct1.id)
+        self.assertEqual(2, stats["count"])
+        self.assertEqual({"count": 2, "sum": 120, "min": 40, "max": 80,
+                          "avg": 60}, stats["price_by_night"])
+        stats = self.storage.stats(Place, "city_id")
+        self.assertEqual({ct1.id, ct2.id}, set(stats))
+        self.assertEqual({"count": 0, "sum": 0, "min": None, "max": None,
+                          "avg": None}, stats[ct2.id]["price_by_night"])
+        self.assertEqual({"s1": 2, "s2": 1}, {
+            state_id: stats["count"] for state_id, stats in
+            self.storage.stats(Place, "state_id").items()})
+        self.assertEqual(120, self.storage.stats(
+            Place, "state_id", "s1")["price_by_night"]["sum"])
+        self.assertEqual(0, self.storage.stats(Place, "state_id",
+                                               "s9")["count"])
+
+    def test_search_indexes_existing_rows(self):
+        pl = Place()
+        pl.name = "Quiet loft"
+        self.storage.new(pl)
+        self.storage.commit()
+        self.storage.reload()
+        with sqlite3.connect("test.db") as db:
+            db.execute('DROP TABLE "Place_text"')
+        self.storage.reload()
+        self.assertEqual(["Place." + pl.id], list(self.storage.search(
+            Place, "loft")))
+
+
+if __name__ == "__main__":
+    unittest.main()
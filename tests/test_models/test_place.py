@@ -5,6 +5,7 @@ Unittest classes:
     TestPlace_instantiation
     TestPlace_save
     TestPlace_to_dict
+    TestPlace_relationships
 """
 import os
 import models
@@ -12,6 +13,8 @@ import unittest
 from datetime import datetime
 from time import sleep
 from models.place import Place
+from models.amenity import Amenity
+from models.review import Review
 
 
 class TestPlace_instantiation(unittest.TestCase):
@@ -159,6 +162,10 @@ class TestPlace_save(unittest.TestCase):
             os.remove("file.json")
         except IOError:
             pass
+        try:
+            os.remove("file.json.text")
+        except IOError:
+            pass
         try:
             os.rename("tmp", "file.json")
         except IOError:
@@ -245,6 +252,31 @@ class TestPlace_to_dict(unittest.TestCase):
             pl.to_dict(None)
 
 
+class TestPlace_relationships(unittest.TestCase):
+    """Unittests for testing the reviews and amenities of the Place class."""
+
+    def test_reviews(self):
+        pl = Place()
+        rv = Review()
+        rv.place_id = pl.id
+        models.storage.new(rv)
+        Review()
+        self.assertEqual([rv], pl.reviews)
+        rv.place_id = "elsewhere"
+        models.storage.new(rv)
+        self.assertEqual([], pl.reviews)
+
+    def test_amenities(self):
+        pl = Place()
+        am1 = Amenity()
+        am2 = Amenity()
+        pl.amenity_ids = [am2.id, "missing", am1.id]
+        self.assertEqual([am2, am1], pl.amenities)
+        models.storage.delete(am2)
+        self.assertEqual([am1], pl.amenities)
+        self.assertEqual([], Place().amenities)
+
+
 if __name__ == "__main__":
     unittest.main()
 
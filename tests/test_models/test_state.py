@@ -5,6 +5,7 @@ Unittest classes:
     TestState_instantiation
     TestState_save
     TestState_to_dict
+    TestState_cities
 """
 import os
 import models
@@ -12,6 +13,7 @@ import unittest
 from datetime import datetime
 from time import sleep
 from models.state import State
+from models.city import City
 
 
 class TestState_instantiation(unittest.TestCase):
@@ -99,6 +101,10 @@ class TestState_save(unittest.TestCase):
             os.remove("file.json")
         except IOError:
             pass
+        try:
+            os.remove("file.json.text")
+        except IOError:
+            pass
         try:
             os.rename("tmp", "file.json")
         except IOError:
@@ -185,6 +191,39 @@ class TestState_to_dict(unittest.TestCase):
             st.to_dict(None)
 
 
+class TestState_cities(unittest.TestCase):
+    """Unittests for testing the cities property of the State class."""
+
+    def test_cities(self):
+        st = State()
+        cy1 = City()
+        cy1.state_id = st.id
+        cy2 = City()
+        cy2.state_id = st.id
+        City().state_id = st.id
+        models.storage.new(cy1)
+        models.storage.new(cy2)
+        self.assertEqual({cy1.id, cy2.id}, {cy.id for cy in st.cities})
+
+    def test_cities_follow_changes(self):
+        st = State()
+        cy = City()
+        cy.state_id = st.id
+        models.storage.new(cy)
+        cy.state_id = "elsewhere"
+        models.storage.new(cy)
+        self.assertEqual([], st.cities)
+        cy.state_id = st.id
+        models.storage.new(cy)
+        models.storage.delete(cy)
+        self.assertEqual([], st.cities)
+
+    def test_cities_not_settable(self):
+        with self.assertRaises(AttributeError):
+            State().cities = []
+        self.assertNotIn("cities", State().to_dict())
+
+
 if __name__ == "__main__":
     unittest.main()
 
@@ -5,6 +5,7 @@ Unittest classes:
     TestUser_instantiation
     TestUser_save
     TestUser_to_dict
+    TestUser_reviews
 """
 import os
 import models
@@ -12,6 +13,7 @@ import unittest
 from datetime import datetime
 from time import sleep
 from models.user import User
+from models.review import Review
 
 
 class TestUser_instantiation(unittest.TestCase):
@@ -105,6 +107,10 @@ class TestUser_save(unittest.TestCase):
             os.remove("file.json")
         except IOError:
             pass
+        try:
+            os.remove("file.json.text")
+        except IOError:
+            pass
         try:
             os.rename("tmp", "file.json")
         except IOError:
@@ -191,6 +197,22 @@ class TestUser_to_dict(unittest.TestCase):
             us.to_dict(None)
 
 
+class TestUser_reviews(unittest.TestCase):
+    """Unittests for testing the reviews property of the User class."""
+
+    def test_reviews(self):
+        us = User()
+        rv1 = Review()
+        rv1.user_id = us.id
+        rv2 = Review()
+        rv2.user_id = us.id
+        for rv in (rv1, rv2):
+            models.storage.new(rv)
+        self.assertEqual({rv1.id, rv2.id}, {rv.id for rv in us.reviews})
+        models.storage.delete(rv1)
+        self.assertEqual([rv2], us.reviews)
+
+
 if __name__ == "__main__":
     unittest.main()
 